@@ -0,0 +1,64 @@
+import os
+
+# --- NLP ---
+# Nombre max de formes gardées en cache pour les lookups JMdict (LRU, par process)
+JMDICT_CACHE_SIZE = int(os.getenv("OKURA_JMDICT_CACHE_SIZE", "50000"))
+# Idem pour les mots chinois (pinyin, définitions et ID déjà calculés)
+CN_WORD_CACHE_SIZE = int(os.getenv("OKURA_CN_WORD_CACHE_SIZE", "50000"))
+# Lexique compilé (python -m app.services.lexicon build) ; absent => jamdict + CEDICT en mémoire
+LEXICON_PATH = os.getenv("OKURA_LEXICON_PATH", "okura_lexicon.bin")
+# Moteurs initialisés en tâche de fond au démarrage ("" pour tout laisser paresseux)
+NLP_WARMUP = [l for l in os.getenv("OKURA_NLP_WARMUP", "jp,cn").split(",") if l.strip()]
+
+# --- EXÉCUTEUR D'ANALYSE ---
+# "process" : pool de process avec moteurs préinitialisés ; "inline" : threadpool du serveur
+ANALYSIS_BACKEND = os.getenv("OKURA_ANALYSIS_BACKEND", "process")
+ANALYSIS_WORKERS = int(os.getenv("OKURA_ANALYSIS_WORKERS", str(min(4, os.cpu_count() or 1))))
+# Taille (en lignes) des morceaux analysés en parallèle
+ANALYSIS_CHUNK_LINES = int(os.getenv("OKURA_ANALYSIS_CHUNK_LINES", "200"))
+
+# --- CACHE DES RÉSULTATS D'ANALYSE ---
+# Nb de résultats gardés en mémoire (compressés) par process, devant le tier persistant en base
+RESULT_CACHE_SIZE = int(os.getenv("OKURA_RESULT_CACHE_SIZE", "64"))
+RESULT_CACHE_PERSIST = os.getenv("OKURA_RESULT_CACHE_PERSIST", "1") == "1"
+
+# --- INGESTION ASYNCHRONE (jobs) ---
+JOB_WORKERS = int(os.getenv("OKURA_JOB_WORKERS", "2"))
+# Taille des pages pour les fichiers sans chapitres (TXT, HTML)
+JOB_PAGE_LINES = int(os.getenv("OKURA_JOB_PAGE_LINES", "500"))
+# Battement de cœur des jobs en cours (updated_at) ; un job muet depuis 5 battements est déclaré échoué
+JOB_HEARTBEAT_SECONDS = float(os.getenv("OKURA_JOB_HEARTBEAT_SECONDS", "30"))
+
+# --- STATISTIQUES ---
+# Réconciliation périodique des compteurs du tableau de bord (0 = seulement au démarrage si absents)
+STATS_RECONCILE_HOURS = float(os.getenv("OKURA_STATS_RECONCILE_HOURS", "24"))
+
+# --- PRÉVISIONS ---
+# Probabilité de rappel par streak (0, 1, 2 et plus) supposée par défaut dans les simulations
+FORECAST_RECALL = [float(p) for p in os.getenv("OKURA_FORECAST_RECALL", "0.75,0.85,0.9").split(",")]
+FORECAST_MAX_DAYS = int(os.getenv("OKURA_FORECAST_MAX_DAYS", "365"))
+
+# --- BASE DE DONNÉES ---
+# Pool de connexions (Postgres et SQLite sur fichier ; ignoré pour SQLite en mémoire)
+DB_POOL_SIZE = int(os.getenv("OKURA_DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("OKURA_DB_MAX_OVERFLOW", "20"))
+DB_POOL_TIMEOUT = float(os.getenv("OKURA_DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("OKURA_DB_POOL_RECYCLE", "1800"))
+# Durée max d'une requête SQL côté Postgres, en ms (0 = illimitée)
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv("OKURA_DB_STATEMENT_TIMEOUT_MS", "30000"))
+# Moteur asynchrone (asyncpg / aiosqlite) pour les routes chaudes : révisions, file, stats, listes
+DB_ASYNC = os.getenv("OKURA_DB_ASYNC", "0") == "1"
+
+# --- RÉPONSES HTTP ---
+# Compression gzip / brotli (extra "compression") des réponses, au-delà de COMPRESS_MIN_SIZE octets
+COMPRESSION_ENABLED = os.getenv("OKURA_COMPRESSION", "1") == "1"
+COMPRESS_MIN_SIZE = int(os.getenv("OKURA_COMPRESS_MIN_SIZE", "1024"))
+GZIP_LEVEL = int(os.getenv("OKURA_GZIP_LEVEL", "6"))
+# Qualité brotli des réponses dynamiques (les fichiers statiques sont compressés une fois, au maximum)
+BROTLI_QUALITY = int(os.getenv("OKURA_BROTLI_QUALITY", "4"))
+
+# --- MÉTRIQUES ---
+# Latences, SQL et étapes d'analyse exposées sur /metrics (format Prometheus)
+METRICS_ENABLED = os.getenv("OKURA_METRICS", "1") == "1"
+# Détail par requête (en-tête Server-Timing) quand le client envoie X-Okura-Profile
+PROFILE_HEADER = os.getenv("OKURA_PROFILE_HEADER", "1") == "1"
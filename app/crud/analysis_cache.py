@@ -0,0 +1,20 @@
+from sqlalchemy.orm import Session
+from sqlalchemy.exc import IntegrityError
+from app.models import analysis_cache as models
+
+def get_result(db: Session, key: str):
+    obj = db.get(models.AnalysisResult, key)
+    return obj.data if obj else None
+
+def save_result(db: Session, key: str, lang: str, dict_version: str, size: int, data: bytes):
+    db.add(models.AnalysisResult(key=key, lang=lang, dict_version=dict_version, size=size, data=data))
+    try:
+        db.commit()
+    except IntegrityError:
+        # Déjà stocké par une requête concurrente : même contenu, rien à faire
+        db.rollback()
+
+def purge_stale_results(db: Session, dict_version: str) -> int:
+    deleted = db.query(models.AnalysisResult).filter(models.AnalysisResult.dict_version != dict_version).delete(synchronize_session=False)
+    db.commit()
+    return deleted
@@ -0,0 +1,55 @@
+from datetime import datetime, timedelta
+from sqlalchemy.orm import Session
+from app.models import jobs as models
+
+def create_job(db: Session, job_id: str, filename: str, lang: str):
+    job = models.IngestionJob(id=job_id, filename=filename, lang=lang)
+    db.add(job)
+    db.commit()
+    db.refresh(job)
+    return job
+
+def get_job(db: Session, job_id: str):
+    return db.get(models.IngestionJob, job_id)
+
+def get_job_status(db: Session, job_id: str):
+    return db.query(models.IngestionJob.status).filter(models.IngestionJob.id == job_id).scalar()
+
+def update_job(db: Session, job_id: str, **fields):
+    db.query(models.IngestionJob).filter(models.IngestionJob.id == job_id).update(fields, synchronize_session=False)
+    db.commit()
+
+def save_chapter(db: Session, job_id: str, index: int, title: str, sentence_count: int, data: bytes):
+    db.add(models.IngestionChapter(job_id=job_id, index=index, title=title, sentence_count=sentence_count, data=data))
+    # updated_at sert aussi de battement de cœur (cf. fail_stale_jobs)
+    db.query(models.IngestionJob).filter(models.IngestionJob.id == job_id).update(
+        {"done_chapters": models.IngestionJob.done_chapters + 1, "updated_at": datetime.now()}, synchronize_session=False)
+    db.commit()
+
+def get_chapter(db: Session, job_id: str, index: int):
+    return db.get(models.IngestionChapter, (job_id, index))
+
+def get_chapter_titles(db: Session, job_id: str):
+    return db.query(models.IngestionChapter.index, models.IngestionChapter.title, models.IngestionChapter.sentence_count)\
+        .filter(models.IngestionChapter.job_id == job_id).order_by(models.IngestionChapter.index).all()
+
+def touch_jobs(db: Session, job_ids: list):
+    """Battement de cœur des jobs vivants de ce process."""
+    db.query(models.IngestionJob).filter(models.IngestionJob.id.in_(job_ids), models.IngestionJob.status.in_(["queued", "running"]))\
+        .update({"updated_at": datetime.now()}, synchronize_session=False)
+    db.commit()
+
+def fail_jobs(db: Session, job_ids: list, error: str) -> int:
+    n = db.query(models.IngestionJob).filter(models.IngestionJob.id.in_(job_ids), models.IngestionJob.status.in_(["queued", "running"]))\
+        .update({"status": "failed", "error": error}, synchronize_session=False)
+    db.commit()
+    return n
+
+def fail_stale_jobs(db: Session, stale_after: timedelta) -> int:
+    """Jobs sans battement depuis stale_after : leur process a été arrêté (la file est en mémoire)."""
+    n = db.query(models.IngestionJob).filter(
+        models.IngestionJob.status.in_(["queued", "running"]),
+        models.IngestionJob.updated_at < datetime.now() - stale_after,
+    ).update({"status": "failed", "error": "Interrompu (redémarrage du serveur)"}, synchronize_session=False)
+    db.commit()
+    return n
@@ -0,0 +1,165 @@
+from sqlalchemy import select, insert, delete, func, literal, union, union_all, text, Integer, Float
+from sqlalchemy.orm import Session
+from app.models import search as models
+from app.models import vocabulaire as vocab_models
+from app.services.search import normalize
+
+# Index maintenu au fil des écritures (cartes, analyses enregistrées) ; rebuild() le reconstruit en entier.
+INDEX_BATCH = 5000
+SNIPPET_CHARS = 120
+# En dessous, pas de trigramme : correspondance exacte puis préfixe sur le terme (index B-tree)
+MIN_FULLTEXT_CHARS = 3
+# Correspondances plein texte classées au plus (au-delà, l'ordre n'est plus garanti par la pertinence)
+FULLTEXT_CANDIDATES = 2000
+
+_fulltext = {}  # dialecte -> index plein texte présent
+
+def _has_fulltext(db: Session) -> bool:
+    bind = db.get_bind()
+    if bind.dialect.name not in _fulltext: _fulltext[bind.dialect.name] = models.has_fulltext(bind)
+    return _fulltext[bind.dialect.name]
+
+# --- ÉCRITURE ---
+def _card_document(id, list_id, terme, lecture, definitions, context) -> dict:
+    key, reading = normalize(terme), normalize(lecture)
+    body = "\n".join(normalize(v) for v in (terme, lecture, definitions, context) if v)
+    return {"kind": "card", "ref_id": id, "list_id": list_id, "key": key, "reading": reading or None, "body": body}
+
+def index_cards(db: Session, condition):
+    """Indexe les cartes qui vérifient `condition` (ex. VocabCard.id.in_(ids)) ; pas de commit."""
+    card = vocab_models.VocabCard
+    rows = db.execute(select(card.id, card.list_id, card.terme, card.lecture, card.definitions, card.context).where(condition))
+    batch = []
+    for row in rows:
+        batch.append(_card_document(*row))
+        if len(batch) >= INDEX_BATCH:
+            db.execute(insert(models.SearchDocument), batch)
+            batch = []
+    if batch: db.execute(insert(models.SearchDocument), batch)
+
+def drop_cards(db: Session, card_ids: list):
+    doc = models.SearchDocument
+    db.execute(delete(doc).where(doc.kind == "card", doc.ref_id.in_(card_ids)))
+
+def drop_list(db: Session, list_id: int):
+    doc = models.SearchDocument
+    db.execute(delete(doc).where(doc.kind == "card", doc.list_id == list_id))
+
+def index_analysis(db: Session, analysis):
+    db.execute(insert(models.SearchDocument), [{
+        "kind": "analysis", "ref_id": analysis.id, "key": normalize(analysis.title),
+        # Titre après le contenu : les positions dans body restent celles du contenu (extraits)
+        "body": "\n".join(normalize(v) for v in (analysis.content, analysis.title) if v),
+    }])
+
+def drop_analysis(db: Session, analysis_id: int):
+    doc = models.SearchDocument
+    db.execute(delete(doc).where(doc.kind == "analysis", doc.ref_id == analysis_id))
+
+def is_empty(db: Session) -> bool:
+    return db.query(models.SearchDocument.id).first() is None
+
+def rebuild(db: Session):
+    """Reconstruit tout l'index (base existante, changement de normalisation), en une transaction."""
+    db.execute(delete(models.SearchDocument))
+    index_cards(db, literal(True))
+    for analysis in db.query(vocab_models.Analysis).yield_per(100):
+        index_analysis(db, analysis)
+    db.commit()
+    doc = models.SearchDocument
+    return {"cards": db.query(func.count(doc.id)).filter(doc.kind == "card").scalar(),
+            "analyses": db.query(func.count(doc.id)).filter(doc.kind == "analysis").scalar()}
+
+# --- RECHERCHE ---
+def _escape_like(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+def prefix_filter(column, prefix: str, dialect: str):
+    """Valeurs qui commencent par `prefix`. SQLite compare en binaire (ordre des points de code) :
+    intervalle [prefix, prefix avec son dernier point de code + 1[, servi par un index B-tree et juste
+    hors BMP (𠮟, 𩸽). Postgres : LIKE échappé, indépendant de la collation (indexé en collation C
+    ou text_pattern_ops)."""
+    last = ord(prefix[-1]) if prefix else 0x10FFFF
+    if dialect == "postgresql" or last == 0x10FFFF: return column.like(_escape_like(prefix) + "%", escape="\\")
+    following = last + 1 if not 0xD7FF <= last < 0xDFFF else 0xE000  # pas de demi-codet UTF-16
+    return (column >= prefix) & (column < prefix[:-1] + chr(following))
+
+def _matching(db: Session, nq: str, kind: str, list_id: int, limit: int, offset: int) -> list:
+    """(id du document, score) des documents qui contiennent nq, du plus pertinent au moins pertinent :
+    correspondances exactes (terme, lecture ou titre) d'abord, puis le reste."""
+    doc = models.SearchDocument
+    filters = [doc.kind == kind]
+    if list_id is not None: filters.append(doc.list_id == list_id)
+    # Deux recherches d'égalité (index key / reading) plutôt qu'un OR qui parcourt toute la table
+    exact_query = union(select(doc.id).where(*filters, doc.key == nq), select(doc.id).where(*filters, doc.reading == nq))
+    exact_ids = sorted(i for (i,) in db.execute(exact_query))[:offset + limit]
+    rows = [(i, 0.0) for i in exact_ids[offset:]]
+    if len(rows) >= limit: return rows
+    offset, limit = max(0, offset - len(exact_ids)), limit - len(rows)
+    if exact_ids: filters.append(doc.id.not_in(exact_ids))
+    dialect = db.get_bind().dialect.name
+
+    if len(nq) < MIN_FULLTEXT_CHARS and kind == "card":
+        # Pas de trigramme (la plupart des mots CJK font 1-2 caractères) : préfixes du terme dans l'ordre
+        # de l'index (kind, key, id), puis sous-chaîne de tout le texte (lecture, définitions, contexte),
+        # LIKE non indexé borné à FULLTEXT_CANDIDATES correspondances.
+        prefixes = select(doc.id, literal(1.0).label("score"), doc.key)\
+            .where(*filters, doc.key != nq, prefix_filter(doc.key, nq, dialect)).order_by(doc.key, doc.id).limit(offset + limit)
+        contains = select(doc.id, literal(2.0).label("score"), doc.key)\
+            .where(*filters, doc.body.like(f"%{_escape_like(nq)}%", escape="\\")).limit(FULLTEXT_CANDIDATES)
+        matches = union_all(select(prefixes.subquery()), select(contains.subquery())).subquery()
+        score = func.min(matches.c.score)
+        query = select(matches.c.id, score).group_by(matches.c.id, matches.c.key).order_by(score, matches.c.key, matches.c.id)
+    elif len(nq) >= MIN_FULLTEXT_CHARS and dialect == "sqlite" and _has_fulltext(db):
+        # Phrase FTS5 : avec le tokenizer trigram, équivaut à une recherche de sous-chaîne indexée.
+        # Classement (bm25) limité aux FULLTEXT_CANDIDATES premières correspondances : coût borné
+        # même pour un terme présent dans toutes les cartes.
+        fts_filters = " AND kind = :kind" + (" AND list_id = :list_id" if list_id is not None else "")
+        candidates = text(f"SELECT rowid AS id, bm25(search_fts) AS score FROM search_fts "
+                          f"WHERE search_fts MATCH :q{fts_filters} LIMIT :candidates")\
+            .bindparams(q='"' + nq.replace('"', '""') + '"', kind=kind, candidates=FULLTEXT_CANDIDATES,
+                        **({"list_id": list_id} if list_id is not None else {}))\
+            .columns(id=Integer, score=Float).subquery()
+        query = select(candidates.c.id, candidates.c.score).order_by(candidates.c.score, candidates.c.id)
+        if exact_ids: query = query.where(candidates.c.id.not_in(exact_ids))
+    elif dialect == "postgresql":
+        # LIKE servi par l'index GIN pg_trgm (body déjà normalisé en minuscules), même borne de classement
+        candidates = select(doc.id, doc.body).where(*filters, doc.body.like(f"%{_escape_like(nq)}%", escape="\\"))\
+            .limit(FULLTEXT_CANDIDATES).subquery()
+        score = func.word_similarity(nq, candidates.c.body)
+        query = select(candidates.c.id, score).order_by(score.desc(), candidates.c.id)
+    else:
+        # Sans index plein texte (ou requête courte sur les analyses) : LIKE non indexé, plus récents d'abord
+        query = select(doc.id, literal(0.0)).where(*filters, doc.body.like(f"%{_escape_like(nq)}%", escape="\\"))\
+            .order_by(doc.id.desc())
+    return rows + [tuple(r) for r in db.execute(query.offset(offset).limit(limit))]
+
+def search(db: Session, q: str, kind: str = "card", list_id: int = None, limit: int = 20, offset: int = 0) -> dict:
+    """Résultats classés (exact d'abord, puis pertinence) et paginés par offset."""
+    nq = normalize(q).strip()
+    if not nq: return {"items": [], "next_offset": None}
+    rows = _matching(db, nq, kind, list_id, limit + 1, offset)
+    next_offset = offset + limit if len(rows) > limit else None
+    rows = rows[:limit]
+    doc = models.SearchDocument
+    refs = dict(db.execute(select(doc.id, doc.ref_id).where(doc.id.in_([i for i, _ in rows]))).all())
+
+    if kind == "card":
+        card = vocab_models.VocabCard
+        found = {c.id: c for c in db.execute(
+            select(card.id, card.list_id, card.terme, card.lecture, card.pos, card.definitions, card.context)
+            .where(card.id.in_(refs.values())))}
+        items = [{"kind": "card", "id": c.id, "list_id": c.list_id, "terme": c.terme, "lecture": c.lecture, "pos": c.pos,
+                  "definitions": c.definitions, "snippet": c.context, "score": score}
+                 for c, score in ((found.get(refs[i]), score) for i, score in rows) if c]
+    else:
+        analysis = vocab_models.Analysis
+        # Extrait autour de la 1re occurrence : la normalisation conserve (presque) les positions
+        if db.get_bind().dialect.name == "sqlite": start = func.max(func.instr(doc.body, nq) - SNIPPET_CHARS // 3, 1)
+        else: start = func.greatest(func.strpos(doc.body, nq) - SNIPPET_CHARS // 3, 1)
+        found = {a.id: a for a in db.execute(
+            select(analysis.id, analysis.title, analysis.lang, func.substr(analysis.content, start, SNIPPET_CHARS).label("snippet"))
+            .join(doc, (doc.ref_id == analysis.id) & (doc.kind == "analysis")).where(doc.id.in_(refs)))}
+        items = [{"kind": "analysis", "id": a.id, "title": a.title, "lang": a.lang, "snippet": a.snippet, "score": score}
+                 for a, score in ((found.get(refs[i]), score) for i, score in rows) if a]
+    return {"items": items, "next_offset": next_offset}
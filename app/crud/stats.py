@@ -0,0 +1,153 @@
+from collections import Counter, defaultdict
+from datetime import datetime, date
+from sqlalchemy import func, case, select, tuple_, text
+from sqlalchemy.orm import Session
+from app.models import stats as models
+from app.models import vocabulaire as vocab_models
+from app.services.srs import due_cutoff
+
+# --- DELTAS ---
+class StatsDelta:
+    """Variations de compteurs accumulées pendant une opération, appliquées avant le commit."""
+
+    def __init__(self):
+        self.lists = defaultdict(lambda: [0, 0])
+        self.buckets = Counter()
+        self.touched = set()
+
+    def add(self, list_id: int, streak: int, next_review: datetime, sign: int = 1):
+        self.touched.add(list_id)
+        counters = self.lists[list_id]
+        counters[0] += sign
+        if streak: counters[1] += sign
+        if next_review: self.buckets[(list_id, next_review.date())] += sign
+
+    def remove(self, list_id: int, streak: int, next_review: datetime):
+        self.add(list_id, streak, next_review, sign=-1)
+
+    def change(self, list_id: int, old: tuple, new: tuple):
+        self.remove(list_id, *old)
+        self.add(list_id, *new)
+
+    def apply(self, db: Session):
+        lists = [{"list_id": l, "total": t, "learned": n} for l, (t, n) in self.lists.items() if t or n]
+        buckets = [{"list_id": l, "day": d, "count": c} for (l, d), c in self.buckets.items() if c]
+        _increment(db, models.ListStats, ["list_id"], ["total", "learned"], lists)
+        _increment(db, models.ListDueBucket, ["list_id", "day"], ["count"], buckets)
+        # Toute carte ajoutée, révisée ou supprimée change la liste, même à compteurs inchangés.
+        # Lignes par liste seulement : une ligne globale sérialiserait toutes les révisions concurrentes
+        if self.touched: bump_versions(db, *[("list", l) for l in self.touched])
+        self.lists.clear()
+        self.buckets.clear()
+        self.touched.clear()
+
+def _increment(db: Session, model, keys: list, fields: list, rows: list, assign: tuple = ()):
+    """Upsert-incrément atomique (col = col + delta) : ON CONFLICT sur Postgres/SQLite, sinon UPDATE puis INSERT.
+    Les colonnes de `assign` sont simplement remplacées."""
+    if not rows: return
+    dialect = db.get_bind().dialect.name
+    if dialect in ("postgresql", "sqlite"):
+        if dialect == "postgresql": from sqlalchemy.dialects.postgresql import insert
+        else: from sqlalchemy.dialects.sqlite import insert
+        stmt = insert(model)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=keys, set_={**{f: getattr(model, f) + getattr(stmt.excluded, f) for f in fields},
+                                       **{f: getattr(stmt.excluded, f) for f in assign}})
+        db.execute(stmt, rows)
+        return
+    for row in rows:
+        query = db.query(model).filter(*[getattr(model, k) == row[k] for k in keys])
+        values = {**{getattr(model, f): getattr(model, f) + row[f] for f in fields}, **{getattr(model, f): row[f] for f in assign}}
+        if not query.update(values, synchronize_session=False):
+            db.add(model(**row))
+            db.flush()
+
+def drop_list(db: Session, list_id: int):
+    db.query(models.ListStats).filter(models.ListStats.list_id == list_id).delete(synchronize_session=False)
+    db.query(models.ListDueBucket).filter(models.ListDueBucket.list_id == list_id).delete(synchronize_session=False)
+
+# --- VERSIONS (validation HTTP) ---
+def bump_versions(db: Session, *keys):
+    """Incrémente les compteurs (scope, key) donnés ; pas de commit (même transaction que l'écriture)."""
+    now = datetime.now().replace(microsecond=0)  # précision des en-têtes HTTP : la seconde
+    rows = [{"scope": scope, "key": key, "version": 1, "updated_at": now} for scope, key in sorted(set(keys))]
+    _increment(db, models.DataVersion, ["scope", "key"], ["version"], rows, assign=("updated_at",))
+
+def get_versions(db: Session, keys: list):
+    """(versions dans l'ordre de keys, 0 si jamais incrémentée ; date de la dernière écriture ou None).
+    (scope, None) : tout le scope, version (somme, nombre de lignes) -- les versions ne font que croître."""
+    version = models.DataVersion
+    exact = [k for k in keys if k[1] is not None]
+    found = {(r.scope, r.key): (r.version, r.updated_at)
+             for r in db.query(version).filter(tuple_(version.scope, version.key).in_(exact))} if exact else {}
+    for scope in {s for s, k in keys if k is None}:
+        total, count, modified = db.query(func.coalesce(func.sum(version.version), 0), func.count(), func.max(version.updated_at))\
+            .filter(version.scope == scope).one()
+        if count: found[(scope, None)] = ((int(total), count), modified)
+    modified = [found[k][1] for k in keys if k in found]
+    return tuple(found[k][0] if k in found else 0 for k in keys), max(modified, default=None)
+
+# --- LECTURE ---
+def has_counters(db: Session) -> bool:
+    return db.query(models.ListStats.list_id).first() is not None
+
+def get_counters(db: Session, today: date = None, list_id: int = None):
+    """Par liste : total, appris, dus (jour <= aujourd'hui, cf. srs.due_cutoff). Deux petites requêtes, aucun scan des cartes."""
+    today = today or date.today()
+    due_q = db.query(models.ListDueBucket.list_id, func.sum(models.ListDueBucket.count)).filter(models.ListDueBucket.day <= today)
+    stats_q = db.query(models.ListStats)
+    if list_id is not None:
+        due_q = due_q.filter(models.ListDueBucket.list_id == list_id)
+        stats_q = stats_q.filter(models.ListStats.list_id == list_id)
+    due = dict(due_q.group_by(models.ListDueBucket.list_id).all())
+    return [
+        {"list_id": row.list_id, "total": row.total, "learned": row.learned, "due": int(due.get(row.list_id) or 0)}
+        for row in stats_q.order_by(models.ListStats.list_id)
+    ]
+
+def scan_totals(db: Session, list_id: int = None):
+    """Repli sans compteurs : total, appris et dus en une seule requête sur VocabCard."""
+    card = vocab_models.VocabCard
+    query = db.query(
+        func.count(card.id),
+        func.coalesce(func.sum(case((card.streak > 0, 1), else_=0)), 0),
+        func.coalesce(func.sum(case((card.next_review < due_cutoff(), 1), else_=0)), 0),
+    )
+    if list_id is not None: query = query.filter(card.list_id == list_id)
+    total, learned, due = query.one()
+    return {"total_cards": total, "cards_learned": int(learned), "due_today": int(due)}
+
+# --- RÉCONCILIATION ---
+def _lock_counters(db: Session):
+    """Verrou exclusif sur les compteurs jusqu'au commit : les StatsDelta.apply concurrents (et une autre
+    réconciliation) attendent, et tout incrément déjà écrit est commité avant le recalcul, donc compté."""
+    if db.get_bind().dialect.name == "postgresql":
+        db.execute(text(f"LOCK TABLE {models.ListStats.__tablename__}, {models.ListDueBucket.__tablename__} IN EXCLUSIVE MODE"))
+    # SQLite : les suppressions ci-après, en tête de transaction, prennent le verrou d'écriture de la base
+
+def reconcile(db: Session):
+    """Recalcule tous les compteurs depuis VocabCard (deux GROUP BY), en une transaction.
+    Verrou puis suppression avant les GROUP BY : aucun incrément concurrent ne tombe entre la lecture
+    des cartes et la réécriture des compteurs."""
+    card = vocab_models.VocabCard
+    _lock_counters(db)
+    db.query(models.ListStats).delete(synchronize_session=False)
+    db.query(models.ListDueBucket).delete(synchronize_session=False)
+
+    lists = db.query(card.list_id, func.count(card.id), func.sum(case((card.streak > 0, 1), else_=0)))\
+        .group_by(card.list_id).all()
+    day = func.date(card.next_review)
+    buckets = db.query(card.list_id, day, func.count(card.id))\
+        .filter(card.next_review.isnot(None)).group_by(card.list_id, day).all()
+    if lists:
+        db.bulk_insert_mappings(models.ListStats, [
+            {"list_id": l, "total": t, "learned": int(n or 0)} for l, t, n in lists])
+    if buckets:
+        db.bulk_insert_mappings(models.ListDueBucket, [
+            {"list_id": l, "day": d if isinstance(d, date) else date.fromisoformat(str(d)), "count": c} for l, d, c in buckets])
+    # Compteurs éventuellement corrigés : les détails de listes et le tableau de bord changent
+    db.query(models.DataVersion).filter(models.DataVersion.scope == "list")\
+        .update({models.DataVersion.version: models.DataVersion.version + 1}, synchronize_session=False)
+    bump_versions(db, *[("list", l) for l, _, _ in lists])
+    db.commit()
+    return {"lists": len(lists), "buckets": len(buckets)}
@@ -1,15 +1,26 @@
+import base64
 import csv
 import io
+import json
+from collections import Counter
 from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy import func, update, select, insert, tuple_, and_, or_
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
 from datetime import datetime, timedelta, date
 from app.models import vocabulaire as models
+from app.models import reviews as review_models
 from app.schemas import vocabulaire as schemas
+from app.services.srs import sm2_update, due_cutoff, DEFAULT_EASE
+from app.crud import stats as stats_crud
+from app.crud import search as search_crud
 
 # --- ANALYSES (TEXTES) ---
 def create_analysis(db: Session, item: schemas.AnalysisCreate):
     db_obj = models.Analysis(title=item.title, content=item.content, lang=item.lang)
     db.add(db_obj)
+    db.flush()
+    search_crud.index_analysis(db, db_obj)
+    stats_crud.bump_versions(db, ("analyses", 0))
     db.commit()
     db.refresh(db_obj)
     return db_obj
@@ -17,10 +28,15 @@ def create_analysis(db: Session, item: schemas.AnalysisCreate):
 def get_analyses(db: Session, skip: int = 0, limit: int = 100):
     return db.query(models.Analysis).order_by(models.Analysis.created_at.desc()).offset(skip).limit(limit).all()
 
+def get_analysis(db: Session, id: int):
+    return db.query(models.Analysis).filter(models.Analysis.id == id).first()
+
 def delete_analysis(db: Session, id: int):
     obj = db.query(models.Analysis).filter(models.Analysis.id == id).first()
     if obj:
         db.delete(obj)
+        search_crud.drop_analysis(db, id)
+        stats_crud.bump_versions(db, ("analyses", 0))
         db.commit()
         return True
     return False
@@ -29,6 +45,8 @@ def delete_analysis(db: Session, id: int):
 def create_list(db: Session, list_data: schemas.VocabListCreate):
     db_list = models.VocabList(title=list_data.title, description=list_data.description, lang=list_data.lang)
     db.add(db_list)
+    db.flush()
+    stats_crud.bump_versions(db, ("lists", 0), ("list", db_list.id))
     db.commit()
     db.refresh(db_list)
     return db_list
@@ -36,54 +54,233 @@ def create_list(db: Session, list_data: schemas.VocabListCreate):
 def get_lists(db: Session, skip: int = 0, limit: int = 100):
     return db.query(models.VocabList).offset(skip).limit(limit).all()
 
-def get_list_with_cards(db: Session, list_id: int):
-    return db.query(models.VocabList).filter(models.VocabList.id == list_id).first()
+def get_list_detail(db: Session, list_id: int):
+    """Métadonnées et compteurs de la liste, sans ses cartes (cf. get_list_cards)."""
+    db_list = db.query(models.VocabList).filter(models.VocabList.id == list_id).first()
+    if not db_list: return None
+    if stats_crud.has_counters(db):
+        row = next(iter(stats_crud.get_counters(db, list_id=list_id)), {"total": 0, "learned": 0, "due": 0})
+        counts = (row["total"], row["learned"], row["due"])
+    else:
+        row = stats_crud.scan_totals(db, list_id)
+        counts = (row["total_cards"], row["cards_learned"], row["due_today"])
+    detail = schemas.VocabListDetail.model_validate(db_list)
+    detail.card_count, detail.learned_count, detail.due_count = counts
+    return detail
+
+CARD_FIELDS = set(schemas.VocabCardResponse.model_fields)
+CARD_SORTS = {"id", "terme", "next_review", "streak"}
+
+def encode_card_cursor(value, card_id: int) -> str:
+    if isinstance(value, datetime): value = value.isoformat()
+    return base64.urlsafe_b64encode(json.dumps([value, card_id]).encode()).decode()
+
+def decode_card_cursor(cursor: str, sort: str) -> tuple:
+    value, card_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    if sort == "next_review" and value is not None: value = datetime.fromisoformat(value)
+    return value, int(card_id)
+
+def get_list_cards(db: Session, list_id: int, limit: int = 100, cursor: str = None, sort: str = "id", desc: bool = False,
+                   fields: list = None, prefix: str = None, pos: str = None,
+                   min_streak: int = None, max_streak: int = None, due_before: datetime = None):
+    """Page de cartes d'une liste : tri serveur, filtres, curseur keyset opaque sur (clé de tri, id).
+
+    fields limite les colonnes lues en base comme celles renvoyées (id toujours inclus).
+    Lève ValueError sur un tri, un champ ou un curseur invalide.
+    """
+    if sort not in CARD_SORTS: raise ValueError(f"Tri inconnu: {sort}")
+    fields = fields or sorted(CARD_FIELDS)
+    unknown = set(fields) - CARD_FIELDS
+    if unknown: raise ValueError(f"Champs inconnus: {', '.join(sorted(unknown))}")
+
+    card = models.VocabCard
+    key = getattr(card, sort)
+    columns = list(dict.fromkeys(["id", *fields, sort]))
+    query = db.query(*[getattr(card, c) for c in columns]).filter(card.list_id == list_id)
+    # Préfixe en bornes d'intervalle (SQLite) pour rester sur l'index (list_id, terme)
+    if prefix: query = query.filter(search_crud.prefix_filter(card.terme, prefix, db.get_bind().dialect.name))
+    if pos: query = query.filter(card.pos == pos)
+    if min_streak is not None: query = query.filter(card.streak >= min_streak)
+    if max_streak is not None: query = query.filter(card.streak <= max_streak)
+    if due_before is not None: query = query.filter(card.next_review <= due_before)
+    # Clés NULL (next_review jamais planifiée) en fin de tri dans les deux sens, départagées par id ;
+    # le curseur les encode telles quelles (null)
+    after = (lambda a, b: a < b) if desc else (lambda a, b: a > b)
+    if cursor:
+        value, last_id = decode_card_cursor(cursor, sort)
+        if sort == "id": query = query.filter(after(card.id, last_id))
+        elif value is None: query = query.filter(key.is_(None), after(card.id, last_id))
+        else: query = query.filter(or_(after(tuple_(key, card.id), tuple_(value, last_id)), key.is_(None)))
+    direction = (lambda c: c.desc()) if desc else (lambda c: c.asc())
+    order = [direction(key).nulls_last(), direction(card.id)] if sort != "id" else [direction(card.id)]
+    rows = query.order_by(*order).limit(limit + 1).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_card_cursor(getattr(rows[-1], sort), rows[-1].id)
+    keep = ["id", *[f for f in fields if f != "id"]]
+    return {"items": [{f: getattr(r, f) for f in keep} for r in rows], "next_cursor": next_cursor}
 
 def delete_list(db: Session, list_id: int):
     db_list = db.query(models.VocabList).filter(models.VocabList.id == list_id).first()
     if db_list:
         db.delete(db_list)
+        stats_crud.drop_list(db, list_id)
+        search_crud.drop_list(db, list_id)
+        stats_crud.bump_versions(db, ("lists", 0), ("list", list_id))
         db.commit()
         return True
     return False
 
 # --- SRS & CARTES ---
-def get_due_cards(db: Session, limit: int = 50, list_id: int = None):
-    now = datetime.now()
-    query = db.query(models.VocabCard).filter(models.VocabCard.next_review <= now)
+def _after(after):
+    """Curseur keyset : cartes strictement après (next_review, id) dans l'ordre de la file."""
+    return tuple_(models.VocabCard.next_review, models.VocabCard.id) > tuple_(*after)
+
+def get_due_cards(db: Session, limit: int = 50, list_id: int = None, after: tuple = None):
+    # Servi par les index (list_id, next_review, id) / (next_review, id) : coût indépendant de la taille du deck
+    query = db.query(models.VocabCard).filter(models.VocabCard.next_review < due_cutoff())
     if list_id: query = query.filter(models.VocabCard.list_id == list_id)
-    return query.order_by(models.VocabCard.next_review.asc()).limit(limit).all()
+    if after: query = query.filter(_after(after))
+    return query.order_by(models.VocabCard.next_review.asc(), models.VocabCard.id.asc()).limit(limit).all()
+
+def get_due_cards_interleaved(db: Session, limit: int = 50, after: dict = None):
+    """File alternant les listes (une carte de chacune à tour de rôle).
+
+    after : {list_id: (next_review, id)} -- dernière carte reçue de chaque liste.
+    Une seule requête : rang de chaque carte due dans sa liste (ROW_NUMBER), rangs <= limit,
+    triés par rang puis par liste -- l'entrelacement est fait par la base.
+    """
+    after = after or {}
+    card = models.VocabCard
+    due = card.next_review < due_cutoff()
+    if after:
+        due = and_(due, or_(card.list_id.notin_(after), *(and_(card.list_id == lid, _after(a)) for lid, a in after.items())))
+    rn = func.row_number().over(partition_by=card.list_id, order_by=(card.next_review, card.id)).label("rn")
+    ranked = select(card.id, card.list_id, rn).where(due).subquery()
+    return db.query(card).join(ranked, card.id == ranked.c.id).filter(ranked.c.rn <= limit)\
+        .order_by(ranked.c.rn, ranked.c.list_id).limit(limit).all()
+
+def increment_review_log(db: Session, day: date, count: int = 1):
+    """Incrément atomique du compteur du jour (pas de lecture-modification-écriture)."""
+    updated = db.query(models.ReviewLog).filter(models.ReviewLog.date == day)\
+        .update({models.ReviewLog.reviewed_count: models.ReviewLog.reviewed_count + count}, synchronize_session=False)
+    if updated: return
+    try:
+        with db.begin_nested():
+            db.add(models.ReviewLog(date=day, reviewed_count=count))
+    except IntegrityError:
+        # Ligne du jour créée entre-temps par une révision concurrente
+        db.query(models.ReviewLog).filter(models.ReviewLog.date == day)\
+            .update({models.ReviewLog.reviewed_count: models.ReviewLog.reviewed_count + count}, synchronize_session=False)
 
 def process_review(db: Session, card_id: int, quality: int):
     card = db.query(models.VocabCard).filter(models.VocabCard.id == card_id).first()
     if not card: return None
-    if quality < 3:
-        card.streak = 0
-        card.interval = 1 
-    else:
-        if card.streak == 0: card.interval = 1
-        elif card.streak == 1: card.interval = 6
-        else: card.interval = int(card.interval * card.ease_factor)
-        card.streak += 1
-        card.ease_factor = max(1.3, card.ease_factor + (0.1 - (5 - quality) * (0.08 + (5 - quality) * 0.02)))
+    old = (card.streak, card.next_review)
+    card.streak, card.interval, card.ease_factor = sm2_update(card.streak, card.interval, card.ease_factor, quality)
     card.next_review = datetime.now() + timedelta(days=card.interval)
-    today = date.today()
-    log = db.query(models.ReviewLog).filter(models.ReviewLog.date == today).first()
-    if not log:
-        log = models.ReviewLog(date=today, reviewed_count=0)
-        db.add(log)
-    log.reviewed_count += 1
+    increment_review_log(db, date.today())
+    delta = stats_crud.StatsDelta()
+    delta.change(card.list_id, old, (card.streak, card.next_review))
+    delta.apply(db)
     db.commit()
     db.refresh(card)
     return card
 
+# Identifiants de révisions appliquées conservés au-delà de tout renvoi plausible d'une file hors ligne
+APPLIED_REVIEWS_TTL = timedelta(days=30)
+
+def process_reviews_batch(db: Session, reviews: list[schemas.ReviewEvent]):
+    """Applique un lot de révisions en une transaction : 1 SELECT, 1 UPDATE groupé, 1 incrément par jour.
+    Idempotent pour les révisions munies d'un event_id : celles déjà appliquées sont ignorées."""
+    try:
+        return _apply_reviews_batch(db, reviews)
+    except IntegrityError:
+        # Même lot appliqué en parallèle (beacon + flush) : l'autre transaction a gagné, on rejoue sans ses révisions
+        db.rollback()
+        return _apply_reviews_batch(db, reviews)
+
+def _apply_reviews_batch(db: Session, reviews: list[schemas.ReviewEvent]):
+    now = datetime.now()
+    event_ids = {r.event_id for r in reviews if r.event_id}
+    seen = {row.event_id for row in db.query(review_models.AppliedReview.event_id)
+            .filter(review_models.AppliedReview.event_id.in_(event_ids))} if event_ids else set()
+    fresh, duplicates = [], 0
+    for r in reviews:
+        if r.event_id and r.event_id in seen:
+            duplicates += 1
+            continue
+        if r.event_id: seen.add(r.event_id)  # doublon dans le lot lui-même
+        fresh.append(r)
+    reviews = fresh
+    ids = {r.card_id for r in reviews}
+    card_cols = (models.VocabCard.id, models.VocabCard.list_id, models.VocabCard.streak, models.VocabCard.interval,
+                 models.VocabCard.ease_factor, models.VocabCard.next_review)
+    before = {row.id: row for row in db.query(*card_cols).filter(models.VocabCard.id.in_(ids))}
+    state = {id: [row.streak, row.interval, row.ease_factor, None] for id, row in before.items()}
+    per_day, missing = Counter(), set()
+    # Ordre chronologique : une carte révisée deux fois hors ligne enchaîne ses deux mises à jour
+    for r in sorted(reviews, key=lambda r: r.reviewed_at or now):
+        card = state.get(r.card_id)
+        if card is None:
+            missing.add(r.card_id)
+            continue
+        reviewed_at = r.reviewed_at or now
+        card[0], card[1], card[2] = sm2_update(card[0], card[1], card[2], r.quality)
+        card[3] = reviewed_at + timedelta(days=card[1])
+        per_day[reviewed_at.date()] += 1
+
+    rows = [
+        {"id": id, "streak": st, "interval": iv, "ease_factor": ef, "next_review": nr}
+        for id, (st, iv, ef, nr) in state.items() if nr is not None
+    ]
+    if rows: db.execute(update(models.VocabCard), rows)
+    for day, count in per_day.items(): increment_review_log(db, day, count)
+    delta = stats_crud.StatsDelta()
+    for row in rows:
+        old = before[row["id"]]
+        delta.change(old.list_id, (old.streak, old.next_review), (row["streak"], row["next_review"]))
+    delta.apply(db)
+    # Clé primaire : un envoi concurrent du même événement échoue ici (IntegrityError) au lieu de compter deux fois
+    applied_ids = [{"event_id": r.event_id, "applied_at": now} for r in reviews if r.event_id]
+    if applied_ids:
+        db.execute(insert(review_models.AppliedReview), applied_ids)
+        db.query(review_models.AppliedReview).filter(review_models.AppliedReview.applied_at < now - APPLIED_REVIEWS_TTL)\
+            .delete(synchronize_session=False)
+    db.commit()
+    return {"applied": sum(per_day.values()), "duplicates": duplicates, "missing": sorted(missing)}
+
 def get_dashboard_stats(db: Session):
-    total = db.query(models.VocabCard).count()
-    learned = db.query(models.VocabCard).filter(models.VocabCard.streak > 0).count()
-    due = db.query(models.VocabCard).filter(models.VocabCard.next_review <= datetime.now()).count()
+    # Compteurs maintenus (app/crud/stats.py) ; une seule requête sur les cartes s'ils n'existent pas encore
+    if stats_crud.has_counters(db):
+        per_list = stats_crud.get_counters(db)
+        totals = {
+            "total_cards": sum(l["total"] for l in per_list),
+            "cards_learned": sum(l["learned"] for l in per_list),
+            "due_today": sum(l["due"] for l in per_list),
+        }
+    else:
+        per_list, totals = [], stats_crud.scan_totals(db)
     logs = db.query(models.ReviewLog).order_by(models.ReviewLog.date.desc()).limit(60).all()
     heatmap = {str(log.date): log.reviewed_count for log in logs}
-    return {"total_cards": total, "cards_learned": learned, "due_today": due, "heatmap": heatmap}
+    return {**totals, "heatmap": heatmap, "lists": per_list}
+
+def get_schedule_rows(db: Session, list_ids: list = None) -> list:
+    """(list_id, streak, interval, ease_factor, next_review) de toutes les cartes, en une requête (prévisions)."""
+    card = models.VocabCard
+    query = select(card.list_id, func.coalesce(card.streak, 0), func.coalesce(card.interval, 0),
+                   func.coalesce(card.ease_factor, DEFAULT_EASE), card.next_review)
+    if list_ids: query = query.where(card.list_id.in_(list_ids))
+    return db.execute(query).all()
+
+def get_known_ent_seqs(db: Session, lang: str = None, list_ids: list = None) -> set:
+    """ent_seq des cartes existantes (une colonne, pas d'objets ORM), pour la couverture d'un document."""
+    query = select(models.VocabCard.ent_seq).where(models.VocabCard.ent_seq.is_not(None))
+    if list_ids: query = query.where(models.VocabCard.list_id.in_(list_ids))
+    elif lang: query = query.join(models.VocabList, models.VocabList.id == models.VocabCard.list_id).where(models.VocabList.lang == lang)
+    return set(db.scalars(query))
 
 def add_cards_to_list_bulk(db: Session, list_id: int, cards_data: list[schemas.VocabCardCreate]):
     existing = {s[0] for s in db.query(models.VocabCard.ent_seq).filter(models.VocabCard.list_id == list_id).all()}
@@ -98,6 +295,11 @@ def add_cards_to_list_bulk(db: Session, list_id: int, cards_data: list[schemas.V
             processed.add(card.ent_seq)
     if new_cards:
         db.add_all(new_cards)
+        db.flush()
+        delta = stats_crud.StatsDelta()
+        for c in new_cards: delta.add(list_id, c.streak, c.next_review)
+        delta.apply(db)
+        search_crud.index_cards(db, models.VocabCard.id.in_([c.id for c in new_cards]))
         db.commit()
         for c in new_cards: db.refresh(c)
     return new_cards
@@ -109,6 +311,11 @@ def add_card_to_list(db: Session, list_id: int, card_data: schemas.VocabCardCrea
         lecture=card_data.lecture, pos=card_data.pos, definitions=defs, context=card_data.context
     )
     db.add(c)
+    db.flush()
+    delta = stats_crud.StatsDelta()
+    delta.add(list_id, c.streak, c.next_review)
+    delta.apply(db)
+    search_crud.index_cards(db, models.VocabCard.id == c.id)
     db.commit()
     db.refresh(c)
     return c
@@ -116,49 +323,104 @@ def add_card_to_list(db: Session, list_id: int, card_data: schemas.VocabCardCrea
 def delete_card(db: Session, card_id: int):
     c = db.query(models.VocabCard).filter(models.VocabCard.id == card_id).first()
     if c:
+        delta = stats_crud.StatsDelta()
+        delta.remove(c.list_id, c.streak, c.next_review)
         db.delete(c)
+        delta.apply(db)
+        search_crud.drop_cards(db, [card_id])
         db.commit()
         return True
     return False
 
-def export_to_csv(db: Session) -> str:
+CSV_COLUMNS = ['list_title', 'terme', 'lecture', 'pos', 'definitions', 'context', 'ent_seq', 'streak', 'interval', 'next_review']
+EXPORT_BATCH = 2000
+IMPORT_CHUNK = 5000
+
+def iter_export_csv(db: Session):
+    """Export CSV en flux : curseur serveur (yield_per), un morceau de texte par lot de lignes."""
     output = io.StringIO()
     writer = csv.writer(output)
-    writer.writerow(['list_title', 'terme', 'lecture', 'pos', 'definitions', 'context', 'ent_seq', 'streak', 'interval', 'next_review'])
-    cards = db.query(models.VocabCard).join(models.VocabList).all()
-    for c in cards:
-        writer.writerow([
-            c.vocab_list.title, c.terme, c.lecture, c.pos, c.definitions, c.context or "",
-            c.ent_seq or "", c.streak, c.interval, c.next_review.isoformat() if c.next_review else ""
-        ])
-    return output.getvalue()
-
-def import_from_csv(db: Session, csv_content: str):
-    f = io.StringIO(csv_content)
-    reader = csv.DictReader(f)
+    writer.writerow(CSV_COLUMNS)
+    card = models.VocabCard
+    rows = db.execute(
+        select(models.VocabList.title, card.terme, card.lecture, card.pos, card.definitions, card.context,
+               card.ent_seq, card.streak, card.interval, card.next_review)
+        .join(models.VocabList, card.list_id == models.VocabList.id).order_by(card.id)
+        .execution_options(yield_per=EXPORT_BATCH))
+    for batch in rows.partitions():
+        for title, terme, lecture, pos, defs, context, ent_seq, streak, interval, next_review in batch:
+            writer.writerow([title, terme, lecture, pos, defs, context or "", ent_seq or "", streak, interval,
+                             next_review.isoformat() if next_review else ""])
+        yield output.getvalue()
+        output.seek(0)
+        output.truncate()
+    if output.tell(): yield output.getvalue()
+
+def export_to_csv(db: Session) -> str:
+    return "".join(iter_export_csv(db))
+
+def import_from_csv(db: Session, source):
+    """Import CSV par paquets : doublons (liste, terme) vérifiés en mémoire, insertions groupées, une transaction.
+
+    source : texte complet ou flux texte (lu au fil de l'eau).
+    """
+    reader = csv.DictReader(io.StringIO(source) if isinstance(source, str) else source)
     stats = {"cards_created": 0, "lists_created": 0, "errors": 0}
-    lists_cache = {l.title: l for l in db.query(models.VocabList).all()}
+    lists_cache = {title: id for id, title in db.query(models.VocabList.id, models.VocabList.title)}
+    known = {}  # list_id -> termes déjà présents (chargés à la première ligne de la liste)
+    delta = stats_crud.StatsDelta()
+    now = datetime.now()
+    last_id = db.query(func.max(models.VocabCard.id)).scalar() or 0  # cartes importées : id > last_id
+
+    def list_id_for(title: str) -> int:
+        if title not in lists_cache:
+            new_list = models.VocabList(title=title, description="Importé via CSV")
+            db.add(new_list)
+            db.flush()
+            lists_cache[title] = new_list.id
+            stats["lists_created"] += 1
+        list_id = lists_cache[title]
+        if list_id not in known:
+            known[list_id] = {t for (t,) in db.query(models.VocabCard.terme).filter(models.VocabCard.list_id == list_id)}
+        return list_id
+
+    def insert_rows(rows: list):
+        with db.begin_nested():
+            db.execute(insert(models.VocabCard), rows)
+        for r in rows: delta.add(r["list_id"], r["streak"], r["next_review"])
+        stats["cards_created"] += len(rows)
+
+    def flush(rows: list):
+        if not rows: return
+        try:
+            insert_rows(rows)
+        except (SQLAlchemyError, OverflowError):
+            # Paquet refusé par la base (longueur, type ; OverflowError côté pilote sqlite3) :
+            # repris ligne à ligne sous savepoint, lignes rejetées comptées en erreur
+            for r in rows:
+                try: insert_rows([r])
+                except (SQLAlchemyError, OverflowError):
+                    known[r["list_id"]].discard(r["terme"])
+                    stats["errors"] += 1
+        rows.clear()
+
+    pending = []
     for row in reader:
         try:
-            list_title = row.get('list_title', 'Import Default')
-            if list_title not in lists_cache:
-                new_list = models.VocabList(title=list_title, description="Importé via CSV")
-                db.add(new_list)
-                db.commit()
-                db.refresh(new_list)
-                lists_cache[list_title] = new_list
-                stats["lists_created"] += 1
-            current_list = lists_cache[list_title]
-            exists = db.query(models.VocabCard).filter(models.VocabCard.list_id == current_list.id, models.VocabCard.terme == row['terme']).first()
-            if not exists:
-                ent_seq = int(row['ent_seq']) if row.get('ent_seq') else None
-                new_card = models.VocabCard(
-                    list_id=current_list.id, terme=row['terme'], lecture=row.get('lecture'),
-                    pos=row.get('pos'), definitions=row.get('definitions'), context=row.get('context'),
-                    ent_seq=ent_seq, streak=int(row.get('streak', 0)), interval=int(row.get('interval', 0))
-                )
-                db.add(new_card)
-                stats["cards_created"] += 1
+            list_id = list_id_for(row.get('list_title') or 'Import Default')
+            if row['terme'] in known[list_id]: continue
+            pending.append({
+                "list_id": list_id, "terme": row['terme'], "lecture": row.get('lecture'), "pos": row.get('pos'),
+                "definitions": row.get('definitions'), "context": row.get('context'),
+                "ent_seq": int(row['ent_seq']) if row.get('ent_seq') else None,
+                "streak": int(row.get('streak') or 0), "interval": int(row.get('interval') or 0), "next_review": now,
+            })
+            known[list_id].add(row['terme'])
         except: stats["errors"] += 1
+        if len(pending) >= IMPORT_CHUNK: flush(pending)
+    flush(pending)
+    delta.apply(db)
+    if stats["lists_created"]: stats_crud.bump_versions(db, ("lists", 0))
+    if stats["cards_created"]: search_crud.index_cards(db, models.VocabCard.id > last_id)
     db.commit()
-    return stats
\ No newline at end of file
+    return stats
@@ -0,0 +1,30 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.crud import vocabulaire as crud
+
+# Pendants asynchrones des fonctions CRUD des routes chaudes.
+# Le code SQL reste celui de app/crud/vocabulaire.py : run_sync l'exécute sur la connexion
+# asynchrone (asyncpg / aiosqlite) sans bloquer la boucle ni occuper un thread du threadpool.
+
+async def get_lists(db: AsyncSession, skip: int = 0, limit: int = 100):
+    return await db.run_sync(crud.get_lists, skip, limit)
+
+async def get_list_detail(db: AsyncSession, list_id: int):
+    return await db.run_sync(crud.get_list_detail, list_id)
+
+async def get_list_cards(db: AsyncSession, list_id: int, *args):
+    return await db.run_sync(crud.get_list_cards, list_id, *args)
+
+async def get_due_cards(db: AsyncSession, limit: int = 50, list_id: int = None, after: tuple = None):
+    return await db.run_sync(crud.get_due_cards, limit, list_id, after)
+
+async def get_due_cards_interleaved(db: AsyncSession, limit: int = 50, after: dict = None):
+    return await db.run_sync(crud.get_due_cards_interleaved, limit, after)
+
+async def process_review(db: AsyncSession, card_id: int, quality: int):
+    return await db.run_sync(crud.process_review, card_id, quality)
+
+async def process_reviews_batch(db: AsyncSession, reviews: list):
+    return await db.run_sync(crud.process_reviews_batch, reviews)
+
+async def get_dashboard_stats(db: AsyncSession):
+    return await db.run_sync(crud.get_dashboard_stats)
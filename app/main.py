@@ -1,22 +1,85 @@
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
-from fastapi.staticfiles import StaticFiles # <--- Nouveau
-from fastapi.responses import RedirectResponse
-from app.core.database import engine, Base
+from fastapi.responses import RedirectResponse, JSONResponse, PlainTextResponse
+from app.config import STATS_RECONCILE_HOURS, METRICS_ENABLED
+from app.core.database import engine, async_engine, Base, SessionLocal
+from app.crud import stats as stats_crud
+from app.crud import search as search_crud
+from app.models import indexes
 from app.routers import vocabulaire
+from app.services import analysis, result_cache, jobs, metrics, compression, static_assets
 
 # Création des tables
 Base.metadata.create_all(bind=engine)
+indexes.ensure_indexes(engine)
 
-app = FastAPI(title="Projet Okura")
+async def reconcile_stats_loop():
+    while True:
+        await asyncio.sleep(STATS_RECONCILE_HOURS * 3600)
+        try:
+            with SessionLocal() as db: await asyncio.to_thread(stats_crud.reconcile, db)
+        except Exception as e: print(f"Erreur réconciliation stats: {e}")
 
-# Enregistrement du router API
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Les moteurs NLP chauffent en parallèle pendant que le serveur accepte déjà les requêtes
+    analysis.warmup()
+    # Résultats d'analyse calculés avec d'anciens dictionnaires : inutilisables, on les purge
+    try:
+        with SessionLocal() as db: result_cache.purge_stale(db)
+    except Exception as e: print(f"Erreur purge cache d'analyse: {e}")
+    # Compteurs du tableau de bord : construits une fois depuis les cartes existantes
+    try:
+        with SessionLocal() as db:
+            if not stats_crud.has_counters(db): stats_crud.reconcile(db)
+    except Exception as e: print(f"Erreur initialisation stats: {e}")
+    # Index de recherche : construit une fois pour les bases antérieures à la recherche
+    try:
+        with SessionLocal() as db:
+            if search_crud.is_empty(db): search_crud.rebuild(db)
+    except Exception as e: print(f"Erreur initialisation recherche: {e}")
+    reconcile_task = asyncio.create_task(reconcile_stats_loop()) if STATS_RECONCILE_HOURS > 0 else None
+    await jobs.start()
+    yield
+    if reconcile_task: reconcile_task.cancel()
+    await jobs.stop()
+    analysis.shutdown()
+    if async_engine: await async_engine.dispose()
+
+app = FastAPI(title="Projet Okura", lifespan=lifespan)
+
+# Latences par route, requêtes SQL par requête, en-tête Server-Timing sur demande (X-Okura-Profile)
+if METRICS_ENABLED:
+    app.add_middleware(metrics.MetricsMiddleware)
+    metrics.instrument_engine(engine)
+    if async_engine: metrics.instrument_engine(async_engine.sync_engine)
+
+# Compression gzip / brotli (ajoutée en dernier : enveloppe tout, les métriques mesurent l'app seule)
+app.add_middleware(compression.CompressionMiddleware)
+
+# Enregistrement du router API (routes chaudes asynchrones en premier si le moteur async est actif)
+if async_engine:
+    from app.routers import vocabulaire_async
+    app.include_router(vocabulaire_async.router)
 app.include_router(vocabulaire.router)
 
 # --- NOUVEAU : Servir le Frontend ---
-# On monte le dossier "static" sur l'URL /static
-app.mount("/static", StaticFiles(directory="static"), name="static")
+# On monte le dossier "static" sur l'URL /static (précompressé, URL versionnées en cache immutable)
+app.mount("/static", static_assets.PrecompressedStaticFiles(directory="static"), name="static")
 
 # Redirection automatique de la racine (/) vers notre interface (/static/index.html)
 @app.get("/")
 def read_root():
-    return RedirectResponse(url="/static/index.html")
\ No newline at end of file
+    return RedirectResponse(url="/static/index.html")
+
+# Métriques au format Prometheus (propres à ce process)
+@app.get("/metrics", include_in_schema=False)
+def get_metrics():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+# Readiness : 200 quand l'exécuteur d'analyse et ses moteurs NLP sont prêts, 503 sinon
+@app.get("/ready")
+def readiness():
+    status = analysis.status()
+    return JSONResponse(status, status_code=200 if status["ready"] else 503)
@@ -0,0 +1,17 @@
+from datetime import datetime
+from sqlalchemy import Column, String, Integer, LargeBinary, DateTime
+from app.core.database import Base
+
+class AnalysisResult(Base):
+    """Résultat d'analyse persistant, adressé par contenu (hash texte + langue + version des dictionnaires).
+
+    Stocké à côté des `Analysis` mais sans clé étrangère : deux textes identiques partagent l'entrée.
+    """
+    __tablename__ = "analysis_results"
+
+    key = Column(String(64), primary_key=True)
+    lang = Column(String(8), nullable=False)
+    dict_version = Column(String(32), nullable=False, index=True)
+    size = Column(Integer, nullable=False)  # taille JSON décompressée
+    data = Column(LargeBinary, nullable=False)  # JSON AnalyzeResponse compressé (zlib)
+    created_at = Column(DateTime, default=datetime.now)
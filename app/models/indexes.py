@@ -0,0 +1,24 @@
+from sqlalchemy import Index
+from app.models import vocabulaire as models
+from app.models import search
+
+# Index de la file de révision (crud.get_due_cards) : filtre next_review <= maintenant,
+# tri (next_review, id) et curseur keyset sur ce même couple, avec ou sans liste.
+# Déclarés ici, sur les colonnes du modèle, pour être créés par create_all comme par ensure_indexes.
+
+DUE_INDEXES = [
+    Index("ix_vocab_cards_due", models.VocabCard.next_review, models.VocabCard.id),
+    Index("ix_vocab_cards_list_due", models.VocabCard.list_id, models.VocabCard.next_review, models.VocabCard.id),
+]
+
+# Pagination des cartes d'une liste (crud.get_list_cards) : tri / préfixe sur terme, tri par série
+CARD_INDEXES = [
+    Index("ix_vocab_cards_list_terme", models.VocabCard.list_id, models.VocabCard.terme, models.VocabCard.id),
+    Index("ix_vocab_cards_list_streak", models.VocabCard.list_id, models.VocabCard.streak, models.VocabCard.id),
+]
+
+def ensure_indexes(bind):
+    """create_all ignore les tables existantes : on ajoute les index manquants aux bases déjà créées."""
+    for index in DUE_INDEXES + CARD_INDEXES: index.create(bind=bind, checkfirst=True)
+    # Recherche : FTS5 (SQLite) ou pg_trgm (Postgres), hors métadonnées SQLAlchemy
+    search.ensure_fulltext(bind)
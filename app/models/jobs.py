@@ -0,0 +1,26 @@
+from datetime import datetime
+from sqlalchemy import Column, String, Integer, Text, LargeBinary, DateTime, ForeignKey
+from app.core.database import Base
+
+class IngestionJob(Base):
+    """Ingestion asynchrone d'un fichier (EPUB, HTML, TXT), chapitre par chapitre."""
+    __tablename__ = "ingestion_jobs"
+
+    id = Column(String(32), primary_key=True)
+    filename = Column(String, nullable=False)
+    lang = Column(String(8), default="jp")
+    status = Column(String(16), default="queued", index=True)  # queued | running | done | failed | cancelled
+    total_chapters = Column(Integer, default=0)
+    done_chapters = Column(Integer, default=0)
+    error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.now)
+    updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
+
+class IngestionChapter(Base):
+    __tablename__ = "ingestion_chapters"
+
+    job_id = Column(String(32), ForeignKey("ingestion_jobs.id", ondelete="CASCADE"), primary_key=True)
+    index = Column(Integer, primary_key=True)
+    title = Column(String, nullable=True)
+    sentence_count = Column(Integer, default=0)
+    data = Column(LargeBinary, nullable=False)  # JSON AnalyzeResponse compressé (zlib)
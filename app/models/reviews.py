@@ -0,0 +1,10 @@
+from sqlalchemy import Column, String, DateTime
+from app.core.database import Base
+
+class AppliedReview(Base):
+    """Identifiant (généré par le client) d'une révision déjà appliquée : un lot renvoyé
+    (beacon de fermeture puis flush, nouvel essai après une réponse perdue) n'est pas compté deux fois."""
+    __tablename__ = "applied_reviews"
+
+    event_id = Column(String(64), primary_key=True)
+    applied_at = Column(DateTime, nullable=False, index=True)
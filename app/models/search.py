@@ -0,0 +1,63 @@
+from sqlalchemy import Column, Integer, String, Text, Index, text
+from sqlalchemy.exc import DBAPIError
+from app.core.database import Base
+
+# Index de recherche (cf. app/crud/search.py) : une ligne par carte ou analyse enregistrée,
+# texte normalisé (NFKC, minuscules, katakana -> hiragana, traditionnel -> simplifié) à l'indexation.
+# Plein texte : FTS5 (tokenizer trigram) sur SQLite, pg_trgm (GIN) sur Postgres.
+
+class SearchDocument(Base):
+    __tablename__ = "search_documents"
+
+    id = Column(Integer, primary_key=True)
+    kind = Column(String(8), nullable=False)  # "card" | "analysis"
+    ref_id = Column(Integer, nullable=False)
+    list_id = Column(Integer)                 # cartes seulement
+    key = Column(String)                      # terme (carte) ou titre (analyse) normalisé
+    reading = Column(String)                  # lecture normalisée (cartes)
+    body = Column(Text, nullable=False)       # tout le texte cherchable, normalisé
+
+    __table_args__ = (
+        Index("ix_search_documents_ref", "kind", "ref_id"),
+        Index("ix_search_documents_key", "kind", "key", "id"),
+        Index("ix_search_documents_reading", "kind", "reading"),
+        Index("ix_search_documents_list", "list_id"),
+    )
+
+_SQLITE_FTS = [
+    # kind / list_id non indexés mais filtrables dans la requête FTS elle-même (avant LIMIT)
+    "CREATE VIRTUAL TABLE IF NOT EXISTS search_fts USING fts5("
+    "body, kind UNINDEXED, list_id UNINDEXED, content='search_documents', content_rowid='id', tokenize='trigram')",
+    "CREATE TRIGGER IF NOT EXISTS search_documents_ai AFTER INSERT ON search_documents BEGIN "
+    "INSERT INTO search_fts(rowid, body, kind, list_id) VALUES (new.id, new.body, new.kind, new.list_id); END",
+    "CREATE TRIGGER IF NOT EXISTS search_documents_ad AFTER DELETE ON search_documents BEGIN "
+    "INSERT INTO search_fts(search_fts, rowid, body, kind, list_id) VALUES ('delete', old.id, old.body, old.kind, old.list_id); END",
+    "CREATE TRIGGER IF NOT EXISTS search_documents_au AFTER UPDATE ON search_documents BEGIN "
+    "INSERT INTO search_fts(search_fts, rowid, body, kind, list_id) VALUES ('delete', old.id, old.body, old.kind, old.list_id); "
+    "INSERT INTO search_fts(rowid, body, kind, list_id) VALUES (new.id, new.body, new.kind, new.list_id); END",
+]
+_POSTGRES_TRGM = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX IF NOT EXISTS ix_search_documents_trgm ON search_documents USING gin (body gin_trgm_ops)",
+]
+
+def ensure_fulltext(bind) -> bool:
+    """Index plein texte propre au moteur. False s'il n'est pas disponible (SQLite < 3.34, extension
+    pg_trgm non autorisée) : la recherche retombe alors sur un LIKE non indexé."""
+    statements = {"sqlite": _SQLITE_FTS, "postgresql": _POSTGRES_TRGM}.get(bind.dialect.name)
+    if not statements: return False
+    try:
+        with bind.begin() as conn:
+            for statement in statements: conn.execute(text(statement))
+        return True
+    except DBAPIError as e:
+        print(f"Index plein texte indisponible ({bind.dialect.name}) : {e}")
+        return False
+
+def has_fulltext(bind) -> bool:
+    with bind.connect() as conn:
+        if bind.dialect.name == "sqlite":
+            return conn.execute(text("SELECT 1 FROM sqlite_master WHERE name = 'search_fts'")).first() is not None
+        if bind.dialect.name == "postgresql":
+            return conn.execute(text("SELECT 1 FROM pg_indexes WHERE indexname = 'ix_search_documents_trgm'")).first() is not None
+    return False
@@ -0,0 +1,32 @@
+from sqlalchemy import Column, Integer, String, Date, DateTime
+from app.core.database import Base
+
+# Compteurs du tableau de bord, maintenus au fil des ajouts / révisions / suppressions
+# (cf. app/crud/stats.py) pour ne plus compter toute la table VocabCard à chaque affichage.
+
+class ListStats(Base):
+    __tablename__ = "list_stats"
+
+    list_id = Column(Integer, primary_key=True)
+    total = Column(Integer, nullable=False, default=0)
+    learned = Column(Integer, nullable=False, default=0)  # streak > 0
+
+class ListDueBucket(Base):
+    """Nombre de cartes d'une liste dont la prochaine révision tombe tel jour."""
+    __tablename__ = "list_due_buckets"
+
+    list_id = Column(Integer, primary_key=True)
+    day = Column(Date, primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+
+class DataVersion(Base):
+    """Compteur incrémenté à chaque écriture d'une ressource : ETag / Last-Modified des lectures.
+    scope "list" (key = list_id) : la liste et ses cartes ; "lists" : le catalogue des listes ;
+    "analyses" : les textes enregistrés. Le tableau de bord agrège tout le scope "list" (crud.get_versions).
+    Jamais supprimé ni remis à zéro : un identifiant de liste réutilisé ne ressert pas un ancien ETag."""
+    __tablename__ = "data_versions"
+
+    scope = Column(String(16), primary_key=True)
+    key = Column(Integer, primary_key=True, default=0)
+    version = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, nullable=False)
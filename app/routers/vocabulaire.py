@@ -1,62 +1,295 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form
-from fastapi.responses import Response
+import io
+import json
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, Request, Query
+from fastapi.responses import Response, StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from datetime import datetime
 from typing import List, Optional
 from sqlalchemy.orm import Session
-from app.core.database import get_db
+from app.core.database import get_db, SessionLocal
 from app.schemas import vocabulaire as schemas
 from app.crud import vocabulaire as crud
-from app.services import nlp 
+from app.crud import stats as stats_crud
+from app.crud import search as search_crud
+from app.services import nlp, analysis, result_cache, incremental, jobs, wire, metrics, profile, forecast, srs, http_cache
+from app.config import FORECAST_RECALL, FORECAST_MAX_DAYS
 
 router = APIRouter(prefix="/lists", tags=["Listes"])
 
+# --- VALIDATION HTTP ---
+# Lectures fréquentes (sondées par static/app.js) : 304 si la version n'a pas bougé, cf. app/services/http_cache.py
+def revalidate(request: Request, response: Response, db: Session, *keys, daily: bool = False):
+    return http_cache.check(request, response, *stats_crud.get_versions(db, list(keys)), daily=daily)
+
 # --- ANALYSE FICHIER ---
+async def extract_upload_text(file: UploadFile) -> str:
+    filename = file.filename.lower()
+
+    # Extraction selon format ; l'EPUB est lu directement depuis le fichier d'upload (spooled)
+    if filename.endswith('.epub'):
+        return await run_in_threadpool(nlp.extract_text_from_epub, file.file)
+    content = await file.read()
+    decoded = nlp.decode_text_bytes(content)
+    if filename.endswith('.html') or filename.endswith('.htm'):
+        return nlp.clean_html_text(decoded)
+    return nlp.clean_raw_text(decoded)
+
+# Cache adressé par contenu : un texte déjà analysé (même langue, mêmes dictionnaires)
+# est renvoyé tel quel, sans re-tokenisation ni re-validation Pydantic.
+async def cached_analysis(db: Session, text: str, lang: str, wire_format: Optional[str] = None, raw_text: bool = True) -> Response:
+    # wire_format : None (AnalyzeResponse JSON) ou format compact négocié par wire.negotiate
+    key = result_cache.cache_key(text, lang)
+    payload = await run_in_threadpool(result_cache.load, db, key)
+    if payload is None:
+        result, payload = await analyze_and_store(db, key, text, lang)
+        if wire_format:
+            with metrics.stage("serialize", lang=lang): return await run_in_threadpool(wire.render, result, wire_format, raw_text)
+    if wire_format:
+        # Décodage + ré-encodage de tout le document : dans le threadpool, pas sur la boucle
+        with metrics.stage("serialize", lang=lang):
+            return await run_in_threadpool(lambda: wire.render(json.loads(payload), wire_format, raw_text))
+    return Response(content=payload, media_type="application/json")
+
+async def analyze_and_store(db: Session, key: str, text: str, lang: str):
+    # Analyse hors boucle d'événements (pool de process), renvoie aussi 'raw_text' ;
+    # sérialisation aussi (validation + dump d'un livre : plusieurs secondes)
+    result = await analysis.analyze_text_async(text, lang=lang)
+    with metrics.stage("serialize", lang=lang): payload = await run_in_threadpool(result_cache.encode_result, result)
+    await run_in_threadpool(result_cache.store, db, key, lang, payload)
+    return result, payload
+
 @router.post("/analyze/file", response_model=schemas.AnalyzeResponse)
-async def analyze_file(file: UploadFile = File(...), lang: str = Form("jp")):
+async def analyze_file(request: Request, file: UploadFile = File(...), lang: str = Form("jp"), format: Optional[str] = None, db: Session = Depends(get_db)):
     try:
-        content = await file.read()
-        filename = file.filename.lower()
-        text = ""
-
-        # Extraction selon format
-        if filename.endswith('.epub'):
-            text = nlp.extract_text_from_epub(content)
-        elif filename.endswith('.html') or filename.endswith('.htm'):
-            try: decoded = content.decode('utf-8')
-            except: decoded = content.decode('shift_jis', errors='ignore')
-            text = nlp.clean_html_text(decoded)
-        else:
-            try: decoded = content.decode('utf-8')
-            except: decoded = content.decode('shift_jis', errors='ignore')
-            text = nlp.clean_raw_text(decoded)
-            
+        text = await extract_upload_text(file)
         if not text.strip(): raise HTTPException(400, "Fichier vide")
-        
-        # Appel à la fonction d'analyse qui renvoie maintenant 'raw_text'
-        return nlp.analyze_text(text, lang=lang)
+        return await cached_analysis(db, text, lang, wire.negotiate(request, format))
         
     except Exception as e:
         raise HTTPException(400, f"Erreur traitement: {str(e)}")
 
+# --- ANALYSE EN FLUX (NDJSON / SSE) ---
+# Un enregistrement par ligne : {"type": "meta"|"sentence"|"done"|"error", ...}
+def stream_analysis(request: Request, text: str, lang: str, fmt: Optional[str], raw_text: bool = False,
+                    cached: Optional[bytes] = None, key: Optional[str] = None):
+    sse = fmt == "sse" or (fmt is None and "text/event-stream" in request.headers.get("accept", ""))
+
+    def encode(record):
+        line = json.dumps(record, ensure_ascii=False)
+        return f"event: {record['type']}\ndata: {line}\n\n" if sse else line + "\n"
+
+    async def body():
+        if raw_text: yield encode({"type": "meta", "raw_text": text})
+        count = 0
+        sentences = (await run_in_threadpool(json.loads, cached))["sentences"] if cached is not None else None
+        produced = []  # analyse complète : stockée dans le cache de résultats à la fin du flux
+        try:
+            async for tokens in _aiter(sentences) if sentences is not None else analysis.iter_analyze_async(text, lang):
+                yield encode({"type": "sentence", "index": count, "tokens": tokens})
+                if sentences is None: produced.append(tokens)
+                count += 1
+        except Exception as e:
+            yield encode({"type": "error", "detail": str(e)})
+            return
+        if sentences is None and key is not None:
+            try: await run_in_threadpool(_store_streamed, key, lang, {"sentences": produced, "raw_text": text})
+            except Exception as e: print(f"Erreur cache résultat (flux): {e}")
+        # Empreinte + hashs de lignes : permettent au client de passer ensuite par /analyze/incremental
+        hashes = [incremental.line_hash(l) for l in text.splitlines()]
+        yield encode({"type": "done", "count": count, "fingerprint": incremental.fingerprint(lang, hashes), "line_hashes": hashes})
+
+    media_type = "text/event-stream" if sse else "application/x-ndjson"
+    return StreamingResponse(body(), media_type=media_type, headers={"Cache-Control": "no-cache"})
+
+def parse_due_cursor(value: str) -> tuple:
+    """'next_review,id' -> (datetime, id) ; 'list_id,next_review,id' -> (list_id, datetime, id)."""
+    parts = value.split(",")
+    if len(parts) not in (2, 3): raise ValueError(value)
+    head = (int(parts[0]),) if len(parts) == 3 else ()
+    return head + (datetime.fromisoformat(parts[-2]), int(parts[-1]))
+
+def parse_due_cursors(after: List[str]) -> list:
+    try:
+        return [parse_due_cursor(a) for a in after]
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Curseur 'after' invalide")
+
+async def _aiter(items):
+    for item in items: yield item
+
+def _store_streamed(key: str, lang: str, result: dict):
+    # Session propre : celle de la requête est fermée quand le flux se termine
+    payload = result_cache.encode_result(result)
+    with SessionLocal() as db: result_cache.store(db, key, lang, payload)
+
+# En flux, un résultat en cache est rejoué ; sinon l'analyse est stockée une fois le flux terminé
+@router.post("/analyze/stream")
+async def analyze_text_stream(request: Request, item: schemas.AnalyzeRequest, format: Optional[str] = None, db: Session = Depends(get_db)):
+    key = result_cache.cache_key(item.text, item.lang)
+    cached = await run_in_threadpool(result_cache.load, db, key)
+    return stream_analysis(request, item.text, item.lang, format, cached=cached, key=key)
+
+@router.post("/analyze/file/stream")
+async def analyze_file_stream(request: Request, file: UploadFile = File(...), lang: str = Form("jp"), format: Optional[str] = None, db: Session = Depends(get_db)):
+    try: text = await extract_upload_text(file)
+    except Exception as e: raise HTTPException(400, f"Erreur traitement: {str(e)}")
+    if not text.strip(): raise HTTPException(400, "Fichier vide")
+    key = result_cache.cache_key(text, lang)
+    cached = await run_in_threadpool(result_cache.load, db, key)
+    return stream_analysis(request, text, lang, format, raw_text=True, cached=cached, key=key)
+
+# --- INGESTION ASYNCHRONE (jobs) ---
+# Le fichier est mis en file et analysé chapitre par chapitre ; le client suit la progression
+# et récupère les chapitres (pages) au fil de l'eau, sans garder de requête ouverte.
+@router.post("/analyze/jobs", response_model=schemas.IngestionJobResponse)
+async def submit_ingestion_job(file: UploadFile = File(...), lang: str = Form("jp")):
+    content = await file.read()
+    if not content: raise HTTPException(400, "Fichier vide")
+    job = await jobs.submit(file.filename, content, lang)
+    return jobs.job_status_from(job)
+
+@router.get("/analyze/jobs/{job_id}", response_model=schemas.IngestionJobResponse)
+def get_ingestion_job(job_id: str, db: Session = Depends(get_db)):
+    status = jobs.job_status(db, job_id)
+    if not status: raise HTTPException(404)
+    return status
+
+@router.get("/analyze/jobs/{job_id}/chapters/{index}", response_model=schemas.AnalyzeResponse)
+async def get_ingestion_chapter(request: Request, job_id: str, index: int, format: Optional[str] = None, db: Session = Depends(get_db)):
+    payload = await run_in_threadpool(jobs.chapter_payload, db, job_id, index)
+    if payload is None: raise HTTPException(404)
+    wire_format = wire.negotiate(request, format)
+    if wire_format: return await run_in_threadpool(lambda: wire.render(json.loads(payload), wire_format))
+    return Response(content=payload, media_type="application/json")
+
+@router.delete("/analyze/jobs/{job_id}")
+def cancel_ingestion_job(job_id: str, db: Session = Depends(get_db)):
+    if not jobs.cancel(db, job_id): raise HTTPException(404)
+    return {"ok": True}
+
 # ... (Le reste du fichier reste identique) ...
 @router.post("/analyze", response_model=schemas.AnalyzeResponse)
-def analyze_text(request: schemas.AnalyzeRequest):
-    return nlp.analyze_text(request.text, lang=request.lang)
+async def analyze_text(request: schemas.AnalyzeRequest, http_request: Request, format: Optional[str] = None, db: Session = Depends(get_db)):
+    # Format compact : le client a déjà le texte, raw_text n'est pas renvoyé
+    return await cached_analysis(db, request.text, request.lang, wire.negotiate(http_request, format), raw_text=False)
+
+# Ré-analyse d'un texte modifié : seules les lignes changées depuis `fingerprint` sont traitées
+@router.post("/analyze/incremental", response_model=schemas.AnalyzeIncrementalResponse)
+async def analyze_text_incremental(request: schemas.AnalyzeIncrementalRequest):
+    return await incremental.analyze_incremental(request.text, request.lang, request.fingerprint, request.line_hashes)
+
+# Profil de vocabulaire : fréquences, niveaux JLPT, couverture par les cartes existantes,
+# et mots fréquents encore inconnus (ajoutables via /{list_id}/cards/bulk)
+def _profile_job(db: Session, job_id: str, doc: profile.DocumentProfile) -> str:
+    status = jobs.job_status(db, job_id)
+    if not status: raise HTTPException(404)
+    if status["status"] != "done": raise HTTPException(409, "Ingestion non terminée")
+    # Chapitre par chapitre : le livre entier n'est jamais décodé d'un coup
+    for chapter in status["chapters"]:
+        doc.add(json.loads(jobs.chapter_payload(db, job_id, chapter["index"]))["sentences"])
+    return status["lang"]
+
+@router.post("/analyze/profile", response_model=schemas.DocumentProfile)
+async def analyze_profile(request: schemas.ProfileRequest, db: Session = Depends(get_db)):
+    doc, lang = profile.DocumentProfile(), request.lang
+    if request.job_id:
+        lang = await run_in_threadpool(_profile_job, db, request.job_id, doc)
+    else:
+        text = request.text
+        if request.analysis_id is not None:
+            obj = await run_in_threadpool(crud.get_analysis, db, request.analysis_id)
+            if not obj: raise HTTPException(404)
+            text, lang = obj.content, obj.lang or "jp"
+        if not text or not text.strip(): raise HTTPException(400, "Texte vide")
+        key = result_cache.cache_key(text, lang)
+        payload = await run_in_threadpool(result_cache.load, db, key)
+        if payload is not None:
+            # Décodage du résultat en cache (un livre : plusieurs Mo) hors boucle d'événements, avec le comptage
+            with metrics.stage("profile", lang=lang): await run_in_threadpool(lambda: doc.add(json.loads(payload)["sentences"]))
+        else:
+            sentences = (await analyze_and_store(db, key, text, lang))[0]["sentences"]
+            with metrics.stage("profile", lang=lang): await run_in_threadpool(doc.add, sentences)
+    known = await run_in_threadpool(crud.get_known_ent_seqs, db, lang, request.list_ids)
+    with metrics.stage("profile", lang=lang): return doc.result(known, request.top, request.candidates)
+
+@router.get("/analyze/stats")
+async def analyze_cache_stats():
+    stats = await analysis.cache_stats()
+    stats["results"] = result_cache.stats()
+    return stats
 
 @router.get("/data/export")
-def export_data(db: Session = Depends(get_db)):
-    return Response(content=crud.export_to_csv(db), media_type="text/csv", headers={"Content-Disposition": "attachment; filename=okura_backup.csv"})
+def export_data():
+    # Session propre au flux : celle de get_db est fermée avant la fin de l'envoi
+    def rows():
+        with SessionLocal() as db: yield from crud.iter_export_csv(db)
+    return StreamingResponse(rows(), media_type="text/csv", headers={"Content-Disposition": "attachment; filename=okura_backup.csv"})
 
 @router.post("/data/import")
 async def import_data(file: UploadFile = File(...), db: Session = Depends(get_db)):
-    content = await file.read()
-    return {"message": "Import terminé", "details": crud.import_from_csv(db, content.decode('utf-8'))}
+    # Lecture du fichier reçu au fil de l'eau, sans le décoder en entier
+    text = io.TextIOWrapper(file.file, encoding='utf-8-sig', newline='')
+    try:
+        details = await run_in_threadpool(crud.import_from_csv, db, text)
+    finally:
+        text.detach()
+    return {"message": "Import terminé", "details": details}
 
 @router.get("/dashboard/stats", response_model=schemas.DashboardStats)
-def get_dashboard(db: Session = Depends(get_db)): return crud.get_dashboard_stats(db)
+def get_dashboard(request: Request, response: Response, db: Session = Depends(get_db)):
+    return revalidate(request, response, db, ("list", None), daily=True) or crud.get_dashboard_stats(db)
+
+@router.post("/dashboard/stats/reconcile")
+def reconcile_dashboard(db: Session = Depends(get_db)): return stats_crud.reconcile(db)
+
+# Charge de révision des prochains jours, simulée sur tout le deck (NumPy, extra "forecast")
+def run_forecast(db: Session, request: schemas.ForecastRequest):
+    if forecast.np is None: raise HTTPException(501, "Prévisions indisponibles : installer l'extra forecast (numpy)")
+    if not 1 <= request.days <= FORECAST_MAX_DAYS: raise HTTPException(400, f"days : entre 1 et {FORECAST_MAX_DAYS}")
+    recall = request.recall or FORECAST_RECALL
+    if not all(0 <= p <= 1 for p in recall): raise HTTPException(400, "recall : probabilités entre 0 et 1")
+    # Qualités SM-2 : réussite 3-5, échec 0-2 (sinon la simulation compte une réussite comme un échec)
+    if not 3 <= request.pass_quality <= 5: raise HTTPException(400, "pass_quality : entre 3 et 5")
+    if not 0 <= request.fail_quality <= 2: raise HTTPException(400, "fail_quality : entre 0 et 2")
+    overrides = {k: v for k, v in {"min_ease": request.min_ease, "max_ease": request.max_ease, "fail_interval": request.fail_interval,
+                                   "steps": tuple(request.steps) if request.steps is not None else None}.items() if v is not None}
+    params = srs.DEFAULT_PARAMS._replace(**overrides)
+    deck = forecast.Deck(crud.get_schedule_rows(db, request.list_ids))
+    return forecast.simulate(deck, request.days, recall, params, request.pass_quality, request.fail_quality, request.seed)
+
+@router.get("/dashboard/forecast", response_model=schemas.Forecast)
+def get_forecast(days: int = 30, list_id: Optional[int] = None, db: Session = Depends(get_db)):
+    return run_forecast(db, schemas.ForecastRequest(days=days, list_ids=[list_id] if list_id is not None else None))
+
+@router.post("/dashboard/forecast", response_model=schemas.Forecast)
+def simulate_forecast(request: schemas.ForecastRequest, db: Session = Depends(get_db)):
+    return run_forecast(db, request)
+
+# --- RECHERCHE ---
+# Cartes (terme, lecture, définitions, contexte) ou analyses enregistrées, texte normalisé et indexé
+@router.get("/search", response_model=schemas.SearchResults)
+def search(q: str, kind: str = "card", list_id: Optional[int] = None, limit: int = Query(20, ge=1, le=100),
+           offset: int = Query(0, ge=0), db: Session = Depends(get_db)):
+    if kind not in ("card", "analysis"): raise HTTPException(400, "kind : card ou analysis")
+    return search_crud.search(db, q, kind, list_id, limit, offset)
+
+@router.post("/search/reindex")
+def reindex_search(db: Session = Depends(get_db)):
+    return search_crud.rebuild(db)
 
 @router.get("/training/due", response_model=List[schemas.VocabCardResponse])
-def get_due_cards(limit: int = 50, list_id: Optional[int] = None, db: Session = Depends(get_db)):
-    return crud.get_due_cards(db, limit, list_id)
+def get_due_cards(limit: int = 50, list_id: Optional[int] = None, interleave: bool = False,
+                  after: List[str] = Query([]), db: Session = Depends(get_db)):
+    # after : "next_review,id" de la dernière carte reçue (ou "list_id,next_review,id" par liste en mode interleave)
+    cursor = parse_due_cursors(after)
+    if interleave and not list_id:
+        return crud.get_due_cards_interleaved(db, limit, {c[0]: c[1:] for c in cursor if len(c) == 3})
+    return crud.get_due_cards(db, limit, list_id, cursor[-1][-2:] if cursor else None)
+
+# Révisions par lot (file hors ligne du client) : une seule transaction
+@router.post("/cards/review/batch", response_model=schemas.ReviewBatchResult)
+def review_cards_batch(reviews: List[schemas.ReviewEvent], db: Session = Depends(get_db)):
+    return crud.process_reviews_batch(db, reviews)
 
 @router.post("/cards/{card_id}/review", response_model=schemas.VocabCardResponse)
 def review_card(card_id: int, review: schemas.ReviewAttempt, db: Session = Depends(get_db)):
@@ -67,23 +300,38 @@ def create_list(item: schemas.VocabListCreate, db: Session = Depends(get_db)):
     return crud.create_list(db, item)
 
 @router.get("/", response_model=List[schemas.VocabListResponse])
-def get_lists(skip: int = 0, limit: int = 20, db: Session = Depends(get_db)):
-    return crud.get_lists(db, skip, limit)
+def get_lists(request: Request, response: Response, skip: int = 0, limit: int = 20, db: Session = Depends(get_db)):
+    return revalidate(request, response, db, ("lists", 0)) or crud.get_lists(db, skip, limit)
 
-@router.get("/{list_id}", response_model=schemas.VocabListWithCards)
-def get_list_details(list_id: int, db: Session = Depends(get_db)):
-    return crud.get_list_with_cards(db, list_id)
+@router.get("/{list_id:int}", response_model=schemas.VocabListDetail)
+def get_list_details(request: Request, response: Response, list_id: int, db: Session = Depends(get_db)):
+    if not_modified := revalidate(request, response, db, ("list", list_id), daily=True): return not_modified
+    detail = crud.get_list_detail(db, list_id)
+    if not detail: raise HTTPException(404)
+    return detail
 
-@router.delete("/{list_id}")
+@router.get("/{list_id:int}/cards", response_model=schemas.CardPage)
+def get_list_cards(request: Request, response: Response, list_id: int, limit: int = Query(100, ge=1, le=1000), cursor: Optional[str] = None,
+                   sort: str = "id", order: str = "asc", fields: Optional[str] = None, prefix: Optional[str] = None,
+                   pos: Optional[str] = None, min_streak: Optional[int] = None, max_streak: Optional[int] = None,
+                   due_before: Optional[datetime] = None, db: Session = Depends(get_db)):
+    if not_modified := revalidate(request, response, db, ("list", list_id)): return not_modified
+    try:
+        return crud.get_list_cards(db, list_id, limit, cursor, sort, order == "desc",
+                                   fields.split(",") if fields else None, prefix, pos, min_streak, max_streak, due_before)
+    except (ValueError, TypeError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.delete("/{list_id:int}")
 def delete_list(list_id: int, db: Session = Depends(get_db)):
     if not crud.delete_list(db, list_id): raise HTTPException(404)
     return {"ok": True}
 
-@router.post("/{list_id}/cards", response_model=schemas.VocabCardResponse)
+@router.post("/{list_id:int}/cards", response_model=schemas.VocabCardResponse)
 def add_card(list_id: int, item: schemas.VocabCardCreate, db: Session = Depends(get_db)):
     return crud.add_card_to_list(db, list_id, item)
 
-@router.post("/{list_id}/cards/bulk", response_model=List[schemas.VocabCardResponse])
+@router.post("/{list_id:int}/cards/bulk", response_model=List[schemas.VocabCardResponse])
 def add_cards_bulk(list_id: int, items: List[schemas.VocabCardCreate], db: Session = Depends(get_db)):
     return crud.add_cards_to_list_bulk(db, list_id, items)
 
@@ -96,8 +344,14 @@ def create_analysis(item: schemas.AnalysisCreate, db: Session = Depends(get_db))
     return crud.create_analysis(db, item)
 
 @router.get("/analyses/", response_model=List[schemas.AnalysisResponse])
-def get_analyses(db: Session = Depends(get_db)):
-    return crud.get_analyses(db)
+def get_analyses(request: Request, response: Response, db: Session = Depends(get_db)):
+    return revalidate(request, response, db, ("analyses", 0)) or crud.get_analyses(db)
+
+@router.get("/analyses/{id}/result", response_model=schemas.AnalyzeResponse)
+async def get_analysis_result(id: int, request: Request, format: Optional[str] = None, db: Session = Depends(get_db)):
+    obj = await run_in_threadpool(crud.get_analysis, db, id)
+    if not obj: raise HTTPException(404)
+    return await cached_analysis(db, obj.content, obj.lang or "jp", wire.negotiate(request, format), raw_text=False)
 
 @router.delete("/analyses/{id}")
 def delete_analysis(id: int, db: Session = Depends(get_db)):
@@ -0,0 +1,61 @@
+from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from typing import List, Optional
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.database import get_async_db
+from app.schemas import vocabulaire as schemas
+from app.crud import vocabulaire_async as crud
+from app.crud import stats as stats_crud
+from app.services import http_cache
+from app.routers.vocabulaire import parse_due_cursors
+
+# Routes chaudes servies par le moteur asynchrone (OKURA_DB_ASYNC=1).
+# Incluses avant app.routers.vocabulaire : à chemin égal, ce sont elles qui répondent.
+# {list_id:int} : les chemins fixes du router synchrone (/search, /analyses/...) ne sont pas capturés.
+router = APIRouter(prefix="/lists", tags=["Listes"])
+
+async def revalidate(request: Request, response: Response, db: AsyncSession, *keys, daily: bool = False):
+    return http_cache.check(request, response, *await db.run_sync(stats_crud.get_versions, list(keys)), daily=daily)
+
+@router.get("/dashboard/stats", response_model=schemas.DashboardStats)
+async def get_dashboard(request: Request, response: Response, db: AsyncSession = Depends(get_async_db)):
+    return await revalidate(request, response, db, ("list", None), daily=True) or await crud.get_dashboard_stats(db)
+
+@router.get("/training/due", response_model=List[schemas.VocabCardResponse])
+async def get_due_cards(limit: int = 50, list_id: Optional[int] = None, interleave: bool = False,
+                        after: List[str] = Query([]), db: AsyncSession = Depends(get_async_db)):
+    cursor = parse_due_cursors(after)
+    if interleave and not list_id:
+        return await crud.get_due_cards_interleaved(db, limit, {c[0]: c[1:] for c in cursor if len(c) == 3})
+    return await crud.get_due_cards(db, limit, list_id, cursor[-1][-2:] if cursor else None)
+
+@router.post("/cards/review/batch", response_model=schemas.ReviewBatchResult)
+async def review_cards_batch(reviews: List[schemas.ReviewEvent], db: AsyncSession = Depends(get_async_db)):
+    return await crud.process_reviews_batch(db, reviews)
+
+@router.post("/cards/{card_id}/review", response_model=schemas.VocabCardResponse)
+async def review_card(card_id: int, review: schemas.ReviewAttempt, db: AsyncSession = Depends(get_async_db)):
+    return await crud.process_review(db, card_id, review.quality)
+
+@router.get("/", response_model=List[schemas.VocabListResponse])
+async def get_lists(request: Request, response: Response, skip: int = 0, limit: int = 20, db: AsyncSession = Depends(get_async_db)):
+    return await revalidate(request, response, db, ("lists", 0)) or await crud.get_lists(db, skip, limit)
+
+@router.get("/{list_id:int}", response_model=schemas.VocabListDetail)
+async def get_list_details(request: Request, response: Response, list_id: int, db: AsyncSession = Depends(get_async_db)):
+    if not_modified := await revalidate(request, response, db, ("list", list_id), daily=True): return not_modified
+    detail = await crud.get_list_detail(db, list_id)
+    if not detail: raise HTTPException(404)
+    return detail
+
+@router.get("/{list_id:int}/cards", response_model=schemas.CardPage)
+async def get_list_cards(request: Request, response: Response, list_id: int, limit: int = Query(100, ge=1, le=1000), cursor: Optional[str] = None,
+                         sort: str = "id", order: str = "asc", fields: Optional[str] = None, prefix: Optional[str] = None,
+                         pos: Optional[str] = None, min_streak: Optional[int] = None, max_streak: Optional[int] = None,
+                         due_before: Optional[datetime] = None, db: AsyncSession = Depends(get_async_db)):
+    if not_modified := await revalidate(request, response, db, ("list", list_id)): return not_modified
+    try:
+        return await crud.get_list_cards(db, list_id, limit, cursor, sort, order == "desc",
+                                         fields.split(",") if fields else None, prefix, pos, min_streak, max_streak, due_before)
+    except (ValueError, TypeError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
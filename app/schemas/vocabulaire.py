@@ -1,10 +1,26 @@
-from pydantic import BaseModel
-from typing import Optional, List, Dict
+from pydantic import BaseModel, Field, field_validator
+from typing import Any, Optional, List, Dict
 from datetime import datetime, date
 
 class ReviewAttempt(BaseModel):
     quality: int
 
+class ReviewEvent(ReviewAttempt):
+    card_id: int
+    reviewed_at: Optional[datetime] = None
+    event_id: Optional[str] = Field(None, max_length=64)  # unique, généré par le client : lot renvoyé sans double compte
+
+    @field_validator('reviewed_at')
+    @classmethod
+    def to_local_naive(cls, v):
+        # Les dates en base sont naïves (heure locale, comme datetime.now())
+        return v.astimezone().replace(tzinfo=None) if v and v.tzinfo else v
+
+class ReviewBatchResult(BaseModel):
+    applied: int
+    duplicates: int = 0  # révisions déjà appliquées par un envoi précédent
+    missing: List[int] = []
+
 class AnalyzeRequest(BaseModel):
     text: str
     lang: str = "jp"
@@ -23,6 +39,39 @@ class AnalyzeResponse(BaseModel):
     sentences: List[List[AnalyzedToken]]
     raw_text: Optional[str] = None
 
+# --- ANALYSE INCRÉMENTALE ---
+class AnalyzeIncrementalRequest(AnalyzeRequest):
+    fingerprint: Optional[str] = None
+    line_hashes: List[str] = []
+
+class SentencePatch(BaseModel):
+    start: int  # indices [start, end) dans l'analyse précédente
+    end: int
+    sentences: List[List[AnalyzedToken]]
+
+class AnalyzeIncrementalResponse(BaseModel):
+    fingerprint: str
+    line_hashes: List[str]
+    full: bool
+    patches: List[SentencePatch]
+
+# --- INGESTION (jobs) ---
+class IngestionChapterInfo(BaseModel):
+    index: int
+    title: Optional[str] = None
+    sentence_count: int = 0
+
+class IngestionJobResponse(BaseModel):
+    id: str
+    filename: str
+    lang: str
+    status: str
+    total_chapters: int = 0
+    done_chapters: int = 0
+    error: Optional[str] = None
+    updated_at: Optional[datetime] = None  # battement de cœur : figé => job abandonné
+    chapters: List[IngestionChapterInfo] = []
+
 # --- MODEL DB (Inchangé) ---
 class VocabCardBase(BaseModel):
     terme: str
@@ -58,14 +107,112 @@ class VocabListResponse(VocabListBase):
     class Config:
         from_attributes = True
 
-class VocabListWithCards(VocabListResponse):
-    cards: List[VocabCardResponse] = []
+class VocabListDetail(VocabListResponse):
+    card_count: int = 0
+    learned_count: int = 0
+    due_count: int = 0
+
+class CardPage(BaseModel):
+    # Cartes réduites aux champs demandés (fields=...) : pas de validation par carte
+    items: List[Dict[str, Any]]
+    next_cursor: Optional[str] = None
+
+class ListStats(BaseModel):
+    list_id: int
+    total: int
+    learned: int
+    due: int
 
 class DashboardStats(BaseModel):
     total_cards: int
     cards_learned: int
     due_today: int
     heatmap: Dict[str, int]
+    lists: List[ListStats] = []
+
+# --- PRÉVISIONS ---
+class ForecastRequest(BaseModel):
+    days: int = 30
+    list_ids: Optional[List[int]] = None
+    # Probabilité de réussite par streak (la dernière vaut pour les streaks supérieurs) ; défaut : config
+    recall: Optional[List[float]] = None
+    pass_quality: int = 4
+    fail_quality: int = 1
+    seed: int = 0
+    # Paramètres du planificateur à essayer (défaut : ceux appliqués aux révisions)
+    min_ease: Optional[float] = None
+    max_ease: Optional[float] = None
+    steps: Optional[List[int]] = None
+    fail_interval: Optional[int] = None
+
+class ListForecast(BaseModel):
+    list_id: int
+    due: List[int]
+
+class Forecast(BaseModel):
+    start: date
+    days: List[date]
+    cards: int
+    reviews: int
+    lapses: int
+    total: List[int]
+    lists: List[ListForecast]
+
+# --- PROFIL DE VOCABULAIRE ---
+class ProfileRequest(BaseModel):
+    # Source : texte (analysé ou repris du cache), analyse enregistrée, ou livre ingéré (job terminé)
+    text: Optional[str] = None
+    lang: str = "jp"
+    analysis_id: Optional[int] = None
+    job_id: Optional[str] = None
+    # Couverture calculée contre ces listes (par défaut : toutes les listes de la langue)
+    list_ids: Optional[List[int]] = None
+    top: int = 50
+    candidates: int = 50
+
+class ProfileEntry(BaseModel):
+    lemma: str
+    reading: Optional[str] = None
+    ent_seq: int
+    count: int
+    jlpt: Optional[int] = None
+    known: bool
+
+class ProfileCandidate(VocabCardCreate):
+    # Envoyable tel quel à /{list_id}/cards/bulk
+    count: int
+    jlpt: Optional[int] = None
+
+class DocumentProfile(BaseModel):
+    sentences: int
+    tokens: int
+    distinct: int
+    known_tokens: int
+    known_distinct: int
+    coverage: float
+    levels: Dict[str, int]
+    frequencies: List[ProfileEntry]
+    candidates: List[ProfileCandidate]
+
+# --- RECHERCHE ---
+class SearchHit(BaseModel):
+    kind: str  # "card" | "analysis"
+    id: int
+    score: float
+    snippet: Optional[str] = None
+    # Cartes
+    list_id: Optional[int] = None
+    terme: Optional[str] = None
+    lecture: Optional[str] = None
+    pos: Optional[str] = None
+    definitions: Optional[str] = None
+    # Analyses enregistrées
+    title: Optional[str] = None
+    lang: Optional[str] = None
+
+class SearchResults(BaseModel):
+    items: List[SearchHit]
+    next_offset: Optional[int] = None
 
 class AnalysisBase(BaseModel):
     title: str
@@ -0,0 +1,170 @@
+import asyncio
+import multiprocessing
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from starlette.concurrency import run_in_threadpool, iterate_in_threadpool
+from app.config import ANALYSIS_BACKEND, ANALYSIS_WORKERS, ANALYSIS_CHUNK_LINES, NLP_WARMUP
+from app.services import nlp, metrics
+
+# --- EXÉCUTEUR ---
+# L'analyse est CPU-bound (GIL) : en mode "process", elle tourne dans un pool de process
+# dont chaque worker initialise ses moteurs une fois pour toutes, et la boucle asyncio reste libre.
+_executor = None
+_warm_futures = []
+_worker_stats = {}  # pid -> nlp.cache_stats() du worker, rafraîchi à chaque morceau analysé
+
+def _init_worker(langs):
+    for lang in langs:
+        try: nlp.get_engine(lang)
+        except Exception as e: print(f"ERREUR INIT MOTEUR {lang} (worker): {e}")
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(
+            max_workers=ANALYSIS_WORKERS, mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker, initargs=(NLP_WARMUP,)
+        )
+    return _executor
+
+def warmup():
+    """Démarre le pool (ou préchauffe les moteurs locaux en mode inline), sans bloquer."""
+    if ANALYSIS_BACKEND != "process": return nlp.warmup(NLP_WARMUP)
+    executor = get_executor()
+    _warm_futures[:] = [executor.submit(nlp.engine_status) for _ in range(ANALYSIS_WORKERS)]
+
+def status():
+    if ANALYSIS_BACKEND != "process":
+        engines = nlp.engine_status()
+        ready = all(engines[l]["ready"] for l in NLP_WARMUP if l in engines)
+        return {"backend": "inline", "ready": ready, "engines": engines}
+    done = [f for f in _warm_futures if f.done() and not f.exception()]
+    return {
+        "backend": "process", "workers": ANALYSIS_WORKERS, "ready": bool(done),
+        "engines": done[0].result() if done else nlp.engine_status(),
+    }
+
+def shutdown():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+    _worker_stats.clear()
+
+def _replace_broken(executor):
+    """Un worker mort (OOM sur un gros livre...) casse tout le pool : on le remplace une fois pour tous
+    les appels en cours (seul le premier à le constater le remplace)."""
+    if _executor is executor:
+        print("Pool d'analyse cassé (worker mort) : redémarrage")
+        shutdown()
+        warmup()
+
+# --- ANALYSE PAR MORCEAUX ---
+def split_chunks(lines: list, size: int = ANALYSIS_CHUNK_LINES):
+    return [lines[i:i + size] for i in range(0, len(lines), size)]
+
+def _analyze_chunk(lines: list, lang: str):
+    # Le "\n" final préserve une éventuelle ligne vide en fin de morceau au re-découpage
+    return nlp.analyze_text("\n".join(lines) + "\n", lang=lang)["sentences"]
+
+def _analyze_chunk_measured(lines: list, lang: str):
+    """Côté worker : le morceau analysé, les mesures prises pendant son analyse et l'état de ses caches."""
+    return _analyze_chunk(lines, lang), metrics.drain(), (os.getpid(), nlp.cache_stats())
+
+def _collect(part):
+    sentences, snapshot, (pid, stats) = part
+    metrics.merge(snapshot)
+    _worker_stats[pid] = stats
+    return sentences
+
+async def analyze_text_async(text: str, lang: str = "jp"):
+    """Même résultat que nlp.analyze_text, sans bloquer la boucle d'événements."""
+    if ANALYSIS_BACKEND != "process":
+        return await run_in_threadpool(nlp.analyze_text, text, lang)
+    return {"sentences": await analyze_lines_async(text.splitlines(), lang), "raw_text": text}
+
+async def analyze_lines_async(lines: list, lang: str = "jp"):
+    """Analyse une liste de lignes : une phrase par ligne, dans l'ordre."""
+    if not lines: return []
+    if ANALYSIS_BACKEND != "process":
+        return await run_in_threadpool(_analyze_chunk, lines, lang)
+
+    loop = asyncio.get_running_loop()
+    chunks = split_chunks(lines)
+    for attempt in range(2):
+        executor = get_executor()
+        try:
+            parts = await asyncio.gather(*(loop.run_in_executor(executor, _analyze_chunk_measured, chunk, lang) for chunk in chunks))
+            break
+        except BrokenProcessPool:
+            if attempt: raise
+            _replace_broken(executor)
+    return [s for part in parts for s in _collect(part)]
+
+async def iter_analyze_async(text: str, lang: str = "jp"):
+    """Produit les phrases analysées dans l'ordre, au fur et à mesure.
+
+    En mode "process", seuls quelques morceaux sont en vol à la fois (fenêtre bornée) :
+    la mémoire reste proportionnelle à la fenêtre, pas à la taille du livre.
+    """
+    if ANALYSIS_BACKEND != "process":
+        async for sentence in iterate_in_threadpool(nlp.iter_analyze_text(text, lang)):
+            yield sentence
+        return
+
+    loop = asyncio.get_running_loop()
+    chunks = iter(split_chunks(text.splitlines()))
+    pending = deque()  # (morceau, pool, future)
+    retried = False
+
+    def submit(chunk):
+        executor = get_executor()
+        pending.append((chunk, executor, loop.run_in_executor(executor, _analyze_chunk_measured, chunk, lang)))
+
+    def submit_next():
+        chunk = next(chunks, None)
+        if chunk is not None: submit(chunk)
+
+    try:
+        for _ in range(ANALYSIS_WORKERS * 2): submit_next()
+        while pending:
+            chunk, executor, future = pending[0]
+            try:
+                part = _collect(await future)
+            except BrokenProcessPool:
+                # Morceaux en vol perdus avec le pool : resoumis une fois au nouveau pool, dans l'ordre
+                if retried: raise
+                retried = True
+                _replace_broken(executor)
+                lost = [c for c, _, _ in pending]
+                pending.clear()
+                for c in lost: submit(c)
+                continue
+            pending.popleft()
+            submit_next()
+            for sentence in part: yield sentence
+    finally:
+        # Client déconnecté : on n'analyse pas le reste pour rien
+        for _, _, future in pending: future.cancel()
+
+def _merge_cache_stats(per_worker: list) -> dict:
+    merged = {"lexicon": per_worker[0].get("lexicon"), "workers": len(per_worker)}
+    for name in ("jmdict", "cn_words"):
+        total = {k: sum(s[name][k] for s in per_worker) for k in ("size", "maxsize", "hits", "misses")}
+        lookups = total["hits"] + total["misses"]
+        merged[name] = {**total, "hit_rate": round(total["hits"] / lookups, 4) if lookups else 0.0}
+    return merged
+
+async def cache_stats():
+    """Compteurs des caches de lookups ; en mode "process", cumulés sur les workers (dernier état connu
+    de chacun, remonté avec chaque morceau analysé)."""
+    if ANALYSIS_BACKEND != "process": return nlp.cache_stats()
+    if not _worker_stats:
+        pid_stats = await asyncio.get_running_loop().run_in_executor(get_executor(), _worker_cache_stats)
+        _worker_stats.setdefault(*pid_stats)
+    return _merge_cache_stats(list(_worker_stats.values()))
+
+def _worker_cache_stats():
+    return os.getpid(), nlp.cache_stats()
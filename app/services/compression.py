@@ -0,0 +1,110 @@
+import gzip
+import zlib
+from starlette.datastructures import Headers, MutableHeaders
+from app.config import COMPRESSION_ENABLED, COMPRESS_MIN_SIZE, GZIP_LEVEL, BROTLI_QUALITY
+
+try:
+    import brotli
+except ImportError:  # dépendance optionnelle (extra "compression") : gzip seul
+    brotli = None
+
+# Compression des réponses selon Accept-Encoding (brotli de préférence, sinon gzip).
+#   - réponse complète : compressée seulement au-delà de COMPRESS_MIN_SIZE octets ;
+#   - réponse en flux (NDJSON d'analyse, export CSV) : chaque morceau est compressé puis vidé
+#     (sync flush), le client le reçoit aussitôt au lieu d'attendre la fin du flux ;
+#   - réponses déjà encodées (fichiers statiques précompressés), 204 / 304 et types binaires : intactes.
+
+COMPRESSIBLE_TYPES = {"application/json", "application/javascript", "application/x-ndjson", "application/xml",
+                      "application/x-msgpack", "image/svg+xml"}
+
+def compressible(content_type: str) -> bool:
+    media_type = content_type.split(";", 1)[0].strip().lower()
+    return media_type.startswith("text/") or media_type.endswith("+json") or media_type in COMPRESSIBLE_TYPES
+
+def negotiate(accept_encoding: str, available=None):
+    """'br', 'gzip' ou None, d'après Accept-Encoding (q=0 exclut un codage)."""
+    accepted = {}
+    for part in accept_encoding.lower().split(","):
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        if params.strip().startswith("q="):
+            try: q = float(params.strip()[2:])
+            except ValueError: q = 0.0
+        accepted[name.strip()] = q
+    available = available if available is not None else (("br", "gzip") if brotli else ("gzip",))
+    for encoding in available:
+        if accepted.get(encoding, accepted.get("*", 0)) > 0: return encoding
+    return None
+
+def compress(body: bytes, encoding: str, quality: int = None) -> bytes:
+    """Compression en un bloc (réponses complètes, fichiers statiques)."""
+    if encoding == "br": return brotli.compress(body, quality=BROTLI_QUALITY if quality is None else quality)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL if quality is None else quality, mtime=0)
+
+class _StreamCompressor:
+    def __init__(self, encoding: str):
+        self.encoding = encoding
+        if encoding == "br": self.compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+        else: self.compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)  # en-tête gzip
+
+    def chunk(self, data: bytes) -> bytes:
+        if self.encoding == "br": return self.compressor.process(data) + self.compressor.flush()
+        return self.compressor.compress(data) + self.compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        return self.compressor.finish() if self.encoding == "br" else self.compressor.flush()
+
+class CompressionMiddleware:
+    def __init__(self, app, minimum_size: int = COMPRESS_MIN_SIZE):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not COMPRESSION_ENABLED:
+            return await self.app(scope, receive, send)
+        encoding = negotiate(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None or scope["method"] == "HEAD":
+            return await self.app(scope, receive, send)
+
+        start = None          # http.response.start retenu jusqu'au 1er morceau du corps
+        stream = None         # _StreamCompressor si la réponse est compressée en flux
+        passthrough = False
+
+        async def send_compressed(message):
+            nonlocal start, stream, passthrough
+            if passthrough: return await send(message)
+            if message["type"] == "http.response.start":
+                start = message
+                return
+            if message["type"] != "http.response.body":
+                return await send(message)
+            body, more = message.get("body", b""), message.get("more_body", False)
+            if stream is not None:
+                data = stream.chunk(body) if body else b""
+                if not more: data += stream.finish()
+                return await send({"type": "http.response.body", "body": data, "more_body": more})
+
+            headers = MutableHeaders(raw=start["headers"] if isinstance(start["headers"], list) else list(start["headers"]))
+            eligible = (start["status"] not in (204, 206, 304) and "content-encoding" not in headers
+                        and compressible(headers.get("content-type", "")))
+            if eligible: headers.add_vary_header("Accept-Encoding")
+            if not eligible or (not more and len(body) < self.minimum_size):
+                passthrough = True
+                await send({**start, "headers": headers.raw})
+                return await send(message)
+
+            headers["Content-Encoding"] = encoding
+            # Représentation différente de l'identité : un ETag fort devient faible
+            if headers.get("etag", "").startswith('"'): headers["ETag"] = "W/" + headers["etag"]
+            if not more:
+                data = compress(body, encoding)
+                headers["Content-Length"] = str(len(data))
+                await send({**start, "headers": headers.raw})
+                return await send({"type": "http.response.body", "body": data, "more_body": False})
+            # Flux : taille finale inconnue
+            del headers["Content-Length"]
+            stream = _StreamCompressor(encoding)
+            await send({**start, "headers": headers.raw})
+            await send({"type": "http.response.body", "body": stream.chunk(body) if body else b"", "more_body": True})
+
+        await self.app(scope, receive, send_compressed)
@@ -0,0 +1,108 @@
+import codecs
+import io
+import posixpath
+import re
+import zipfile
+import xml.etree.ElementTree as ET
+from html.parser import HTMLParser
+from urllib.parse import unquote
+
+# Extraction de texte sans fichier temporaire ni arbre complet :
+# l'EPUB (un zip) est lu directement depuis le buffer reçu, dans l'ordre du spine,
+# et chaque document est parcouru par un parseur HTML en flux.
+
+AOZORA_NOTE = re.compile(r'［＃.*?］')
+SKIPPED_TAGS = {'script', 'style'}
+RUBY_ANNOTATIONS = {'rt', 'rp'}
+DOCUMENT_TYPES = {'application/xhtml+xml', 'text/html'}
+READ_CHUNK = 64 * 1024
+
+class _TextExtractor(HTMLParser):
+    """Texte d'un document HTML, sans les lectures ruby (rt/rp), l'en-tête, scripts et styles."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts = []
+        self._skip = 0
+        self._in_ruby_annotation = False
+        self._in_head = False
+
+    def handle_starttag(self, tag, attrs):
+        if tag in SKIPPED_TAGS: self._skip += 1
+        # </rt> et </rp> sont optionnels : un nouveau rt/rp ou </ruby> ferme l'annotation en cours
+        elif tag in RUBY_ANNOTATIONS: self._in_ruby_annotation = True
+        # </head> est optionnel en HTML : <body> ferme aussi l'en-tête
+        elif tag == 'head': self._in_head = True
+        elif tag == 'body': self._in_head = False
+
+    def handle_startendtag(self, tag, attrs):
+        pass
+
+    def handle_endtag(self, tag):
+        if tag in SKIPPED_TAGS and self._skip: self._skip -= 1
+        elif tag in RUBY_ANNOTATIONS or tag == 'ruby': self._in_ruby_annotation = False
+        elif tag == 'head': self._in_head = False
+
+    def handle_data(self, data):
+        if not self._skip and not self._in_ruby_annotation and not self._in_head: self.parts.append(data)
+
+    def text(self) -> str:
+        return AOZORA_NOTE.sub('', "".join(self.parts))
+
+def clean_html_text(html_content: str) -> str:
+    parser = _TextExtractor()
+    parser.feed(html_content)
+    parser.close()
+    return parser.text()
+
+def _clean_html_stream(raw, encoding: str = 'utf-8') -> str:
+    """Comme clean_html_text, mais depuis un flux binaire lu par morceaux."""
+    decoder = codecs.getincrementaldecoder(encoding)(errors='replace')
+    parser = _TextExtractor()
+    while True:
+        chunk = raw.read(READ_CHUNK)
+        if not chunk: break
+        parser.feed(decoder.decode(chunk))
+    parser.feed(decoder.decode(b"", final=True))
+    parser.close()
+    return parser.text()
+
+def _local(tag: str) -> str:
+    return tag.rsplit('}', 1)[-1]
+
+def _spine_documents(zf: zipfile.ZipFile):
+    """Chemins des documents du livre, dans l'ordre de lecture (spine de l'OPF)."""
+    container = ET.fromstring(zf.read('META-INF/container.xml'))
+    rootfile = next(el for el in container.iter() if _local(el.tag) == 'rootfile')
+    opf_path = rootfile.get('full-path')
+    opf = ET.fromstring(zf.read(opf_path))
+    base = posixpath.dirname(opf_path)
+
+    manifest = {}
+    for el in opf.iter():
+        if _local(el.tag) == 'item':
+            # href est une URL relative : noms encodés en %XX (espaces, non-ASCII) dans l'OPF
+            href = el.get('href')
+            manifest[el.get('id')] = (unquote(href) if href else href, el.get('media-type'))
+    for el in opf.iter():
+        if _local(el.tag) != 'itemref': continue
+        href, media_type = manifest.get(el.get('idref'), (None, None))
+        if href and media_type in DOCUMENT_TYPES:
+            yield posixpath.normpath(posixpath.join(base, href)) if base else href
+
+def iter_epub_chapters(source):
+    """(nom, texte) de chaque document de l'EPUB, dans l'ordre du spine.
+
+    source : bytes ou objet fichier (ex. SpooledTemporaryFile d'un UploadFile), lu sans copie sur disque.
+    """
+    if isinstance(source, (bytes, bytearray)): source = io.BytesIO(source)
+    with zipfile.ZipFile(source) as zf:
+        names = set(zf.namelist())
+        for path in _spine_documents(zf):
+            if path not in names: continue
+            with zf.open(path) as raw:
+                yield path.rsplit('/', 1)[-1], _clean_html_stream(raw)
+
+def extract_text_from_epub(source) -> str:
+    try: return "\n".join(text for _, text in iter_epub_chapters(source))
+    except: return ""
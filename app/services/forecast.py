@@ -0,0 +1,57 @@
+from datetime import date, datetime, timedelta
+from app.services.srs import sm2_update, DEFAULT_PARAMS, SM2Params
+
+try:
+    import numpy as np
+except ImportError:  # dépendance optionnelle (extra "forecast")
+    np = None
+
+# Prévision de charge : tout le deck en tableaux NumPy (une colonne par champ SM-2), puis simulation
+# jour par jour des révisions, vectorisée sur les cartes dues. Rappel tiré au hasard selon `recall`
+# (probabilité de réussite indexée par streak, la dernière valeur valant pour les streaks supérieurs).
+
+class Deck:
+    def __init__(self, rows, today: date = None):
+        """rows : (list_id, streak, interval, ease_factor, next_review), ex. crud.get_schedule_rows."""
+        self.today = today or date.today()
+        n = len(rows)
+        def column(i, dtype):
+            return np.fromiter((r[i] for r in rows), dtype=dtype, count=n)
+        self.list_ids, self.list_index = np.unique(column(0, np.int64), return_inverse=True)
+        self.streak, self.interval, self.ease = column(1, np.int64), column(2, np.int64), column(3, np.float64)
+        # Jour d'échéance relatif à aujourd'hui ; en retard ou sans date => dues aujourd'hui (jour 0).
+        # timedelta.days plutôt qu'une conversion en datetime64, bien plus lente depuis des objets Python.
+        start = datetime.combine(self.today, datetime.min.time())
+        self.due = np.maximum(np.fromiter(((r[4] - start).days if r[4] else 0 for r in rows), dtype=np.int64, count=n), 0)
+
+    def __len__(self):
+        return len(self.streak)
+
+def simulate(deck: Deck, days: int = 30, recall=(0.9,), params: SM2Params = DEFAULT_PARAMS,
+             pass_quality: int = 4, fail_quality: int = 1, seed: int = 0) -> dict:
+    """Révisions dues par jour et par liste sur `days` jours, chaque révision simulée passant par sm2_update."""
+    rng = np.random.default_rng(seed)
+    recall = np.asarray(recall, dtype=np.float64)
+    streak, interval, ease, due = deck.streak.copy(), deck.interval.copy(), deck.ease.copy(), deck.due.copy()
+    counts = np.zeros((len(deck.list_ids), days), dtype=np.int64)
+    lapses = 0
+    for day in range(days):
+        idx = np.flatnonzero(due <= day)
+        if not idx.size: continue
+        counts[:, day] = np.bincount(deck.list_index[idx], minlength=len(deck.list_ids))
+        passed = rng.random(idx.size) < recall[np.minimum(streak[idx], len(recall) - 1)]
+        lapses += idx.size - int(passed.sum())
+        quality = np.where(passed, pass_quality, fail_quality)
+        streak[idx], interval[idx], ease[idx] = sm2_update(streak[idx], interval[idx], ease[idx], quality, params)
+        # Intervalle nul (interval * ease tronqué) : la carte revient le lendemain
+        due[idx] = day + np.maximum(interval[idx], 1)
+    totals = counts.sum(axis=0)
+    return {
+        "start": deck.today,
+        "days": [deck.today + timedelta(days=d) for d in range(days)],
+        "cards": len(deck),
+        "reviews": int(totals.sum()),
+        "lapses": lapses,
+        "total": totals.tolist(),
+        "lists": [{"list_id": int(lid), "due": row.tolist()} for lid, row in zip(deck.list_ids, counts)],
+    }
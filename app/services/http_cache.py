@@ -0,0 +1,40 @@
+import hashlib
+from datetime import date, datetime, time
+from email.utils import formatdate, parsedate_to_datetime
+from starlette.requests import Request
+from starlette.responses import Response
+
+# Validation HTTP des lectures fréquentes (listes, détails, analyses, tableau de bord) :
+# ETag et Last-Modified dérivés des compteurs de version (app/crud/stats.py, DataVersion), lus en
+# une requête sur clé primaire. Si le client a déjà la bonne version : 304 sans requête sur les
+# cartes ni sérialisation. `daily` : le contenu dépend aussi du jour (cartes dues aujourd'hui).
+
+CACHE_CONTROL = "private, no-cache"  # toujours revalider, mais réutiliser le corps si 304
+
+def _http_date(value: datetime) -> str:
+    return formatdate(value.timestamp(), usegmt=True)
+
+def _matches(if_none_match: str, etag: str) -> bool:
+    if if_none_match.strip() == "*": return True
+    tags = (t.strip() for t in if_none_match.split(","))
+    return etag.removeprefix("W/") in (t.removeprefix("W/") for t in tags)  # comparaison faible
+
+def check(request: Request, response: Response, versions: tuple, modified: datetime = None, daily: bool = False):
+    """Réponse 304 si le client est à jour ; sinon None, et les validateurs sont posés sur `response`."""
+    today = date.today()
+    if daily: modified = max(modified or datetime.min, datetime.combine(today, time.min))
+    # Chemin et paramètres dans l'empreinte : même version, pagination différente => autre ETag
+    key = f"{request.url.path}?{request.url.query}|{versions}|{today.isoformat() if daily else ''}"
+    headers = {"ETag": f'W/"{hashlib.sha1(key.encode()).hexdigest()[:20]}"', "Cache-Control": CACHE_CONTROL}
+    if modified: headers["Last-Modified"] = _http_date(modified)
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        fresh = _matches(if_none_match, headers["ETag"])
+    else:
+        try: since = parsedate_to_datetime(request.headers.get("if-modified-since", ""))
+        except (TypeError, ValueError): since = None
+        fresh = bool(since and modified) and modified.timestamp() <= since.timestamp()
+    if fresh: return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
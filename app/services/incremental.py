@@ -0,0 +1,60 @@
+import hashlib
+from difflib import SequenceMatcher
+from app.services import analysis, nlp
+
+# Ré-analyse incrémentale : chaque ligne est analysée indépendamment (une phrase par ligne),
+# on ne ré-analyse donc que les lignes modifiées et on renvoie des patchs d'indices de phrases.
+
+def line_hash(line: str) -> str:
+    return hashlib.blake2b(line.encode('utf-8'), digest_size=6).hexdigest()
+
+def fingerprint(lang: str, hashes: list) -> str:
+    """Identifie une analyse : langue, version des dictionnaires et contenu ligne à ligne."""
+    h = hashlib.blake2b(digest_size=16)
+    h.update(f"{lang}\0{nlp.dictionary_version()}\0".encode())
+    h.update("".join(hashes).encode())
+    return h.hexdigest()
+
+def diff_lines(old: list, new: list):
+    """Opérations (i1, i2, j1, j2) : old[i1:i2] remplacé par new[j1:j2].
+
+    Préfixe et suffixe communs sont retirés avant difflib : pour une correction
+    ponctuelle, le coût est proportionnel à la zone modifiée.
+    """
+    prefix, max_prefix = 0, min(len(old), len(new))
+    while prefix < max_prefix and old[prefix] == new[prefix]: prefix += 1
+    suffix, max_suffix = 0, max_prefix - prefix
+    while suffix < max_suffix and old[-1 - suffix] == new[-1 - suffix]: suffix += 1
+
+    old_mid, new_mid = old[prefix:len(old) - suffix], new[prefix:len(new) - suffix]
+    if not old_mid and not new_mid: return []
+    if not old_mid or not new_mid:
+        return [(prefix, prefix + len(old_mid), prefix, prefix + len(new_mid))]
+    matcher = SequenceMatcher(None, old_mid, new_mid, autojunk=False)
+    return [
+        (prefix + i1, prefix + i2, prefix + j1, prefix + j2)
+        for tag, i1, i2, j1, j2 in matcher.get_opcodes() if tag != 'equal'
+    ]
+
+async def analyze_incremental(text: str, lang: str, previous_fingerprint: str = None, previous_hashes: list = None):
+    lines = text.splitlines()
+    hashes = [line_hash(l) for l in lines]
+    result = {"fingerprint": fingerprint(lang, hashes), "line_hashes": hashes, "full": False, "patches": []}
+
+    # Analyse précédente inconnue ou incohérente (autre langue, dictionnaires changés...) : tout refaire
+    previous_hashes = previous_hashes or []
+    if not previous_fingerprint or fingerprint(lang, previous_hashes) != previous_fingerprint:
+        result["full"] = True
+        ops = [(0, len(previous_hashes), 0, len(lines))]
+    else:
+        ops = diff_lines(previous_hashes, hashes)
+
+    # Toutes les lignes modifiées partent en une seule analyse (lookups groupés)
+    changed = [l for _, _, j1, j2 in ops for l in lines[j1:j2]]
+    sentences = await analysis.analyze_lines_async(changed, lang)
+    pos = 0
+    for i1, i2, j1, j2 in ops:
+        count = j2 - j1
+        result["patches"].append({"start": i1, "end": i2, "sentences": sentences[pos:pos + count]})
+        pos += count
+    return result
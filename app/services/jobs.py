@@ -0,0 +1,107 @@
+import asyncio
+import uuid
+import zlib
+from datetime import timedelta
+from starlette.concurrency import run_in_threadpool
+from app.config import JOB_WORKERS, JOB_PAGE_LINES, JOB_HEARTBEAT_SECONDS
+from app.core.database import SessionLocal
+from app.crud import jobs as crud
+from app.services import analysis, nlp, result_cache
+
+# File d'ingestion en mémoire (pas de broker externe) : l'état et les résultats des jobs
+# sont en base, lisibles depuis n'importe quel worker uvicorn ; l'exécution reste dans
+# le process qui a reçu le fichier. Ce process rafraîchit updated_at de ses jobs à chaque battement :
+# un job dont le battement s'arrête (process tué) est déclaré échoué par n'importe quel process.
+_queue = None
+_workers = []
+_active = set()  # jobs de ce process, en file ou en cours
+STALE_AFTER = timedelta(seconds=JOB_HEARTBEAT_SECONDS * 5)
+
+async def start():
+    global _queue
+    _queue = asyncio.Queue()
+    _workers[:] = [asyncio.create_task(_worker()) for _ in range(JOB_WORKERS)]
+    _workers.append(asyncio.create_task(_heartbeat()))
+
+async def stop():
+    # Relevé avant l'annulation : les workers annulés retirent leur job de _active.
+    # Contenu en file perdu avec le process, analyse en cours interrompue : le client ne doit pas attendre.
+    in_flight = list(_active)
+    for task in _workers: task.cancel()
+    await asyncio.gather(*_workers, return_exceptions=True)
+    _workers.clear()
+    _active.clear()
+    if in_flight:
+        with SessionLocal() as db: await run_in_threadpool(crud.fail_jobs, db, in_flight, "Interrompu (arrêt du serveur)")
+
+async def _heartbeat():
+    while True:
+        try:
+            with SessionLocal() as db:
+                if _active: await run_in_threadpool(crud.touch_jobs, db, list(_active))
+                await run_in_threadpool(crud.fail_stale_jobs, db, STALE_AFTER)
+        except Exception as e: print(f"Erreur battement des jobs: {e}")
+        await asyncio.sleep(JOB_HEARTBEAT_SECONDS)
+
+async def submit(filename: str, content: bytes, lang: str):
+    if _queue is None: await start()
+    job_id = uuid.uuid4().hex
+    with SessionLocal() as db:
+        job = await run_in_threadpool(crud.create_job, db, job_id, filename, lang)
+    _active.add(job_id)
+    await _queue.put((job_id, filename, content, lang))
+    return job
+
+def cancel(db, job_id: str):
+    # Statut en base : pris en compte entre deux chapitres, quel que soit le worker qui exécute le job
+    job = crud.get_job(db, job_id)
+    if job and job.status in ("queued", "running"): crud.update_job(db, job_id, status="cancelled")
+    return job is not None
+
+def _is_cancelled(db, job_id: str) -> bool:
+    return crud.get_job_status(db, job_id) == "cancelled"
+
+async def _worker():
+    while True:
+        job_id, filename, content, lang = await _queue.get()
+        try:
+            await _run(job_id, filename, content, lang)
+        except Exception as e:
+            with SessionLocal() as db: await run_in_threadpool(crud.update_job, db, job_id, status="failed", error=str(e))
+        finally:
+            _active.discard(job_id)
+            _queue.task_done()
+
+async def _run(job_id: str, filename: str, content: bytes, lang: str):
+    with SessionLocal() as db:
+        if await run_in_threadpool(_is_cancelled, db, job_id): return
+        await run_in_threadpool(crud.update_job, db, job_id, status="running")
+        chapters = await run_in_threadpool(
+            lambda: [(t, text) for t, text in nlp.iter_document_chapters(filename, content, JOB_PAGE_LINES) if text.strip()])
+        await run_in_threadpool(crud.update_job, db, job_id, total_chapters=len(chapters))
+
+        for index, (title, text) in enumerate(chapters):
+            if await run_in_threadpool(_is_cancelled, db, job_id): return
+            result = await analysis.analyze_text_async(text, lang)
+            payload = await run_in_threadpool(lambda: zlib.compress(result_cache.encode_result(result), 6))
+            await run_in_threadpool(crud.save_chapter, db, job_id, index, title, len(result["sentences"]), payload)
+
+        if await run_in_threadpool(_is_cancelled, db, job_id): return
+        if not chapters: await run_in_threadpool(crud.update_job, db, job_id, status="failed", error="Fichier vide")
+        else: await run_in_threadpool(crud.update_job, db, job_id, status="done")
+
+def job_status_from(job, chapters=()):
+    return {
+        "id": job.id, "filename": job.filename, "lang": job.lang, "status": job.status, "updated_at": job.updated_at,
+        "total_chapters": job.total_chapters, "done_chapters": job.done_chapters, "error": job.error,
+        "chapters": [{"index": i, "title": t, "sentence_count": n} for i, t, n in chapters],
+    }
+
+def job_status(db, job_id: str):
+    job = crud.get_job(db, job_id)
+    if not job: return None
+    return job_status_from(job, crud.get_chapter_titles(db, job_id))
+
+def chapter_payload(db, job_id: str, index: int):
+    chapter = crud.get_chapter(db, job_id, index)
+    return zlib.decompress(chapter.data) if chapter else None
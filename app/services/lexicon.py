@@ -0,0 +1,247 @@
+"""Lexique compilé (JMdict + CC-CEDICT) en un seul fichier binaire en lecture seule.
+
+Construction :  python -m app.services.lexicon build [--out okura_lexicon.bin] [--cedict cedict_ts.u8]
+
+Le fichier est ouvert via mmap : tous les workers uvicorn partagent le même page cache
+et aucun objet Python n'est créé par entrée (recherche dichotomique sur les clés triées).
+
+Format (little endian, entiers u32 sauf mention) :
+    en-tête   : MAGIC, version, nb de sections, empreinte (16 octets)
+    sections  : nom (4 octets), offset, longueur   -- une ligne par section ("jp", "cn")
+    section   : nb_clés, nb_entrées
+                key_offsets[nb_clés + 1], key_entry[nb_clés],
+                entry_ids[nb_entrées], gloss_offsets[nb_entrées + 1], entry_jlpt[nb_entrées] (u8)
+                blob des clés (UTF-8 triées), blob des gloses (séparées par \\x1f)
+"""
+import argparse
+import hashlib
+import mmap
+import os
+import sqlite3
+import struct
+import sys
+from array import array
+
+MAGIC = b"OKLX"
+FORMAT_VERSION = 1
+GLOSS_SEP = "\x1f"
+MAX_DEFS = 4
+
+_HEADER = struct.Struct("<4sII16s")
+_SECTION = struct.Struct("<4sII")
+_COUNTS = struct.Struct("<II")
+
+# --- SOURCES ---
+def iter_cedict(path: str):
+    """Parcourt CC-CEDICT : (traditionnel, simplifié, pinyin, définitions) dans l'ordre du fichier."""
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if line.startswith('#') or not line.strip(): continue
+            parts = line.split(' ', 2)
+            if len(parts) < 3: continue
+            traditional, simplified, rest = parts
+            reading = rest[rest.find('[') + 1:rest.find(']')] if '[' in rest else ""
+            defs = []
+            if '/' in rest:
+                defs = rest.split('/', 1)[1].strip().strip('/').split('/')
+            yield traditional, simplified, reading, defs
+
+CEDICT_ID_SPACE = 100000000
+
+def cedict_entry_id(traditional: str, simplified: str, reading: str) -> int:
+    """ID stable d'une entrée CEDICT (indépendant du process, contrairement à hash()), dans [0, 1e8[."""
+    key = f"{traditional} {simplified} [{reading}]".encode('utf-8')
+    return int.from_bytes(hashlib.blake2b(key, digest_size=8).digest(), 'little') % CEDICT_ID_SPACE
+
+def oov_entry_id(word: str) -> int:
+    """ID stable d'un mot chinois hors dictionnaire, dans [1e8, 2e8[ : disjoint des entrées CEDICT
+    (une collision ferait passer la carte pour un doublon à l'ajout groupé)."""
+    return CEDICT_ID_SPACE + cedict_entry_id(word, word, "")
+
+def iter_cedict_entries(path: str):
+    """iter_cedict + ID stable de chaque entrée, collisions résolues dans l'ordre du fichier
+    (mêmes IDs pour le lexique compilé et pour CEDICT chargé en mémoire)."""
+    used = set()
+    for traditional, simplified, reading, defs in iter_cedict(path):
+        ent_id = cedict_entry_id(traditional, simplified, reading)
+        while ent_id in used: ent_id = (ent_id + 1) % CEDICT_ID_SPACE  # collision : sondage linéaire
+        used.add(ent_id)
+        yield traditional, simplified, reading, defs, ent_id
+
+def _jmdict_section(db_file: str):
+    """Clés -> première entrée (même ordre que jmd.lookup), gloses et JLPT précalculés."""
+    conn = sqlite3.connect(db_file)
+    try:
+        rank = {idseq: i for i, (idseq,) in enumerate(conn.execute("SELECT idseq FROM Entry ORDER BY rowid"))}
+        keys = {}
+        for text, idseq in conn.execute(
+                "SELECT text, idseq FROM Kanji UNION SELECT text, idseq FROM Kana "
+                "UNION SELECT g.text, s.idseq FROM Sense s JOIN SenseGloss g ON s.ID = g.sid"):
+            if not text or idseq not in rank: continue
+            if text not in keys or rank[idseq] < rank[keys[text]]: keys[text] = idseq
+
+        glosses = {}
+        for idseq, text in conn.execute(
+                "SELECT s.idseq, g.text FROM Sense s JOIN SenseGloss g ON s.ID = g.sid ORDER BY s.idseq, s.ID, g.rowid"):
+            defs = glosses.setdefault(idseq, [])
+            if len(defs) < MAX_DEFS: defs.append(text)
+
+        # Même logique que nlp.estimate_jlpt
+        jlpt = {idseq: 4 for (idseq,) in conn.execute("SELECT DISTINCT k.idseq FROM Kanji k JOIN KJP p ON p.kid = k.ID")}
+        for idseq, text in conn.execute(
+                "SELECT s.idseq, m.text FROM misc m JOIN Sense s ON m.sid = s.ID WHERE m.text LIKE '%jlpt-n%' ORDER BY s.ID DESC"):
+            jlpt[idseq] = int(str(text)[-1])
+    finally:
+        conn.close()
+
+    entries = {idseq: (idseq, glosses.get(idseq, []), jlpt.get(idseq, 1)) for idseq in set(keys.values())}
+    return keys, entries
+
+def _cedict_section(path: str):
+    keys, entries = {}, {}
+    for traditional, simplified, _, defs, ent_id in iter_cedict_entries(path):
+        entries[ent_id] = (ent_id, defs[:MAX_DEFS], 0)
+        # Comme load_cedict : la première entrée rencontrée pour une forme l'emporte
+        keys.setdefault(simplified, ent_id)
+        keys.setdefault(traditional, ent_id)
+    return keys, entries
+
+def _pack_section(keys: dict, entries: dict) -> bytes:
+    order = sorted(entries)
+    index = {k: i for i, k in enumerate(order)}
+    entry_ids, entry_jlpt, gloss_offsets, gloss_blob = array('I'), bytearray(), array('I', [0]), bytearray()
+    for k in order:
+        ent_id, defs, jlpt = entries[k]
+        entry_ids.append(ent_id)
+        entry_jlpt.append(jlpt or 0)
+        gloss_blob += GLOSS_SEP.join(defs).encode('utf-8')
+        gloss_offsets.append(len(gloss_blob))
+
+    encoded = sorted((text.encode('utf-8'), index[k]) for text, k in keys.items())
+    key_offsets, key_entry, key_blob = array('I', [0]), array('I'), bytearray()
+    for raw, i in encoded:
+        key_blob += raw
+        key_offsets.append(len(key_blob))
+        key_entry.append(i)
+
+    parts = [_COUNTS.pack(len(encoded), len(order)),
+             key_offsets.tobytes(), key_entry.tobytes(), entry_ids.tobytes(), gloss_offsets.tobytes(),
+             bytes(entry_jlpt), bytes(key_blob), bytes(gloss_blob)]
+    return b"".join(parts)
+
+def build_lexicon(out_path: str, jmdict_db: str = None, cedict_path: str = None) -> str:
+    """Compile les dictionnaires disponibles vers out_path (écriture atomique)."""
+    if sys.byteorder != 'little': raise RuntimeError("Format little endian uniquement")
+    sections = []
+    if jmdict_db:
+        print("Compilation JMdict...")
+        sections.append((b"jp\0\0", _pack_section(*_jmdict_section(jmdict_db))))
+    if cedict_path and os.path.exists(cedict_path):
+        print("Compilation CC-CEDICT...")
+        sections.append((b"cn\0\0", _pack_section(*_cedict_section(cedict_path))))
+    if not sections: raise ValueError("Aucune source de dictionnaire")
+
+    digest = hashlib.blake2b(digest_size=16)
+    for _, data in sections: digest.update(data)
+
+    offset = _HEADER.size + _SECTION.size * len(sections)
+    table = []
+    for name, data in sections:
+        table.append(_SECTION.pack(name, offset, len(data)))
+        offset += len(data)
+
+    tmp_path = out_path + ".tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(_HEADER.pack(MAGIC, FORMAT_VERSION, len(sections), digest.digest()))
+        for row in table: f.write(row)
+        for _, data in sections: f.write(data)
+    os.replace(tmp_path, out_path)
+    return digest.hexdigest()
+
+# --- LECTURE ---
+class LexiconSection:
+    def __init__(self, buf: memoryview):
+        n_keys, n_entries = _COUNTS.unpack_from(buf, 0)
+        pos = _COUNTS.size
+
+        def take(count, fmt='I'):
+            nonlocal pos
+            size = count * (4 if fmt == 'I' else 1)
+            view = buf[pos:pos + size]
+            pos += size
+            return view.cast(fmt) if fmt == 'I' else view
+
+        self.n_keys = n_keys
+        self._key_offsets = take(n_keys + 1)
+        self._key_entry = take(n_keys)
+        self._entry_ids = take(n_entries)
+        self._gloss_offsets = take(n_entries + 1)
+        self._entry_jlpt = take(n_entries, 'B')
+        self._keys = take(self._key_offsets[n_keys], 'B')
+        self._glosses = take(self._gloss_offsets[n_entries], 'B')
+
+    def _key(self, i: int) -> bytes:
+        return self._keys[self._key_offsets[i]:self._key_offsets[i + 1]].tobytes()
+
+    def find(self, form: str) -> int:
+        """Index de l'entrée associée à form, ou -1."""
+        target = form.encode('utf-8')
+        lo, hi = 0, self.n_keys
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._key(mid) < target: lo = mid + 1
+            else: hi = mid
+        if lo < self.n_keys and self._key(lo) == target: return self._key_entry[lo]
+        return -1
+
+    def entry(self, i: int) -> dict:
+        raw = self._glosses[self._gloss_offsets[i]:self._gloss_offsets[i + 1]].tobytes().decode('utf-8')
+        jlpt = self._entry_jlpt[i]
+        return {"ent_seq": self._entry_ids[i], "definitions": raw.split(GLOSS_SEP) if raw else [], "jlpt": jlpt or None}
+
+    def lookup(self, form: str):
+        i = self.find(form)
+        return self.entry(i) if i >= 0 else None
+
+class Lexicon:
+    """Lexique compilé, mappé en mémoire (partagé entre processus via le page cache)."""
+
+    def __init__(self, path: str):
+        with open(path, 'rb') as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        buf = memoryview(self._mm)
+        magic, version, n_sections, digest = _HEADER.unpack_from(buf, 0)
+        if magic != MAGIC or version != FORMAT_VERSION: raise ValueError(f"Lexique invalide: {path}")
+        self.path = path
+        self.version = digest.hex()
+        self.sections = {}
+        for i in range(n_sections):
+            name, offset, length = _SECTION.unpack_from(buf, _HEADER.size + i * _SECTION.size)
+            self.sections[name.rstrip(b"\0").decode()] = LexiconSection(buf[offset:offset + length])
+
+    def has(self, lang: str) -> bool:
+        return lang in self.sections
+
+    def lookup(self, lang: str, form: str):
+        return self.sections[lang].lookup(form)
+
+def open_lexicon(path: str):
+    """Ouvre le lexique s'il existe, sinon None (on retombe sur jamdict / load_cedict)."""
+    if not path or not os.path.exists(path): return None
+    try:
+        return Lexicon(path)
+    except Exception as e:
+        print(f"Erreur lecture lexique compilé: {e}")
+        return None
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compilation du lexique Okura")
+    parser.add_argument("command", choices=["build"])
+    parser.add_argument("--out", default=None)
+    parser.add_argument("--cedict", default="cedict_ts.u8")
+    args = parser.parse_args()
+
+    from jamdict import Jamdict
+    from app.config import LEXICON_PATH
+    version = build_lexicon(args.out or LEXICON_PATH, jmdict_db=Jamdict().db_file, cedict_path=args.cedict)
+    print(f"Lexique compilé : {args.out or LEXICON_PATH} ({version})")
@@ -0,0 +1,195 @@
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from app.config import METRICS_ENABLED, PROFILE_HEADER
+
+# Instrumentation interne, exposée au format Prometheus sur /metrics (par process).
+# Les workers du pool d'analyse renvoient leurs mesures avec chaque morceau (drain / merge),
+# et les en-têtes X-Okura-Profile déclenchent un détail par requête dans Server-Timing.
+
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+METRICS = {
+    "okura_http_requests_total": ("counter", "Requêtes HTTP par route et statut"),
+    "okura_http_request_duration_seconds": ("histogram", "Latence des requêtes HTTP par route"),
+    "okura_sql_queries_total": ("counter", "Requêtes SQL exécutées"),
+    "okura_sql_query_duration_seconds": ("histogram", "Durée des requêtes SQL"),
+    "okura_sql_queries_per_request": ("histogram", "Requêtes SQL par requête HTTP (détection des N+1)"),
+    "okura_nlp_stage_seconds": ("histogram", "Durée des étapes d'analyse (tokenize, lookup, serialize...)"),
+    "okura_nlp_tokens_total": ("counter", "Tokens produits par l'analyse"),
+    "okura_nlp_lines_total": ("counter", "Lignes analysées"),
+    "okura_jmdict_lookups_total": ("counter", "Lookups de formes JMdict (hit / miss du cache LRU)"),
+    "okura_dictionary_load_seconds": ("gauge", "Temps de chargement des moteurs et dictionnaires"),
+}
+
+class RequestStats:
+    """Mesures de la requête en cours (contextvar) : nb et durée SQL, étapes si profilage demandé."""
+    __slots__ = ("queries", "sql_seconds", "stages")
+
+    def __init__(self, profile: bool):
+        self.queries = 0
+        self.sql_seconds = 0.0
+        self.stages = {} if profile else None
+
+_request = ContextVar("okura_request_stats", default=None)
+
+class Registry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters = {}
+        self.gauges = {}
+        self.histograms = {}  # clé -> [compte par bucket..., somme, total]
+
+    def inc(self, name: str, value: float = 1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock: self.counters[key] = self.counters.get(key, 0) + value
+
+    def set(self, name: str, value: float, **labels):
+        with self._lock: self.gauges[(name, tuple(sorted(labels.items())))] = value
+
+    def observe(self, name: str, value: float, buckets=LATENCY_BUCKETS, **labels):
+        key = (name, tuple(sorted(labels.items())), buckets)
+        with self._lock:
+            h = self.histograms.get(key)
+            if h is None: h = self.histograms[key] = [0] * (len(buckets) + 3)
+            h[bisect_left(buckets, value)] += 1
+            h[-2] += value
+            h[-1] += 1
+
+    def drain(self) -> dict:
+        """Instantané remis à zéro (côté worker), à fusionner dans le process serveur."""
+        with self._lock:
+            snapshot = {"counters": self.counters, "gauges": self.gauges, "histograms": self.histograms}
+            self.counters, self.gauges, self.histograms = {}, {}, {}
+        return snapshot
+
+    def merge(self, snapshot: dict):
+        with self._lock:
+            for key, value in snapshot["counters"].items(): self.counters[key] = self.counters.get(key, 0) + value
+            self.gauges.update(snapshot["gauges"])
+            for key, values in snapshot["histograms"].items():
+                h = self.histograms.setdefault(key, [0] * len(values))
+                for i, v in enumerate(values): h[i] += v
+
+    def render(self) -> str:
+        def fmt(labels):
+            return "{" + ",".join(f'{k}="{str(v)}"' for k, v in labels) + "}" if labels else ""
+        with self._lock:
+            counters, gauges, histograms = dict(self.counters), dict(self.gauges), {k: list(v) for k, v in self.histograms.items()}
+        lines = []
+        for name, (kind, help_text) in METRICS.items():
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+            for (n, labels), value in sorted(counters.items() if kind == "counter" else gauges.items()):
+                if n == name: lines.append(f"{name}{fmt(labels)} {value:g}")
+            for (n, labels, buckets), h in sorted(histograms.items()):
+                if n != name: continue
+                cumulative = 0
+                for bound, count in zip(buckets + ("+Inf",), h):
+                    cumulative += count
+                    lines.append(f"{name}_bucket{fmt(labels + (('le', bound),))} {cumulative}")
+                lines.append(f"{name}_sum{fmt(labels)} {h[-2]:g}")
+                lines.append(f"{name}_count{fmt(labels)} {h[-1]}")
+        return "\n".join(lines) + "\n"
+
+registry = Registry()
+
+def inc(name: str, value: float = 1, **labels):
+    if METRICS_ENABLED: registry.inc(name, value, **labels)
+
+def set_gauge(name: str, value: float, **labels):
+    if METRICS_ENABLED: registry.set(name, value, **labels)
+
+def observe_stage(stage: str, seconds: float, **labels):
+    """Étape d'analyse : histogramme + détail de la requête en cours si profilée."""
+    if not METRICS_ENABLED: return
+    registry.observe("okura_nlp_stage_seconds", seconds, stage=stage, **labels)
+    stats = _request.get()
+    if stats is not None and stats.stages is not None: stats.stages[stage] = stats.stages.get(stage, 0.0) + seconds
+
+@contextmanager
+def stage(name: str, **labels):
+    start = time.perf_counter()
+    try: yield
+    finally: observe_stage(name, time.perf_counter() - start, **labels)
+
+def drain() -> dict:
+    return registry.drain()
+
+def merge(snapshot: dict):
+    """Mesures d'un worker : ajoutées au registre et au profil de la requête en cours."""
+    registry.merge(snapshot)
+    stats = _request.get()
+    if stats is None or stats.stages is None: return
+    for (name, labels, _), h in snapshot["histograms"].items():
+        if name == "okura_nlp_stage_seconds":
+            stage_name = dict(labels)["stage"]
+            stats.stages[stage_name] = stats.stages.get(stage_name, 0.0) + h[-2]
+
+def render() -> str:
+    return registry.render()
+
+# --- SQL ---
+def instrument_engine(engine):
+    """Compte et chronomètre chaque requête SQL (global et par requête HTTP)."""
+    from sqlalchemy import event
+
+    # Début porté par le contexte d'exécution (propre à chaque requête) : rien ne reste sur la
+    # connexion quand une requête lève une erreur et after_cursor_execute n'est pas appelé
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        context._okura_query_start = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - context._okura_query_start
+        registry.inc("okura_sql_queries_total")
+        registry.observe("okura_sql_query_duration_seconds", elapsed)
+        stats = _request.get()
+        if stats is not None:
+            stats.queries += 1
+            stats.sql_seconds += elapsed
+
+# --- HTTP ---
+class MetricsMiddleware:
+    """Latence et statut par route ; en-tête Server-Timing si la requête porte X-Okura-Profile."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not METRICS_ENABLED:
+            return await self.app(scope, receive, send)
+        profile = PROFILE_HEADER and any(k == b"x-okura-profile" for k, _ in scope["headers"])
+        stats = RequestStats(profile)
+        token = _request.set(stats)
+        start = time.perf_counter()
+        status = 500
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if profile:
+                    message.setdefault("headers", [])
+                    message["headers"] = list(message["headers"]) + [(b"server-timing", server_timing(stats, start).encode())]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            elapsed = time.perf_counter() - start
+            route = scope.get("route")
+            path = getattr(route, "path", None) or "unmatched"
+            registry.inc("okura_http_requests_total", method=scope["method"], route=path, status=status)
+            registry.observe("okura_http_request_duration_seconds", elapsed, method=scope["method"], route=path)
+            registry.observe("okura_sql_queries_per_request", stats.queries, buckets=COUNT_BUCKETS, route=path)
+            _request.reset(token)
+
+def server_timing(stats: RequestStats, start: float) -> str:
+    parts = [f'total;dur={(time.perf_counter() - start) * 1000:.1f}',
+             f'sql;dur={stats.sql_seconds * 1000:.1f};desc="{stats.queries} queries"']
+    parts += [f"{name};dur={seconds * 1000:.1f}" for name, seconds in (stats.stages or {}).items()]
+    return ", ".join(parts)
@@ -1,21 +1,27 @@
 import re
 import os
+import hashlib
+import threading
+import time
 import urllib.request
 import zipfile
 from sudachipy import tokenizer, dictionary
 from jamdict import Jamdict
-from bs4 import BeautifulSoup
-import ebooklib
-from ebooklib import epub
-import tempfile
 import jieba
+from importlib import metadata
 from pypinyin import pinyin, Style
+from app.config import JMDICT_CACHE_SIZE, CN_WORD_CACHE_SIZE, LEXICON_PATH, ANALYSIS_CHUNK_LINES
+from app.services.cache import LRUCache
+from app.services import metrics
+from app.services.lexicon import open_lexicon, iter_cedict_entries, oov_entry_id
+from app.services.extract import clean_html_text, iter_epub_chapters, extract_text_from_epub
 
-# --- MOTEUR JAPONAIS ---
-print("Init NLP Japonais...")
-tokenizer_obj = dictionary.Dictionary().create()
-mode = tokenizer.Tokenizer.SplitMode.C
-jmd = Jamdict()
+# --- LEXIQUE COMPILÉ (mmap, partagé entre workers) ---
+_t = time.perf_counter()
+lexicon = open_lexicon(LEXICON_PATH)
+if lexicon:
+    metrics.set_gauge("okura_dictionary_load_seconds", time.perf_counter() - _t, source="lexicon")
+    print(f"Lexique compilé chargé : {LEXICON_PATH} ({', '.join(lexicon.sections)})")
 
 # --- MOTEUR CHINOIS ---
 CEDICT_URL = "https://www.mdbg.net/chinese/export/cedict/cedict_1_0_ts_utf-8_mdbg.zip"
@@ -23,7 +29,9 @@ CEDICT_FILE = "cedict_ts.u8"
 cedict_data = {}
 
 def load_cedict():
-    """Charge ou télécharge le dictionnaire chinois."""
+    """Charge ou télécharge le dictionnaire chinois. Lève RuntimeError en cas d'échec : le moteur chinois
+    n'est alors pas enregistré (erreur visible dans /ready) et sera recréé au prochain appel."""
+    global _dictionary_version
     if not os.path.exists(CEDICT_FILE):
         print("Téléchargement du dictionnaire Chinois (CC-CEDICT)...")
         try:
@@ -43,71 +51,152 @@ def load_cedict():
             print("Dictionnaire Chinois installé.")
         except Exception as e:
             print(f"ERREUR CRITIQUE DICO CHINOIS: {e}")
-            return
+            raise RuntimeError(f"Dictionnaire chinois indisponible : {e}") from e
 
     if not cedict_data:
         print("Chargement CEDICT en mémoire...")
+        start = time.perf_counter()
         try:
-            with open(CEDICT_FILE, 'r', encoding='utf-8') as f:
-                for line in f:
-                    if line.startswith('#') or not line.strip(): continue
-                    parts = line.split(' ', 2)
-                    if len(parts) < 3: continue
-                    
-                    traditional, simplified, rest = parts
-                    
-                    # Extraction définitions
-                    defs = []
-                    if '/' in rest:
-                        defs = rest.split('/', 1)[1].strip().strip('/').split('/')
-                    
-                    entry = {"defs": defs}
-                    
-                    # On indexe les deux formes
-                    if simplified not in cedict_data: cedict_data[simplified] = []
-                    cedict_data[simplified].append(entry)
-                    if traditional not in cedict_data: cedict_data[traditional] = []
-                    cedict_data[traditional].append(entry)
+            for traditional, simplified, _, defs, ent_id in iter_cedict_entries(CEDICT_FILE):
+                entry = {"defs": defs, "ent_seq": ent_id}
+                # On indexe les deux formes
+                if simplified not in cedict_data: cedict_data[simplified] = []
+                cedict_data[simplified].append(entry)
+                if traditional not in cedict_data: cedict_data[traditional] = []
+                cedict_data[traditional].append(entry)
             print(f"CEDICT chargé : {len(cedict_data)} entrées.")
+            metrics.set_gauge("okura_dictionary_load_seconds", time.perf_counter() - start, source="cedict")
+            # Le fichier a pu être (re)téléchargé : on recalcule l'empreinte
+            _dictionary_version = None
         except Exception as e:
             print(f"Erreur lecture CEDICT: {e}")
+            cedict_data.clear()  # pas de dictionnaire partiel
+            raise RuntimeError(f"Lecture de CEDICT impossible : {e}") from e
 
-# Lancement au démarrage (non bloquant si échec)
-try: load_cedict()
-except: pass
+# --- VERSION DES DICTIONNAIRES ---
+# À incrémenter quand la forme des tokens produits change (invalide les résultats en cache)
+ANALYZER_VERSION = 4
+_dictionary_version = None
 
-# --- OUTILS ---
-def clean_html_text(html_content: str) -> str:
-    soup = BeautifulSoup(html_content, 'html.parser')
-    for tag in soup(['rt', 'rp', 'script', 'style']): tag.decompose()
-    text = soup.get_text()
-    return re.sub(r'［＃.*?］', '', text)
+def dictionary_version() -> str:
+    """Empreinte des artefacts utilisés par l'analyse (paquets, lexique compilé, fichier CEDICT)."""
+    global _dictionary_version
+    if _dictionary_version is None:
+        parts = [f"analyzer={ANALYZER_VERSION}", f"lexicon={lexicon.version if lexicon else ''}"]
+        for pkg in ("sudachidict-core", "jamdict-data", "jieba", "pypinyin"):
+            try: parts.append(f"{pkg}={metadata.version(pkg)}")
+            except metadata.PackageNotFoundError: parts.append(f"{pkg}=")
+        if os.path.exists(CEDICT_FILE):
+            st = os.stat(CEDICT_FILE)
+            parts.append(f"cedict={st.st_size}:{int(st.st_mtime)}")
+        _dictionary_version = hashlib.sha1("|".join(parts).encode()).hexdigest()[:16]
+    return _dictionary_version
+
+# --- REGISTRE DES MOTEURS ---
+# Rien n'est initialisé à l'import : chaque moteur est construit au premier usage
+# (ou en tâche de fond au démarrage via warmup()), une seule fois par process.
+JP_TARGET_POS = ("名詞", "動詞", "形容詞", "副詞", "助動詞", "形状詞", "代名詞", "固有名詞")
+
+class JapaneseEngine:
+    def __init__(self):
+        print("Init NLP Japonais...")
+        self.dictionary = dictionary.Dictionary()
+        self.mode = tokenizer.Tokenizer.SplitMode.C
+        # Un tokenizer Sudachi par thread (threadpool du serveur, jobs) : le dictionnaire est partagé
+        self._local = threading.local()
+        self.jmd = Jamdict()
+        # POS résolus une fois : id -> catégorie principale, et ids des catégories analysées
+        self.pos_names = []
+        while (pos := self.dictionary.pos_of(len(self.pos_names))) is not None: self.pos_names.append(pos[0])
+        self.target_pos = frozenset(i for i, name in enumerate(self.pos_names) if name in JP_TARGET_POS)
+
+    @property
+    def tokenizer(self):
+        tok = getattr(self._local, "tokenizer", None)
+        if tok is None: tok = self._local.tokenizer = self.dictionary.tokenizer(mode=self.mode)
+        return tok
+
+class ChineseEngine:
+    def __init__(self):
+        print("Init NLP Chinois...")
+        # Inutile de charger CEDICT en mémoire si le lexique compilé couvre le chinois
+        if not (lexicon and lexicon.has("cn")): load_cedict()
+        # Instance dédiée (même dictionnaire que jieba.dt), initialisée une fois et réutilisée
+        self.tokenizer = jieba.Tokenizer()
+        self.tokenizer.initialize()
+
+ENGINE_FACTORIES = {"jp": JapaneseEngine, "cn": ChineseEngine}
+_engines = {}
+_engine_locks = {lang: threading.Lock() for lang in ENGINE_FACTORIES}
+_engine_load_times = {}
+_engine_errors = {}
 
+def get_engine(lang: str):
+    engine = _engines.get(lang)
+    if engine is not None: return engine
+    with _engine_locks[lang]:
+        if lang not in _engines:
+            start = time.perf_counter()
+            try:
+                _engines[lang] = ENGINE_FACTORIES[lang]()
+            except Exception as e:
+                _engine_errors[lang] = str(e)
+                raise
+            _engine_errors.pop(lang, None)
+            _engine_load_times[lang] = round(time.perf_counter() - start, 3)
+            metrics.set_gauge("okura_dictionary_load_seconds", _engine_load_times[lang], source=f"engine_{lang}")
+        return _engines[lang]
+
+def warmup(langs=None):
+    """Initialise les moteurs demandés en parallèle, en tâche de fond (non bloquant)."""
+    threads = []
+    for lang in ENGINE_FACTORIES if langs is None else langs:
+        if lang not in ENGINE_FACTORIES: continue
+        def run(lang=lang):
+            try: get_engine(lang)
+            except Exception as e: print(f"ERREUR INIT MOTEUR {lang}: {e}")
+        t = threading.Thread(target=run, name=f"nlp-warmup-{lang}", daemon=True)
+        t.start()
+        threads.append(t)
+    return threads
+
+def engine_status():
+    return {
+        lang: {"ready": lang in _engines, "load_seconds": _engine_load_times.get(lang), "error": _engine_errors.get(lang)}
+        for lang in ENGINE_FACTORIES
+    }
+
+# --- OUTILS ---
 def clean_raw_text(text: str) -> str:
     text = re.sub(r'《.*?》', '', text)
     text = text.replace('｜', '')
     return re.sub(r'［＃.*?］', '', text)
 
-def extract_text_from_epub(file_bytes: bytes) -> str:
-    with tempfile.NamedTemporaryFile(delete=False) as tmp:
-        tmp.write(file_bytes)
-        tmp_path = tmp.name
-    try:
-        book = epub.read_epub(tmp_path)
-        full = []
-        for item in book.get_items():
-            if item.get_type() == ebooklib.ITEM_DOCUMENT:
-                full.append(clean_html_text(item.get_content().decode('utf-8')))
-        return "\n".join(full)
-    except: return ""
-    finally:
-        if os.path.exists(tmp_path): os.remove(tmp_path)
+def decode_text_bytes(content: bytes) -> str:
+    try: return content.decode('utf-8')
+    except: return content.decode('shift_jis', errors='ignore')
+
+def iter_document_chapters(filename: str, content, page_lines: int = 500):
+    """Découpe un fichier importé en chapitres (EPUB) ou en pages de lignes (HTML, TXT).
+
+    content : bytes ou objet fichier.
+    """
+    name = filename.lower()
+    if name.endswith('.epub'):
+        yield from iter_epub_chapters(content)
+        return
+    if not isinstance(content, (bytes, bytearray)): content = content.read()
+    decoded = decode_text_bytes(content)
+    text = clean_html_text(decoded) if name.endswith(('.html', '.htm')) else clean_raw_text(decoded)
+    lines = text.splitlines()
+    for i in range(0, len(lines), page_lines):
+        # "\n" final : une ligne vide en fin de page survit au re-découpage
+        yield f"Page {i // page_lines + 1}", "\n".join(lines[i:i + page_lines]) + "\n"
 
 # --- ANALYSE ---
 def analyze_text(text: str, lang: str = "jp"):
     result = {}
     if lang == "cn":
-        if not cedict_data: load_cedict()
         result = analyze_chinese_text(text)
     else:
         result = analyze_japanese_text(text)
@@ -115,40 +204,62 @@ def analyze_text(text: str, lang: str = "jp"):
     result["raw_text"] = text
     return result
 
+def iter_analyze_text(text: str, lang: str = "jp"):
+    """Version générateur de analyze_text : produit les phrases au fil de l'analyse."""
+    if lang == "cn": return iter_chinese_sentences(text)
+    return iter_japanese_sentences(text)
+
 def analyze_chinese_text(text: str):
-    lines = text.splitlines()
-    sentences = []
-    
-    for line in lines:
+    return {"sentences": list(iter_chinese_sentences(text))}
+
+# --- CACHE CHINOIS ---
+# mot -> champs du token déjà construits (pinyin, définitions, ID stable), ou None si ce n'est pas un mot
+cn_word_cache = LRUCache(CN_WORD_CACHE_SIZE)
+_NON_WORD = re.compile(r'^[^\w\u4e00-\u9fff]+$')
+_NO_WORD_CHAR = re.compile(r'^[^\w]*$')
+
+def build_chinese_payload(w: str):
+    # Détection mot (au moins un caractère non-symbole)
+    if not w.strip() or _NON_WORD.match(w): return None
+    reading = " ".join(x[0] for x in pinyin(w, style=Style.TONE))
+    # Hors dictionnaire : ID dérivé du mot, stable d'un process à l'autre (pas de hash())
+    defs, ent_seq = [], oov_entry_id(w)
+    if lexicon and lexicon.has("cn"):
+        found = lexicon.lookup("cn", w)
+        if found: defs, ent_seq = found["definitions"], found["ent_seq"]
+    elif w in cedict_data:
+        entry = cedict_data[w][0]
+        defs, ent_seq = entry["defs"][:4], entry["ent_seq"]
+    return {"is_word": True, "lemma": w, "reading": reading, "pos": "Mot", "ent_seq": ent_seq,
+            "definitions": defs, "jlpt": None}
+
+def chinese_token(w: str) -> dict:
+    payload = cn_word_cache.get(w, _NOT_CACHED)
+    if payload is _NOT_CACHED:
+        payload = build_chinese_payload(w)
+        cn_word_cache.set(w, payload)
+    if payload is None: return {"text": w, "is_word": False}
+    token = {"text": w, **payload}
+    token["definitions"] = list(payload["definitions"])
+    return token
+
+def iter_chinese_sentences(text: str):
+    engine = get_engine("cn")
+    for line in text.splitlines():
         if not line.strip():
-            sentences.append([{"text": "", "is_word": False}])
+            yield [{"text": "", "is_word": False}]
             continue
-            
-        words = jieba.cut(line)
-        tokens = []
-        for w in words:
-            # Détection mot (au moins un caractère non-symbole)
-            is_word = len(w.strip()) > 0 and not re.match(r'^[^\w\u4e00-\u9fff]+$', w)
-            
-            token = {"text": w, "is_word": is_word}
-            if is_word:
-                # Pinyin
-                pys = pinyin(w, style=Style.TONE)
-                reading = " ".join([x[0] for x in pys])
-                
-                # Defs
-                defs = []
-                if w in cedict_data:
-                    defs = cedict_data[w][0]['defs'][:4]
-                
-                token.update({
-                    "lemma": w, "reading": reading, "pos": "Mot",
-                    "ent_seq": abs(hash(w)) % 100000000, # ID Hash positif
-                    "definitions": defs, "jlpt": None
-                })
-            tokens.append(token)
-        sentences.append(tokens)
-    return {"sentences": sentences}
+
+        start = time.perf_counter()
+        if _NO_WORD_CHAR.match(line) and not jieba.re_han_default.search(line):
+            # Ponctuation / symboles seuls : jieba rendrait un token par caractère, sans mot
+            tokens = [{"text": c, "is_word": False} for c in line]
+        else:
+            tokens = [chinese_token(w) for w in engine.tokenizer.cut(line)]
+        metrics.observe_stage("analyze", time.perf_counter() - start, lang="cn")
+        metrics.inc("okura_nlp_lines_total", lang="cn")
+        metrics.inc("okura_nlp_tokens_total", len(tokens), lang="cn")
+        yield tokens
 
 def estimate_jlpt(entry):
     # Logique simplifiée pour JMDict
@@ -157,42 +268,169 @@ def estimate_jlpt(entry):
             if 'jlpt-n' in str(m): return int(str(m)[-1])
     return 4 if any(k.pri for k in entry.kanji_forms) else 1
 
+# --- CACHE JMDICT ---
+# forme -> payload déjà construit ({ent_seq, definitions, jlpt}) ou None si introuvable
+jmdict_cache = LRUCache(JMDICT_CACHE_SIZE)
+
+# Même critère que jmd.lookup() (kanji, kana ou glose exacte), mais pour N formes d'un coup.
+# L'ordre de Entry est celui utilisé par lookup(), on garde donc la première entrée par forme.
+_BATCH_LOOKUP_SQL = """
+SELECT q.text, e.idseq FROM Entry e JOIN (
+    SELECT text, idseq FROM Kanji WHERE text IN ({slots})
+    UNION SELECT text, idseq FROM Kana WHERE text IN ({slots})
+    UNION SELECT g.text, s.idseq FROM Sense s JOIN SenseGloss g ON s.ID = g.sid WHERE g.text IN ({slots})
+) q ON q.idseq = e.idseq ORDER BY e.rowid
+"""
+_BATCH_CHUNK = 300  # reste sous la limite de paramètres SQLite (3 x chunk)
+
+def build_jmdict_payload(entry):
+    defs = [g.text for s in entry.senses for g in s.gloss]
+    return {"ent_seq": int(entry.idseq), "definitions": defs[:4], "jlpt": estimate_jlpt(entry)}
+
+_NOT_CACHED = object()
+
+def lookup_jmdict(form: str):
+    """Lookup d'une forme, via le cache LRU."""
+    return lookup_jmdict_batch([form]).get(form)
+
+def lookup_jmdict_batch(forms):
+    """Résout un ensemble de formes : les absentes du cache sont cherchées en une seule passe."""
+    result, missing = {}, []
+    for f in dict.fromkeys(forms):
+        payload = jmdict_cache.get(f, _NOT_CACHED)
+        if payload is _NOT_CACHED: missing.append(f)
+        else: result[f] = payload
+    metrics.inc("okura_jmdict_lookups_total", len(result), result="hit")
+    metrics.inc("okura_jmdict_lookups_total", len(missing), result="miss")
+    if not missing: return result
+
+    if lexicon and lexicon.has("jp"):
+        for f in missing:
+            payload = lexicon.lookup("jp", f)
+            jmdict_cache.set(f, payload)
+            result[f] = payload
+        return result
+
+    jmd = get_engine("jp").jmd
+    found = {}
+    try:
+        with jmd.jmdict.ctx() as ctx:
+            cur = ctx.conn.cursor()
+            for i in range(0, len(missing), _BATCH_CHUNK):
+                chunk = missing[i:i + _BATCH_CHUNK]
+                sql = _BATCH_LOOKUP_SQL.format(slots=",".join("?" * len(chunk)))
+                for text, idseq in cur.execute(sql, chunk * 3):
+                    found.setdefault(text, idseq)
+            entries = {idseq: jmd.jmdict.get_entry(idseq, ctx=ctx) for idseq in set(found.values())}
+    except Exception as e:
+        # On ne met rien en cache : un échec de la base ne doit pas être mémorisé comme "introuvable"
+        print(f"Erreur lookup JMdict: {e}")
+        return result
+
+    payloads = {idseq: build_jmdict_payload(entry) for idseq, entry in entries.items()}
+    for f in missing:
+        payload = payloads.get(found[f]) if f in found else None
+        jmdict_cache.set(f, payload)
+        result[f] = payload
+    return result
+
+def cache_stats():
+    return {"jmdict": jmdict_cache.stats(), "cn_words": cn_word_cache.stats(), "lexicon": lexicon.version if lexicon else None}
+
 def analyze_japanese_text(text: str):
+    return {"sentences": _analyze_japanese_lines(text.splitlines())}
+
+def iter_japanese_sentences(text: str, batch_lines: int = ANALYSIS_CHUNK_LINES):
+    # Lookups groupés par paquet de lignes : compromis entre premier résultat rapide et requêtes groupées
     lines = text.splitlines()
+    for i in range(0, len(lines), batch_lines):
+        yield from _analyze_japanese_lines(lines[i:i + batch_lines])
+
+# Lignes très courtes (dialogues, titres) regroupées en un seul appel Sudachi, séparées par "\n"
+# puis redécoupées : au-delà de ~10 caractères, l'appel ligne à ligne redevient plus rapide.
+JP_SHORT_LINE_CHARS = 10
+JP_TOKENIZE_BATCH_CHARS = 4000
+
+def _iter_japanese_morphemes(engine, lines: list):
+    """(n° de ligne, morphème, surface) dans l'ordre du texte ; les lignes blanches n'en produisent pas."""
+    tok = engine.tokenizer
+    batch, size = [], 0
+
+    def flush():
+        # Chaque ligne est encadrée de "\n", y compris la première et la dernière du paquet : ses tokens ne
+        # dépendent ni de ses voisines ni de sa place dans le paquet (Sudachi traite à part le début et la
+        # fin de l'entrée : blancs initiaux, « … » final). Une ligne courte seule donne donc les mêmes
+        # tokens qu'au milieu d'un document (analyse incrémentale == analyse complète).
+        i = -1  # ligne courante du paquet (-1 : avant la première)
+        for m in tok.tokenize("\n" + "\n".join(line for _, line in batch) + "\n"):
+            surface = m.surface()
+            if "\n" in surface:
+                # Blanc à cheval sur une fin de ligne : les morceaux restent sur leurs lignes respectives
+                for j, piece in enumerate(surface.split("\n")):
+                    if piece: yield batch[i + j][0], m, piece
+                i += surface.count("\n")
+            elif surface:
+                yield batch[i][0], m, surface
+        batch.clear()
+
+    for idx, line in enumerate(lines):
+        if not line.strip(): continue
+        if len(line) >= JP_SHORT_LINE_CHARS:
+            if batch: yield from flush()
+            size = 0
+            for m in tok.tokenize(line): yield idx, m, m.surface()
+            continue
+        if size + len(line) > JP_TOKENIZE_BATCH_CHARS:
+            yield from flush()
+            size = 0
+        batch.append((idx, line))
+        size += len(line) + 1
+    if batch: yield from flush()
+
+def _analyze_japanese_lines(lines: list):
     sentences = []
-    targets = ["名詞", "動詞", "形容詞", "副詞", "助動詞", "形状詞", "代名詞", "固有名詞"] 
+    engine = get_engine("jp")
+    target_pos, pos_names = engine.target_pos, engine.pos_names
+    # 1re passe : tokenisation et collecte des formes candidates de tout le document
+    parsed = [None if not line.strip() else [] for line in lines]
+    all_forms = set()
+    t0 = time.perf_counter()
+    for idx, m, w in _iter_japanese_morphemes(engine, lines):
+        pos_id = m.part_of_speech_id()
+        if pos_id in target_pos:
+            forms = [f for f in [m.dictionary_form(), m.normalized_form(), w] if f]
+            all_forms.update(forms)
+            parsed[idx].append((w, pos_names[pos_id], forms, m.reading_form()))
+        else:
+            parsed[idx].append((w, None, None, None))
 
-    for line in lines:
-        if not line.strip():
+    # 2e passe : lookups groupés (cache + une requête pour les formes inconnues)
+    t1 = time.perf_counter()
+    payloads = lookup_jmdict_batch(all_forms)
+    t2 = time.perf_counter()
+
+    for morphemes in parsed:
+        if morphemes is None:
             sentences.append([{"text": "", "is_word": False}])
             continue
-            
+
         tokens = []
-        for m in tokenizer_obj.tokenize(line, mode):
-            w = m.surface()
-            try: pos = m.part_of_speech()[0]
-            except: pos = "Inconnu"
-            
+        for w, pos, forms, reading in morphemes:
             token = {"text": w, "is_word": False}
-            if pos in targets:
-                forms = [f for f in [m.dictionary_form(), m.normalized_form(), w] if f]
-                found = None
-                for f in forms:
-                    try:
-                        res = jmd.lookup(f)
-                        if res.entries: 
-                            found = res.entries[0]
-                            break
-                    except: continue
-                
+            if forms:
+                found = next((payloads[f] for f in forms if payloads.get(f)), None)
                 if found:
-                    defs = [g.text for s in found.senses for g in s.gloss]
                     token.update({
-                        "is_word": True, "lemma": forms[0], 
-                        "reading": m.reading_form(), "pos": pos,
-                        "ent_seq": int(found.idseq), "definitions": defs[:4],
-                        "jlpt": estimate_jlpt(found)
+                        "is_word": True, "lemma": forms[0],
+                        "reading": reading, "pos": pos,
+                        "ent_seq": found["ent_seq"], "definitions": list(found["definitions"]),
+                        "jlpt": found["jlpt"]
                     })
             tokens.append(token)
         sentences.append(tokens)
-    return {"sentences": sentences}
\ No newline at end of file
+    metrics.observe_stage("tokenize", t1 - t0, lang="jp")
+    metrics.observe_stage("lookup", t2 - t1, lang="jp")
+    metrics.observe_stage("build", time.perf_counter() - t2, lang="jp")
+    metrics.inc("okura_nlp_lines_total", len(lines), lang="jp")
+    metrics.inc("okura_nlp_tokens_total", sum(len(t) for t in sentences), lang="jp")
+    return sentences
\ No newline at end of file
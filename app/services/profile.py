@@ -0,0 +1,68 @@
+import heapq
+from array import array
+
+# Profil de vocabulaire d'un document analysé, en un seul passage sur les tokens :
+# chaque entrée (ent_seq) reçoit un indice dense, les compteurs vivent dans des tableaux.
+CONTEXT_CHARS = 120
+
+class DocumentProfile:
+    def __init__(self):
+        self.index = {}            # ent_seq -> indice dense
+        self.counts = array('I')   # occurrences par indice
+        self.tokens = []           # token de la 1re occurrence (lemme, lecture, définitions...)
+        self.contexts = []         # phrase de la 1re occurrence
+        self.levels = array('I', [0] * 6)  # tokens par niveau JLPT (0 = inconnu)
+        self.sentences = 0
+        self.word_tokens = 0
+
+    def add(self, sentences):
+        """Ajoute des phrases (listes de tokens au format AnalyzeResponse), ex. chapitre par chapitre."""
+        index, counts, levels = self.index, self.counts, self.levels
+        for sentence in sentences:
+            context = None
+            for token in sentence:
+                ent_seq = token.get("ent_seq")
+                if not token.get("is_word") or ent_seq is None: continue
+                self.word_tokens += 1
+                i = index.get(ent_seq)
+                if i is None:
+                    i = index[ent_seq] = len(counts)
+                    counts.append(0)
+                    self.tokens.append(token)
+                    if context is None: context = "".join(t["text"] for t in sentence).strip()[:CONTEXT_CHARS]
+                    self.contexts.append(context)
+                counts[i] += 1
+                jlpt = token.get("jlpt")
+                levels[jlpt if jlpt and 0 < jlpt < 6 else 0] += 1
+        self.sentences += len(sentences)
+
+    def result(self, known: set, top: int = 50, candidates: int = 50) -> dict:
+        counts, ent_seqs = self.counts, list(self.index)
+        known_flags = [e in known for e in ent_seqs]
+        known_tokens = sum(c for c, k in zip(counts, known_flags) if k)
+
+        def entry(i):
+            t = self.tokens[i]
+            return {"lemma": t.get("lemma") or t["text"], "reading": t.get("reading"), "ent_seq": ent_seqs[i],
+                    "count": counts[i], "jlpt": t.get("jlpt"), "known": known_flags[i]}
+
+        def candidate(i):
+            t = self.tokens[i]
+            # Mêmes champs que VocabCardCreate : envoyable tel quel à /{list_id}/cards/bulk
+            return {"terme": t.get("lemma") or t["text"], "lecture": t.get("reading"), "pos": t.get("pos"),
+                    "ent_seq": ent_seqs[i], "definitions": t.get("definitions") or [], "context": self.contexts[i],
+                    "count": counts[i], "jlpt": t.get("jlpt")}
+
+        by_count = counts.__getitem__
+        unknown = (i for i, k in enumerate(known_flags) if not k)
+        return {
+            "sentences": self.sentences,
+            "tokens": self.word_tokens,
+            "distinct": len(counts),
+            "known_tokens": known_tokens,
+            "known_distinct": sum(known_flags),
+            "coverage": round(known_tokens / self.word_tokens, 4) if self.word_tokens else 0.0,
+            "levels": {str(level or "none"): n for level, n in enumerate(self.levels) if n},
+            "frequencies": [entry(i) for i in heapq.nlargest(top, range(len(counts)), key=by_count)],
+            "candidates": [candidate(i) for i in heapq.nlargest(candidates, unknown, key=by_count)],
+        }
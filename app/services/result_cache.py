@@ -0,0 +1,43 @@
+import hashlib
+import zlib
+from sqlalchemy.orm import Session
+from app.config import RESULT_CACHE_SIZE, RESULT_CACHE_PERSIST
+from app.crud import analysis_cache as crud
+from app.schemas import vocabulaire as schemas
+from app.services import nlp
+from app.services.cache import LRUCache
+
+# Résultats d'analyse adressés par contenu : (hash du texte, langue, version des dictionnaires).
+# Tier mémoire LRU (JSON compressé) devant un tier persistant en base (table analysis_results).
+memory_tier = LRUCache(RESULT_CACHE_SIZE)
+
+def cache_key(text: str, lang: str) -> str:
+    h = hashlib.sha256()
+    h.update(f"{lang}\0{nlp.dictionary_version()}\0".encode())
+    h.update(text.encode('utf-8'))
+    return h.hexdigest()
+
+def encode_result(result: dict) -> bytes:
+    """JSON AnalyzeResponse (même forme que la réponse validée par FastAPI)."""
+    return schemas.AnalyzeResponse.model_validate(result).model_dump_json().encode()
+
+def load(db: Session, key: str):
+    """JSON du résultat en cache, ou None."""
+    data = memory_tier.get(key)
+    if data is None and RESULT_CACHE_PERSIST:
+        data = crud.get_result(db, key)
+        if data is not None: memory_tier.set(key, data)
+    return zlib.decompress(data) if data is not None else None
+
+def store(db: Session, key: str, lang: str, payload: bytes):
+    data = zlib.compress(payload, 6)
+    memory_tier.set(key, data)
+    if RESULT_CACHE_PERSIST:
+        crud.save_result(db, key, lang, nlp.dictionary_version(), len(payload), data)
+
+def purge_stale(db: Session) -> int:
+    """Supprime les résultats calculés avec d'autres versions de dictionnaires."""
+    return crud.purge_stale_results(db, nlp.dictionary_version())
+
+def stats():
+    return {"memory": memory_tier.stats(), "dict_version": nlp.dictionary_version()}
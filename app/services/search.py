@@ -0,0 +1,39 @@
+import os
+import threading
+import unicodedata
+from app.services.lexicon import iter_cedict
+
+# Normalisation appliquée à l'indexation comme à la requête : NFKC (pleine / demi-chasse),
+# minuscules, katakana -> hiragana, sinogrammes traditionnels -> simplifiés (table tirée de CC-CEDICT).
+# Ainsi « ネコ » trouve « ねこ », et « 學生 » trouve « 学生 ».
+
+_KATAKANA = {code: code - 0x60 for code in range(0x30A1, 0x30F7)}  # ァ..ヶ -> ぁ..ゖ
+_table = None
+_table_lock = threading.Lock()
+
+def traditional_to_simplified(path: str) -> dict:
+    """Table caractère -> caractère : entrées d'un caractère d'abord, puis mots de même longueur."""
+    table, pairs = {}, []
+    for traditional, simplified, _, _ in iter_cedict(path):
+        if len(traditional) != len(simplified) or traditional == simplified: continue
+        if len(traditional) == 1: table.setdefault(ord(traditional), simplified)
+        else: pairs.append((traditional, simplified))
+    for traditional, simplified in pairs:
+        for t, s in zip(traditional, simplified):
+            if t != s: table.setdefault(ord(t), s)
+    return table
+
+def _translation_table() -> dict:
+    global _table
+    if _table is None:
+        with _table_lock:
+            if _table is None:
+                from app.services.nlp import CEDICT_FILE
+                table = dict(_KATAKANA)
+                if os.path.exists(CEDICT_FILE): table.update(traditional_to_simplified(CEDICT_FILE))
+                _table = table
+    return _table
+
+def normalize(text: str) -> str:
+    if not text: return ""
+    return unicodedata.normalize("NFKC", text).lower().translate(_translation_table())
@@ -0,0 +1,58 @@
+from datetime import date, datetime, time, timedelta
+from typing import NamedTuple, Optional, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # dépendance optionnelle (extra "forecast") : seules les prévisions vectorisées en ont besoin
+    np = None
+
+# --- SM-2 ---
+# Seule implémentation de la mise à jour SM-2 : utilisée par les révisions (unitaires ou par lot)
+# et par tout ce qui simule des révisions, pour qu'aucune copie ne diverge.
+# Le même code accepte des scalaires (une carte) ou des tableaux NumPy (tout un deck, cf. app/services/forecast.py).
+MIN_EASE = 1.3
+DEFAULT_EASE = 2.5
+
+class SM2Params(NamedTuple):
+    min_ease: float = MIN_EASE
+    max_ease: Optional[float] = None        # pas de plafond par défaut
+    steps: Tuple[int, ...] = (1, 6)         # intervalles (jours) des premières réussites, puis interval * ease
+    fail_interval: int = 1                  # intervalle après un échec (qualité < 3)
+
+DEFAULT_PARAMS = SM2Params()
+
+def due_cutoff(today: date = None) -> datetime:
+    """Une carte est due le jour de son next_review, quelle que soit l'heure : next_review < cutoff.
+    Seule définition de « dû » (file de révision, compteurs par jour, tableau de bord)."""
+    return datetime.combine((today or date.today()) + timedelta(days=1), time.min)
+
+def _is_array(value) -> bool:
+    return np is not None and isinstance(value, np.ndarray)
+
+def _where(cond, a, b):
+    if _is_array(cond): return np.where(cond, a, b)
+    return a if cond else b
+
+def _clip(value, low, high):
+    if _is_array(value): return np.clip(value, low, high)
+    value = max(low, value)
+    return value if high is None else min(high, value)
+
+def _trunc(value):
+    return value.astype(np.int64) if _is_array(value) else int(value)
+
+def sm2_update(streak, interval, ease_factor, quality, params: SM2Params = DEFAULT_PARAMS):
+    """Nouvel état (streak, interval en jours, ease_factor) après une révision de qualité 0-5."""
+    if not _is_array(interval):
+        # Colonnes NULL (anciennes cartes) : mêmes valeurs par défaut que crud.get_schedule_rows
+        streak, interval = streak or 0, interval or 0
+        ease_factor = DEFAULT_EASE if ease_factor is None else ease_factor
+    lapse = 5 - quality
+    new_interval = _trunc(interval * ease_factor)
+    for i in reversed(range(len(params.steps))):
+        new_interval = _where(streak == i, params.steps[i], new_interval)
+    new_ease = _clip(ease_factor + (0.1 - lapse * (0.08 + lapse * 0.02)), params.min_ease, params.max_ease)
+    passed = quality >= 3
+    return (_where(passed, streak + 1, 0),
+            _where(passed, new_interval, params.fail_interval),
+            _where(passed, new_ease, ease_factor))
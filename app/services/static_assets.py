@@ -0,0 +1,91 @@
+import hashlib
+import mimetypes
+import os
+import re
+import stat
+import threading
+from email.utils import formatdate
+from starlette.datastructures import Headers
+from starlette.responses import Response
+from starlette.staticfiles import StaticFiles, NotModifiedResponse
+from app.services import compression
+
+# Frontend (static/) servi depuis la mémoire, compressé une seule fois au niveau maximal (gzip 9, brotli 11).
+# Chaque fichier a une empreinte de contenu : les URL « ?v=<empreinte> » sont mises en cache « immutable »,
+# les autres (index.html, ancien lien) revalidées à chaque fois (no-cache + ETag). Les pages HTML sont
+# réécrites pour pointer vers les URL versionnées de leurs ressources locales (src / href relatifs).
+# Un fichier modifié sur disque est rechargé à la requête suivante (comparaison mtime / taille).
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "no-cache"
+_LOCAL_REF = re.compile(r'(src|href)="([^":?#]+)"')
+
+class _Asset:
+    def __init__(self, stat_result, source: bytes, media_type: str):
+        self.mtime, self.size = stat_result.st_mtime_ns, stat_result.st_size
+        self.last_modified = formatdate(stat_result.st_mtime, usegmt=True)
+        self.source, self.media_type = source, media_type
+        self.refs = None  # pages HTML : ressource -> empreinte utilisée pour la réécriture
+        self.set_body(source)
+
+    def set_body(self, body: bytes):
+        self.digest = hashlib.sha256(body).hexdigest()[:16]
+        self.variants = {"identity": body}
+        if compression.compressible(self.media_type) and len(body) >= compression.COMPRESS_MIN_SIZE:
+            self.variants["gzip"] = compression.compress(body, "gzip", 9)
+            if compression.brotli: self.variants["br"] = compression.compress(body, "br", 11)
+
+class PrecompressedStaticFiles(StaticFiles):
+    def __init__(self, directory: str, **kwargs):
+        super().__init__(directory=directory, **kwargs)
+        self.assets = {}
+        self.lock = threading.Lock()
+        # Tout est compressé au démarrage, pas à la première requête
+        for root, _, files in os.walk(directory):
+            for name in files: self.asset(os.path.relpath(os.path.join(root, name), directory))
+
+    def asset(self, path: str, rewrite: bool = True):
+        full_path, stat_result = self.lookup_path(path)
+        return self._load(full_path, stat_result, rewrite) if stat_result and stat.S_ISREG(stat_result.st_mode) else None
+
+    def _load(self, full_path: str, stat_result, rewrite: bool = True):
+        with self.lock:
+            asset = self.assets.get(full_path)
+            if asset is None or (asset.mtime, asset.size) != (stat_result.st_mtime_ns, stat_result.st_size):
+                with open(full_path, "rb") as f: source = f.read()
+                media_type = mimetypes.guess_type(full_path)[0] or "application/octet-stream"
+                if media_type.startswith("text/"): media_type += "; charset=utf-8"
+                asset = self.assets[full_path] = _Asset(stat_result, source, media_type)
+        if rewrite and asset.media_type.startswith("text/html"): self._rewrite(asset, full_path)
+        return asset
+
+    def _rewrite(self, page: _Asset, full_path: str):
+        """URL versionnées des ressources locales de la page ; recompressée si l'une d'elles a changé."""
+        base = os.path.dirname(os.path.relpath(full_path, os.path.realpath(self.directory)))
+        text = page.source.decode("utf-8")
+        refs = {}
+        for _, ref in _LOCAL_REF.findall(text):
+            # Liens entre pages non versionnés (les pages sont toujours revalidées)
+            target = self.asset(os.path.normpath(os.path.join(base, ref)), rewrite=False)
+            if target is not None and not target.media_type.startswith("text/html"): refs[ref] = target.digest
+        if refs == page.refs: return
+        body = _LOCAL_REF.sub(lambda m: f'{m[1]}="{m[2]}?v={refs[m[2]]}"' if m[2] in refs else m[0], text)
+        with self.lock:
+            page.set_body(body.encode("utf-8"))
+            page.refs = refs
+
+    def file_response(self, full_path, stat_result, scope, status_code: int = 200) -> Response:
+        asset = self._load(str(full_path), stat_result)
+        request_headers = Headers(scope=scope)
+        encoding = compression.negotiate(request_headers.get("accept-encoding", ""), [e for e in ("br", "gzip") if e in asset.variants])
+        versioned = f"v={asset.digest}" in scope.get("query_string", b"").decode("latin-1")
+        headers = {
+            "content-type": asset.media_type,
+            "etag": f'"{asset.digest}-{encoding or "identity"}"',
+            "last-modified": asset.last_modified,
+            "cache-control": IMMUTABLE if versioned else REVALIDATE,
+            "vary": "Accept-Encoding",
+        }
+        if encoding: headers["content-encoding"] = encoding
+        if self.is_not_modified(Headers(headers), request_headers): return NotModifiedResponse(Headers(headers))
+        return Response(asset.variants[encoding or "identity"], status_code=status_code, headers=headers)
@@ -0,0 +1,74 @@
+import json
+from fastapi import Request
+from fastapi.responses import Response
+
+try:
+    import msgpack
+except ImportError:  # dépendance optionnelle (extra "wire")
+    msgpack = None
+
+# Format compact des résultats d'analyse (opt-in) :
+#   - tokens en colonnes sur tout le document : text, flags, lex (index dans lexemes, -1 sinon)
+#   - sentences : nombre de tokens de chaque phrase
+#   - lexemes : [lemma, reading, pos, ent_seq, jlpt], dédupliqués
+#   - glossary : définitions par ent_seq, envoyées une seule fois
+# Construit directement depuis les dicts de l'analyseur, sans validation Pydantic par token.
+# Sélection : ?format=compact|msgpack ou en-tête Accept (COMPACT_TYPE / MSGPACK_TYPE).
+
+COMPACT_TYPE = "application/vnd.okura.compact+json"
+MSGPACK_TYPE = "application/x-msgpack"
+COMPACT_VERSION = 1
+FLAG_WORD = 1
+
+def negotiate(request: Request, fmt: str = None):
+    """'msgpack', 'compact' ou None (réponse AnalyzeResponse classique)."""
+    accept = request.headers.get("accept", "")
+    if fmt == "msgpack" or MSGPACK_TYPE in accept: return "msgpack" if msgpack else "compact"
+    if fmt == "compact" or COMPACT_TYPE in accept: return "compact"
+    return None
+
+def compact(result: dict, raw_text: bool = True) -> dict:
+    texts, flags, lex, lengths = [], [], [], []
+    lexemes, lexeme_index, glossary = [], {}, {}
+    for sentence in result["sentences"]:
+        lengths.append(len(sentence))
+        for token in sentence:
+            texts.append(token["text"])
+            flags.append(FLAG_WORD if token.get("is_word") else 0)
+            ent_seq = token.get("ent_seq")
+            key = (token.get("lemma"), token.get("reading"), token.get("pos"), ent_seq, token.get("jlpt"))
+            if key == (None, None, None, None, None):
+                lex.append(-1)
+                continue
+            i = lexeme_index.get(key)
+            if i is None:
+                i = lexeme_index[key] = len(lexemes)
+                lexemes.append(list(key))
+                if ent_seq is not None and token.get("definitions"): glossary.setdefault(str(ent_seq), token["definitions"])
+            lex.append(i)
+    out = {"v": COMPACT_VERSION, "sentences": lengths, "text": texts, "flags": flags, "lex": lex,
+           "lexemes": lexemes, "glossary": glossary}
+    if raw_text and result.get("raw_text") is not None: out["raw_text"] = result["raw_text"]
+    return out
+
+def expand(data: dict) -> dict:
+    """Inverse de compact (forme AnalyzeResponse) : tests et clients Python."""
+    sentences, pos = [], 0
+    for n in data["sentences"]:
+        tokens = []
+        for j in range(pos, pos + n):
+            token = {"text": data["text"][j], "is_word": bool(data["flags"][j] & FLAG_WORD), "lemma": None, "reading": None,
+                     "pos": None, "ent_seq": None, "definitions": [], "jlpt": None}
+            if data["lex"][j] >= 0:
+                lemma, reading, p, ent_seq, jlpt = data["lexemes"][data["lex"][j]]
+                token.update(lemma=lemma, reading=reading, pos=p, ent_seq=ent_seq, jlpt=jlpt,
+                             definitions=data["glossary"].get(str(ent_seq), []))
+            tokens.append(token)
+        sentences.append(tokens)
+        pos += n
+    return {"sentences": sentences, "raw_text": data.get("raw_text")}
+
+def render(result: dict, kind: str, raw_text: bool = True) -> Response:
+    data = compact(result, raw_text)
+    if kind == "msgpack": return Response(content=msgpack.packb(data), media_type=MSGPACK_TYPE)
+    return Response(content=json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode(), media_type=COMPACT_TYPE)
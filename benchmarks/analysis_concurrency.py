@@ -0,0 +1,56 @@
+"""Montée en charge de l'analyse japonaise : N threads (tokenizer Sudachi par thread, GIL partagé)
+contre N process (pool comme app.services.analysis), sur les mêmes morceaux de texte.
+
+    python -m benchmarks.analysis_concurrency [texte.txt] [--lines 20000] [--workers 1,2,4]
+
+Sans fichier, corpus synthétique (benchmarks/synthetic.py). Les moteurs sont chargés avant la mesure.
+"""
+import argparse
+import multiprocessing
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, wait
+from app.services import analysis, nlp
+from benchmarks.synthetic import make_corpus
+
+def _warm_thread():
+    nlp.analyze_text("本を読む。", "jp")  # tokenizer du thread créé hors mesure
+
+def run(executor, chunks):
+    start = time.perf_counter()
+    results = [f.result() for f in [executor.submit(analysis._analyze_chunk, c, "jp") for c in chunks]]
+    elapsed = time.perf_counter() - start
+    return sum(len(c) for c in chunks) / elapsed, sum(len(s) for r in results for s in r) / elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path", nargs="?")
+    parser.add_argument("--lines", type=int, default=20000)
+    parser.add_argument("--chunk", type=int, default=200, help="lignes par morceau (OKURA_ANALYSIS_CHUNK_LINES)")
+    parser.add_argument("--workers", default="1,2,4")
+    args = parser.parse_args()
+
+    if args.path:
+        with open(args.path, encoding="utf-8") as f: text = f.read()
+    else:
+        text = make_corpus("jp", args.lines)
+    chunks = analysis.split_chunks(text.splitlines(), args.chunk)
+    nlp.get_engine("jp")
+    print(f"{len(chunks)} morceaux de {args.chunk} lignes, {os.cpu_count()} CPU")
+
+    print(f"{'mode':8s} {'N':>3s} {'lignes/s':>12s} {'tokens/s':>12s}")
+    for kind in ("threads", "process"):
+        for n in [int(w) for w in args.workers.split(",")]:
+            if kind == "threads":
+                executor = ThreadPoolExecutor(n)
+                wait([executor.submit(_warm_thread) for _ in range(n * 4)])
+            else:
+                executor = ProcessPoolExecutor(n, mp_context=multiprocessing.get_context("spawn"),
+                                               initializer=analysis._init_worker, initargs=(["jp"],))
+                wait([executor.submit(_warm_thread) for _ in range(n * 4)])
+            with executor:
+                lines_s, tokens_s = run(executor, chunks)
+            print(f"{kind:8s} {n:>3d} {lines_s:>12,.0f} {tokens_s:>12,.0f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+"""Benchmark de démarrage à froid du module NLP.
+
+Chaque mesure tourne dans un process Python neuf (pas de cache d'import partagé) :
+    python -m benchmarks.cold_start [--runs 3]
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+SCENARIOS = {
+    # Coût payé par chaque worker / --reload / TestClient, même sans requête NLP
+    "import": "import app.services.nlp",
+    # Initialisation séquentielle des moteurs (ancien comportement à l'import)
+    "engines_serial": "from app.services import nlp\nfor l in nlp.ENGINE_FACTORIES: nlp.get_engine(l)",
+    # Préchauffage parallèle, tel que lancé par le lifespan de app.main
+    "engines_warmup": "from app.services import nlp\nfor t in nlp.warmup(): t.join()",
+    # Première analyse sans préchauffage (moteur construit à la demande)
+    "first_analyze_jp": "from app.services import nlp\nnlp.analyze_text('吾輩は猫である。', 'jp')",
+}
+
+PROBE = """
+import time, json
+_t = time.perf_counter()
+{code}
+print("__RESULT__" + json.dumps(time.perf_counter() - _t))
+"""
+
+def run_once(code: str) -> float:
+    out = subprocess.run([sys.executable, "-c", PROBE.format(code=code)], capture_output=True, text=True, check=True).stdout
+    return json.loads(out.rsplit("__RESULT__", 1)[1])
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+    for name, code in SCENARIOS.items():
+        timings = [run_once(code) for _ in range(args.runs)]
+        print(f"{name:20s} median={statistics.median(timings):7.3f}s  min={min(timings):7.3f}s")
+
+if __name__ == "__main__":
+    main()
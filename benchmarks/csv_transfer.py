@@ -0,0 +1,109 @@
+"""Benchmark de l'import / export CSV : ancien chemin (une requête par ligne, tout en mémoire)
+contre l'import groupé et l'export en flux de app.crud.vocabulaire.
+
+    python -m benchmarks.csv_transfer [--rows 500000 --lists 50 --legacy-rows 20000]
+
+L'ancien import est mesuré sur --legacy-rows lignes puis extrapolé (il prendrait des minutes sur 500k).
+Base SQLite temporaire par défaut ; DATABASE_URL pour viser un Postgres local.
+"""
+import argparse
+import csv
+import io
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+
+_tmp = tempfile.mkdtemp(prefix="okura-csv-")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_tmp}/csv.db")
+
+from app.core.database import engine, Base, SessionLocal  # noqa: E402
+from app.models import vocabulaire as models  # noqa: E402
+from app.crud import vocabulaire as crud  # noqa: E402
+
+KANA = "あいうえおかきくけこさしすせそたちつてとなにぬねのはひふへほまみむめもやゆよらりるれろわをん"
+
+def make_csv(rows: int, lists: int, seed: int = 42) -> str:
+    rng = random.Random(seed)
+    out = io.StringIO()
+    writer = csv.writer(out)
+    writer.writerow(crud.CSV_COLUMNS)
+    for i in range(rows):
+        terme = "".join(rng.choice(KANA) for _ in range(4)) + str(i)
+        writer.writerow([f"liste {i % lists}", terme, terme[:4], "名詞", "meaning | sens", "", i, rng.randint(0, 5), rng.randint(0, 30), ""])
+    return out.getvalue()
+
+def legacy_import(db, csv_content: str):
+    """Ancien import_from_csv : SELECT de doublon et INSERT ligne par ligne, commit par nouvelle liste."""
+    reader = csv.DictReader(io.StringIO(csv_content))
+    lists_cache = {l.title: l for l in db.query(models.VocabList).all()}
+    for row in reader:
+        if row['list_title'] not in lists_cache:
+            new_list = models.VocabList(title=row['list_title'], description="Importé via CSV")
+            db.add(new_list)
+            db.commit()
+            db.refresh(new_list)
+            lists_cache[row['list_title']] = new_list
+        current = lists_cache[row['list_title']]
+        exists = db.query(models.VocabCard).filter(models.VocabCard.list_id == current.id, models.VocabCard.terme == row['terme']).first()
+        if not exists:
+            db.add(models.VocabCard(list_id=current.id, terme=row['terme'], lecture=row.get('lecture'), pos=row.get('pos'),
+                                    definitions=row.get('definitions'), context=row.get('context'), ent_seq=int(row['ent_seq']),
+                                    streak=int(row['streak']), interval=int(row['interval'])))
+    db.commit()
+
+def legacy_export(db) -> str:
+    output = io.StringIO()
+    writer = csv.writer(output)
+    writer.writerow(crud.CSV_COLUMNS)
+    for c in db.query(models.VocabCard).join(models.VocabList).all():
+        writer.writerow([c.vocab_list.title, c.terme, c.lecture, c.pos, c.definitions, c.context or "",
+                         c.ent_seq or "", c.streak, c.interval, c.next_review.isoformat() if c.next_review else ""])
+    return output.getvalue()
+
+def reset():
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+
+def timed(fn):
+    t = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - t
+
+def peak_memory(fn) -> float:
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak / 1e6
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=500000)
+    parser.add_argument("--lists", type=int, default=50)
+    parser.add_argument("--legacy-rows", type=int, default=20000)
+    args = parser.parse_args()
+
+    content = make_csv(args.rows, args.lists)
+    sample = "\n".join(content.split("\n")[:args.legacy_rows + 1]) + "\n"
+
+    reset()
+    with SessionLocal() as db: _, legacy_t = timed(lambda: legacy_import(db, sample))
+    reset()
+    with SessionLocal() as db: stats, bulk_t = timed(lambda: crud.import_from_csv(db, content))
+    extrapolated = legacy_t * args.rows / args.legacy_rows
+    print(f"import  ancien : {legacy_t:7.2f}s pour {args.legacy_rows} lignes (~{extrapolated:7.1f}s extrapolé pour {args.rows})")
+    print(f"import  groupé : {bulk_t:7.2f}s pour {args.rows} lignes ({stats['cards_created']} cartes, x{extrapolated / bulk_t:.0f})")
+
+    def drain(): sum(len(chunk) for chunk in crud.iter_export_csv(db))
+    with SessionLocal() as db:
+        _, legacy_t = timed(lambda: legacy_export(db))
+        _, stream_t = timed(drain)
+    with SessionLocal() as db: legacy_mb = peak_memory(lambda: legacy_export(db))
+    with SessionLocal() as db: stream_mb = peak_memory(drain)
+    print(f"export  ancien : {legacy_t:7.2f}s, pic mémoire {legacy_mb:8.1f} Mo")
+    print(f"export  flux   : {stream_t:7.2f}s, pic mémoire {stream_mb:8.1f} Mo")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""Test de charge des routes chaudes (file de révision, stats, listes) : pile synchrone (threadpool)
+contre moteur asynchrone (OKURA_DB_ASYNC=1), chacune servie par un uvicorn lancé pour l'occasion.
+
+    python -m benchmarks.db_load [--cards 50000] [--concurrency 64] [--requests 2000]
+
+Base SQLite temporaire par défaut (aiosqlite) ; DATABASE_URL pour viser un Postgres local (asyncpg).
+"""
+import argparse
+import asyncio
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+_tmp = tempfile.mkdtemp(prefix="okura-load-")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_tmp}/load.db")
+
+import httpx  # noqa: E402
+from sqlalchemy import insert  # noqa: E402
+from app.core.database import engine, Base  # noqa: E402
+from app.models import vocabulaire as models  # noqa: E402
+from app.models import indexes  # noqa: E402
+
+def populate(n_cards: int, n_lists: int):
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    indexes.ensure_indexes(engine)
+    rng, now = random.Random(42), datetime.now()
+    with engine.begin() as conn:
+        conn.execute(insert(models.VocabList), [{"id": i + 1, "title": f"liste {i + 1}"} for i in range(n_lists)])
+        conn.execute(insert(models.VocabCard), [
+            {"list_id": i % n_lists + 1, "terme": f"t{i}", "ent_seq": i, "streak": rng.randint(0, 5),
+             "next_review": now + timedelta(days=rng.uniform(-10, 60))} for i in range(n_cards)])
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def start_server(app: str, port: int, async_db: bool):
+    env = dict(os.environ, OKURA_DB_ASYNC="1" if async_db else "0", OKURA_NLP_WARMUP="", OKURA_ANALYSIS_BACKEND="inline",
+               OKURA_STATS_RECONCILE_HOURS="0")
+    proc = subprocess.Popen([sys.executable, "-m", "uvicorn", app, "--port", str(port), "--log-level", "warning"], env=env)
+    for _ in range(200):
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/lists/", timeout=1)
+            return proc
+        except httpx.HTTPError:
+            time.sleep(0.1)
+    proc.kill()
+    raise RuntimeError("Serveur non démarré")
+
+async def load(port: int, n_lists: int, concurrency: int, total: int):
+    paths = ["/lists/training/due", "/lists/dashboard/stats", "/lists/", "/lists/1/cards?limit=50"]
+    paths += [f"/lists/training/due?list_id={i + 1}" for i in range(min(n_lists, 4))]
+    latencies, errors = [], 0
+    queue = asyncio.Queue()
+    for i in range(total): queue.put_nowait(paths[i % len(paths)])
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async def worker(client):
+        nonlocal errors
+        while not queue.empty():
+            path = queue.get_nowait()
+            t = time.perf_counter()
+            r = await client.get(path)
+            latencies.append(time.perf_counter() - t)
+            if r.status_code != 200: errors += 1
+
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", limits=limits, timeout=60) as client:
+        start = time.perf_counter()
+        await asyncio.gather(*[worker(client) for _ in range(concurrency)])
+        elapsed = time.perf_counter() - start
+    latencies.sort()
+    return {"rps": total / elapsed, "p50": statistics.median(latencies) * 1000,
+            "p99": latencies[int(len(latencies) * 0.99) - 1] * 1000, "errors": errors}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cards", type=int, default=50000)
+    parser.add_argument("--lists", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--app", default="app.main:app")
+    args = parser.parse_args()
+
+    populate(args.cards, args.lists)
+    for name, async_db in (("sync", False), ("async", True)):
+        port = free_port()
+        proc = start_server(args.app, port, async_db)
+        try:
+            asyncio.run(load(port, args.lists, 20, 200))  # chauffe
+            res = asyncio.run(load(port, args.lists, args.concurrency, args.requests))
+        finally:
+            proc.terminate()
+            proc.wait()
+        print(f"{name:6s} {res['rps']:8.0f} req/s   p50 {res['p50']:7.1f} ms   p99 {res['p99']:7.1f} ms   erreurs {res['errors']}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""Benchmark de la file de révision (crud.get_due_cards) quand le deck grossit.
+
+Le deck est rempli par paliers (jusqu'à 1M cartes par défaut) ; à chaque palier on mesure
+la première page, une page profonde (curseur keyset), la file d'une liste et le mode alterné.
+Avec les index de app/models/indexes.py, la latence doit rester plate :
+    python -m benchmarks.due_queue [--sizes 10000,100000,1000000] [--lists 20] [--no-index]
+
+Base SQLite temporaire par défaut ; DATABASE_URL pour viser un Postgres local.
+"""
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+_tmp = tempfile.mkdtemp(prefix="okura-due-")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_tmp}/due.db")
+
+from sqlalchemy import insert  # noqa: E402
+from app.core.database import engine, Base, SessionLocal  # noqa: E402
+from app.models import vocabulaire as models  # noqa: E402
+from app.models import indexes  # noqa: E402
+from app.crud import vocabulaire as crud  # noqa: E402
+
+BATCH = 50000
+
+def populate(n_lists: int, start: int, stop: int, rng: random.Random):
+    """Cartes start..stop : ~10 % en retard, le reste réparti sur l'année à venir."""
+    now = datetime.now()
+    with engine.begin() as conn:
+        for lo in range(start, stop, BATCH):
+            rows = []
+            for i in range(lo, min(stop, lo + BATCH)):
+                ahead = rng.uniform(-30, 0) if rng.random() < 0.1 else rng.uniform(0, 365)
+                rows.append({"list_id": i % n_lists + 1, "terme": f"t{i}", "ent_seq": i,
+                             "next_review": now + timedelta(days=ahead), "interval": 1, "ease_factor": 2.5, "streak": 1})
+            conn.execute(insert(models.VocabCard), rows)
+
+def timed(fn, runs: int) -> float:
+    samples = []
+    for _ in range(runs):
+        t = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - t) * 1000)
+    return statistics.median(samples)
+
+def measure(runs: int):
+    with SessionLocal() as db:
+        deep = crud.get_due_cards(db, limit=1000)
+        cursor = (deep[-1].next_review, deep[-1].id) if deep else None
+        return {
+            "first_page": timed(lambda: crud.get_due_cards(db, 50), runs),
+            "keyset_page": timed(lambda: crud.get_due_cards(db, 50, after=cursor), runs),
+            "one_list": timed(lambda: crud.get_due_cards(db, 50, list_id=1), runs),
+            "interleave": timed(lambda: crud.get_due_cards_interleaved(db, 50), runs),
+        }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="10000,100000,1000000")
+    parser.add_argument("--lists", type=int, default=20)
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--no-index", action="store_true", help="sans les index de la file (comparaison)")
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    if args.no_index:
+        for index in indexes.DUE_INDEXES: index.drop(bind=engine, checkfirst=True)
+    with engine.begin() as conn:
+        conn.execute(insert(models.VocabList), [{"id": i + 1, "title": f"liste {i + 1}"} for i in range(args.lists)])
+
+    rng = random.Random(42)
+    done = 0
+    print(f"{'cartes':>10s} " + " ".join(f"{k:>12s}" for k in ("first_page", "keyset_page", "one_list", "interleave")) + "   (ms, médiane)")
+    for size in (int(s) for s in args.sizes.split(",")):
+        populate(args.lists, done, size, rng)
+        done = size
+        with engine.connect() as conn:
+            if engine.dialect.name == "sqlite": conn.exec_driver_sql("ANALYZE")
+        res = measure(args.runs)
+        print(f"{size:>10d} " + " ".join(f"{v:>12.2f}" for v in res.values()))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""Prévision de charge SRS : simulation vectorisée (NumPy) contre une boucle carte par carte.
+
+    python -m benchmarks.forecast [--cards 1000000] [--days 30,90] [--sample 20000]
+
+La boucle de référence (objets ORM, sm2_update scalaire) ne tourne que sur --sample cartes ;
+son temps est extrapolé au deck entier. Base SQLite temporaire par défaut, DATABASE_URL sinon
+(vidée puis remplie : utiliser une base dédiée).
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+from datetime import date, datetime
+
+_tmp = tempfile.mkdtemp(prefix="okura-forecast-")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_tmp}/forecast.db")
+
+from app.core.database import engine, Base, SessionLocal  # noqa: E402
+from app.crud import vocabulaire as crud  # noqa: E402
+from app.models import vocabulaire as models  # noqa: E402
+from app.models import indexes  # noqa: E402
+from app.services import forecast  # noqa: E402
+from app.services.srs import sm2_update  # noqa: E402
+from benchmarks.synthetic import make_deck  # noqa: E402
+
+def scalar_forecast(cards, days: int, recall: list, today: date) -> list:
+    """Même simulation, une carte et une révision à la fois."""
+    rng = random.Random(0)
+    totals = [0] * days
+    start = datetime.combine(today, datetime.min.time())
+    for c in cards:
+        streak, interval, ease = c.streak, c.interval, c.ease_factor
+        day = max(0, (c.next_review - start).days) if c.next_review else 0
+        while day < days:
+            totals[day] += 1
+            quality = 4 if rng.random() < recall[min(streak, len(recall) - 1)] else 1
+            streak, interval, ease = sm2_update(streak, interval, ease, quality)
+            day += max(interval, 1)
+    return totals
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cards", type=int, default=1000000)
+    parser.add_argument("--lists", type=int, default=20)
+    parser.add_argument("--days", default="30,90")
+    parser.add_argument("--sample", type=int, default=20000, help="cartes simulées par la boucle de référence")
+    args = parser.parse_args()
+
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    indexes.ensure_indexes(engine)
+    make_deck(engine, args.lists, args.cards)
+    recall, today = [0.75, 0.85, 0.9], date.today()
+
+    with SessionLocal() as db:
+        t = time.perf_counter()
+        rows = crud.get_schedule_rows(db)
+        t_query = time.perf_counter() - t
+        deck = forecast.Deck(rows, today)
+        t_load = time.perf_counter() - t
+        print(f"chargement : {len(deck)} cartes, requête {t_query:.2f} s, tableaux {t_load - t_query:.2f} s")
+
+        sample = db.query(models.VocabCard).order_by(models.VocabCard.id).limit(args.sample).all()
+        for days in (int(d) for d in args.days.split(",")):
+            t = time.perf_counter()
+            result = forecast.simulate(deck, days, recall)
+            vectorized = time.perf_counter() - t
+            t = time.perf_counter()
+            scalar_forecast(sample, days, recall, today)
+            scalar = (time.perf_counter() - t) * len(deck) / max(len(sample), 1)
+            print(f"{days:>3d} jours : NumPy {vectorized:.2f} s ({result['reviews']} révisions simulées), "
+                  f"boucle scalaire ~{scalar:.1f} s (extrapolé), x{scalar / vectorized:.0f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""Couche de réponse HTTP : octets envoyés selon Accept-Encoding, et coût d'un sondage
+(static/app.js) quand rien n'a changé (304 via ETag) contre la réponse complète.
+
+    python -m benchmarks.http_cache [--cards 100000] [--lines 3000] [--runs 50]
+
+Base SQLite temporaire par défaut, DATABASE_URL sinon (vidée puis remplie : utiliser une base dédiée).
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+_tmp = tempfile.mkdtemp(prefix="okura-http-")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_tmp}/http.db")
+os.environ.setdefault("OKURA_ANALYSIS_BACKEND", "inline")
+
+from fastapi.testclient import TestClient  # noqa: E402
+from app.core.database import engine, Base, SessionLocal  # noqa: E402
+from app.crud import stats as stats_crud  # noqa: E402
+from app.models import indexes  # noqa: E402
+from app.services import compression  # noqa: E402
+from benchmarks.synthetic import make_corpus, make_deck  # noqa: E402
+
+def median_ms(fn, runs: int) -> float:
+    latencies = []
+    for _ in range(runs):
+        t = time.perf_counter()
+        fn()
+        latencies.append(time.perf_counter() - t)
+    return statistics.median(latencies) * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cards", type=int, default=100000)
+    parser.add_argument("--lists", type=int, default=20)
+    parser.add_argument("--lines", type=int, default=3000, help="taille du texte analysé")
+    parser.add_argument("--runs", type=int, default=50)
+    args = parser.parse_args()
+
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    indexes.ensure_indexes(engine)
+    make_deck(engine, args.lists, args.cards)
+    with SessionLocal() as db: stats_crud.reconcile(db)
+
+    from app.main import app
+    with TestClient(app) as client:
+        encodings = ["identity", "gzip"] + (["br"] if compression.brotli else [])
+        print(f"{'réponse':22s} " + " ".join(f"{e:>12s}" for e in encodings))
+        text = make_corpus("jp", args.lines)
+        payloads = {
+            "/lists/analyze": ("POST", "/lists/analyze", {"json": {"text": text, "lang": "jp"}}),
+            "/lists/data/export": ("GET", "/lists/data/export", {}),
+            "/static/app.js": ("GET", "/static/app.js", {}),
+        }
+        for name, (method, url, kwargs) in payloads.items():
+            sizes = []
+            for encoding in encodings:
+                # Taille sur le fil : corps brut, avant décompression par le client
+                with client.stream(method, url, headers={"Accept-Encoding": encoding}, **kwargs) as response:
+                    sizes.append(sum(len(chunk) for chunk in response.iter_raw()))
+            print(f"{name:22s} " + " ".join(f"{s / 1024:>10.0f}Ko" for s in sizes))
+
+        print(f"\n{'sondage':22s} {'complet':>12s} {'304':>12s}")
+        for path in ["/lists/dashboard/stats", "/lists/", "/lists/1", "/lists/1/cards?limit=1000"]:
+            etag = client.get(path).headers["etag"]
+            full = median_ms(lambda: client.get(path), args.runs)
+            cached = median_ms(lambda: client.get(path, headers={"If-None-Match": etag}), args.runs)
+            print(f"{path:22s} {full:>10.2f}ms {cached:>10.2f}ms")
+
+if __name__ == "__main__":
+    main()
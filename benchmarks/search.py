@@ -0,0 +1,70 @@
+"""Latence de la recherche (GET /lists/search) sur un gros deck et des milliers de textes enregistrés.
+
+    python -m benchmarks.search [--cards 1000000] [--analyses 2000] [--runs 50]
+
+Base SQLite temporaire par défaut (FTS5) ; DATABASE_URL pour viser un Postgres local (pg_trgm).
+La base indiquée est vidée puis remplie : utiliser une base dédiée.
+"""
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+
+_tmp = tempfile.mkdtemp(prefix="okura-search-")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_tmp}/search.db")
+
+from sqlalchemy import insert  # noqa: E402
+from app.core.database import engine, Base, SessionLocal  # noqa: E402
+from app.crud import search as search_crud  # noqa: E402
+from app.models import vocabulaire as models  # noqa: E402
+from app.models import indexes  # noqa: E402
+from benchmarks.synthetic import make_corpus, make_deck  # noqa: E402
+
+def populate(n_cards: int, n_analyses: int, lines: int):
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    indexes.ensure_indexes(engine)
+    make_deck(engine, cards=n_cards)
+    with engine.begin() as conn:
+        conn.execute(insert(models.Analysis), [
+            {"title": f"texte {i}", "content": make_corpus("jp" if i % 2 else "cn", lines, seed=i), "lang": "jp" if i % 2 else "cn"}
+            for i in range(n_analyses)])
+    t = time.perf_counter()
+    with SessionLocal() as db: counts = search_crud.rebuild(db)
+    print(f"index construit en {time.perf_counter() - t:.1f} s : {counts}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cards", type=int, default=1000000)
+    parser.add_argument("--analyses", type=int, default=2000)
+    parser.add_argument("--lines", type=int, default=50, help="lignes par texte enregistré")
+    parser.add_argument("--runs", type=int, default=50)
+    args = parser.parse_args()
+
+    populate(args.cards, args.analyses, args.lines)
+    rng = random.Random(1)
+    queries = {
+        "carte exacte (1-2 car.)": ("card", lambda: "語"),
+        "carte, 1 car. absent": ("card", lambda: "𩸽"),  # pire cas court : LIKE sur tout le texte
+        "carte, terme complet": ("card", lambda: f"語{rng.randrange(args.cards)}"),
+        "carte, sous-chaîne": ("card", lambda: str(rng.randrange(10000, 99999))),
+        "définition dans toutes les cartes": ("card", lambda: "word"),  # pire cas : trigrammes présents partout
+        "texte, sous-chaîne": ("analysis", lambda: rng.choice(["図書館で", "思い出した", "慢慢地", "火车站"])),
+        "texte, rare": ("analysis", lambda: "存在しない語句"),
+    }
+    print(f"{'requête':34s} {'p50':>9s} {'p99':>9s} {'résultats':>10s}")
+    with SessionLocal() as db:
+        for name, (kind, make_query) in queries.items():
+            latencies, hits = [], 0
+            for _ in range(args.runs):
+                q = make_query()
+                t = time.perf_counter()
+                hits = len(search_crud.search(db, q, kind)["items"])
+                latencies.append(time.perf_counter() - t)
+            latencies.sort()
+            print(f"{name:34s} {statistics.median(latencies) * 1000:>7.1f}ms {latencies[int(len(latencies) * 0.99) - 1] * 1000:>7.1f}ms {hits:>10d}")
+
+if __name__ == "__main__":
+    main()
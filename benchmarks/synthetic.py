@@ -0,0 +1,69 @@
+"""Générateurs de données synthétiques et reproductibles (graine fixe) pour les benchmarks.
+
+    make_corpus("jp", lines=2000)      -> texte japonais ou chinois de taille configurable
+    make_deck(engine, lists=20, cards=100000) -> listes et cartes avec des échéances réalistes
+"""
+import random
+from datetime import datetime, timedelta
+from sqlalchemy import insert
+
+# Vocabulaire courant : assez varié pour exercer tokeniseur, lookups et cache sans être un vrai livre
+JP_SUBJECTS = ["私", "彼", "彼女", "先生", "子供たち", "猫", "犬", "友達", "母", "学生", "会社員", "旅人"]
+JP_OBJECTS = ["本", "手紙", "料理", "映画", "音楽", "新聞", "写真", "花", "電車", "問題", "宿題", "山", "海", "空", "雨"]
+JP_VERBS = ["読んだ", "書いた", "作る", "見た", "聞いている", "待っていた", "探している", "忘れた", "思い出した", "買った"]
+JP_ADVERBS = ["静かに", "ゆっくり", "突然", "いつも", "もう一度", "少し", "とても", "やはり", ""]
+JP_PLACES = ["駅で", "部屋の中で", "図書館で", "公園で", "古い町で", "学校の前で", ""]
+
+CN_SUBJECTS = ["我", "他", "她", "老师", "孩子们", "我们", "朋友", "妈妈", "学生", "医生"]
+CN_VERBS = ["看", "写", "买", "喜欢", "学习", "等", "找", "忘记了", "听", "准备"]
+CN_OBJECTS = ["书", "信", "电影", "音乐", "报纸", "照片", "花", "火车", "问题", "作业", "中文", "咖啡"]
+CN_ADVERBS = ["今天", "常常", "突然", "已经", "一起", "非常", "慢慢地", ""]
+CN_PLACES = ["在图书馆", "在公园", "在家里", "在学校", "在火车站", ""]
+
+def _jp_sentence(rng: random.Random) -> str:
+    return f"{rng.choice(JP_PLACES)}{rng.choice(JP_SUBJECTS)}は{rng.choice(JP_ADVERBS)}{rng.choice(JP_OBJECTS)}を{rng.choice(JP_VERBS)}。"
+
+def _cn_sentence(rng: random.Random) -> str:
+    return f"{rng.choice(CN_SUBJECTS)}{rng.choice(CN_ADVERBS)}{rng.choice(CN_PLACES)}{rng.choice(CN_VERBS)}{rng.choice(CN_OBJECTS)}。"
+
+def make_corpus(lang: str = "jp", lines: int = 1000, seed: int = 42) -> str:
+    """Une ligne = 1 à 4 phrases ; ~5 % de lignes vides (paragraphes)."""
+    rng = random.Random(seed)
+    sentence = _jp_sentence if lang == "jp" else _cn_sentence
+    out = []
+    for _ in range(lines):
+        out.append("" if rng.random() < 0.05 else "".join(sentence(rng) for _ in range(rng.randint(1, 4))))
+    return "\n".join(out)
+
+def card_schedule(rng: random.Random, now: datetime):
+    """(streak, interval, ease, next_review) plausibles pour SM-2 :
+    ~15 % de cartes nouvelles dues, les autres à mi-parcours de leur intervalle, ~10 % en retard."""
+    if rng.random() < 0.15:
+        return 0, 0, 2.5, now - timedelta(hours=rng.uniform(0, 48))
+    streak = min(1 + int(rng.expovariate(0.4)), 12)
+    ease = round(rng.uniform(1.3, 2.8), 2)
+    interval = 1 if streak == 1 else 6 if streak == 2 else int(6 * ease ** (streak - 2))
+    interval = min(interval, 365)
+    offset = rng.uniform(-0.1, 1.0) * interval  # fraction restante de l'intervalle (négatif = en retard)
+    return streak, interval, ease, now + timedelta(days=offset)
+
+def make_deck(engine, lists: int = 20, cards: int = 100000, seed: int = 42, batch: int = 50000):
+    """Remplit vocab_lists / vocab_cards (tailles de listes inégales, comme un vrai usage)."""
+    from app.models import vocabulaire as models
+    rng, now = random.Random(seed), datetime.now()
+    # Quelques grosses listes, beaucoup de petites
+    ids = list(range(1, lists + 1))
+    cum, total = [], 0.0
+    for i in ids:
+        total += 1 / i
+        cum.append(total)
+    with engine.begin() as conn:
+        conn.execute(insert(models.VocabList), [{"id": i + 1, "title": f"liste {i + 1}", "lang": "jp"} for i in range(lists)])
+        for lo in range(0, cards, batch):
+            rows = []
+            for i in range(lo, min(cards, lo + batch)):
+                streak, interval, ease, next_review = card_schedule(rng, now)
+                rows.append({"list_id": rng.choices(ids, cum_weights=cum)[0], "terme": f"語{i}", "ent_seq": 1000000 + i,
+                             "lecture": "ご", "definitions": "word | mot", "streak": streak, "interval": interval,
+                             "ease_factor": ease, "next_review": next_review})
+            conn.execute(insert(models.VocabCard), rows)
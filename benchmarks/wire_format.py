@@ -0,0 +1,57 @@
+"""Taille et coût de sérialisation des réponses d'analyse : AnalyzeResponse (Pydantic, JSON complet)
+contre le format compact de app.services.wire (JSON et MessagePack).
+
+    python -m benchmarks.wire_format [texte.txt] [--lang jp] [--lines 3000]
+
+Sans fichier, un texte synthétique est répété sur --lines lignes. L'analyse n'est pas mesurée.
+"""
+import argparse
+import gzip
+import json
+import time
+from app.schemas import vocabulaire as schemas
+from app.services import nlp, wire
+
+SAMPLE = {
+    "jp": ["吾輩は猫である。名前はまだ無い。", "どこで生れたかとんと見当がつかぬ。",
+           "何でも薄暗いじめじめした所でニャーニャー泣いていた事だけは記憶している。"],
+    "cn": ["我们今天去图书馆看书。", "他说这本书非常有意思。", "明天我们一起去公园散步吧。"],
+}
+
+def timed(fn, runs: int = 5):
+    best, out = float("inf"), None
+    for _ in range(runs):
+        t = time.perf_counter()
+        out = fn()
+        best = min(best, time.perf_counter() - t)
+    return out, best
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path", nargs="?")
+    parser.add_argument("--lang", default="jp")
+    parser.add_argument("--lines", type=int, default=3000)
+    args = parser.parse_args()
+
+    if args.path:
+        with open(args.path, encoding="utf-8") as f: text = f.read()
+    else:
+        sample = SAMPLE[args.lang]
+        text = "\n".join(sample[i % len(sample)] for i in range(args.lines))
+    result = nlp.analyze_text(text, args.lang)
+    result["raw_text"] = text
+
+    rows = [("AnalyzeResponse", lambda: schemas.AnalyzeResponse.model_validate(result).model_dump_json().encode())]
+    rows.append(("compact JSON", lambda: wire.render(result, "compact", raw_text=False).body))
+    if wire.msgpack: rows.append(("compact msgpack", lambda: wire.render(result, "msgpack", raw_text=False).body))
+
+    base = None
+    print(f"{'format':18s} {'octets':>12s} {'gzip':>10s} {'sérialisation':>14s}")
+    for name, fn in rows:
+        body, seconds = timed(fn)
+        base = base or (len(body), seconds)
+        print(f"{name:18s} {len(body):>12,d} {len(gzip.compress(body)):>10,d} {seconds * 1000:>11.1f} ms"
+              f"   (x{base[0] / len(body):.1f} plus petit, x{base[1] / seconds:.1f} plus rapide)")
+
+if __name__ == "__main__":
+    main()
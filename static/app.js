@@ -1,5 +1,8 @@
 const { createApp } = Vue
 
+// Battement des jobs d'ingestion côté serveur : 30 s (OKURA_JOB_HEARTBEAT_SECONDS) ; figé plus longtemps => abandon
+const INGEST_STALL_MS = 180000;
+
 createApp({
     data() {
         return {
@@ -9,12 +12,17 @@ createApp({
             readerMode: false, 
             isLoading: false, 
             analyzedSentences: [],
+            analysisState: null, // {lang, fingerprint, line_hashes} de la dernière analyse (ré-analyse incrémentale)
+            ingestJobId: null,
+            isFlushing: false,
             selectedToken: null, 
             currentContextSentence: [], 
             highlightLevel: 0,
             
             lists: [], selectedListId: null, activeList: null, 
-            dueCards: [], currentCard: null, isFlipped: false, trainListId: null,
+            // Cartes de la liste ouverte : chargées par pages au défilement, seules les lignes visibles sont rendues
+            listCards: [], listCursor: null, listLoading: false, listSort: 'id', listPrefix: '', listScrollTop: 0,
+            dueCards: [], currentCard: null, isFlipped: false, trainListId: null, trainInterleave: false, dueCursor: {}, dueExhausted: false, isFetchingDue: false,
             
             // UI States
             toastMessage: '',
@@ -26,6 +34,11 @@ createApp({
         }
     },
     computed: {
+        visibleRange() {
+            const ROW = 64, VIEW = 640, start = Math.max(0, Math.floor(this.listScrollTop / ROW) - 5);
+            return { start, end: Math.min(this.listCards.length, start + Math.ceil(VIEW / ROW) + 10), row: ROW };
+        },
+        visibleCards() { return this.listCards.slice(this.visibleRange.start, this.visibleRange.end); },
         heatmapDays() {
             const days = [];
             for (let i = 29; i >= 0; i--) {
@@ -36,15 +49,43 @@ createApp({
             return days;
         }
     },
-    mounted() { this.fetchLists(); this.fetchStats(); },
+    mounted() {
+        this.fetchLists(); this.fetchStats();
+        this.flushReviews();
+        window.addEventListener('online', () => this.flushReviews());
+        // Beacon sans accusé de réception : la file est gardée, le prochain flush la confirme
+        // (le serveur ignore les event_id déjà appliqués)
+        window.addEventListener('pagehide', () => {
+            const queue = localStorage.getItem('okura_review_queue');
+            if (queue && queue !== '[]') navigator.sendBeacon(`/lists/cards/review/batch`, new Blob([queue], {type: 'application/json'}));
+        });
+    },
     watch: {
-        currentTab(newTab) {
+        currentTab(newTab, oldTab) {
             if (newTab === 'train') this.startSession();
-            if (newTab === 'dashboard') this.fetchStats();
+            if (oldTab === 'train') this.flushReviews();
+            if (newTab === 'dashboard') this.flushReviews().then(() => this.fetchStats());
         }
     },
     methods: {
         // --- UTILS ---
+        // Format compact (app/services/wire.py) : colonnes de tokens + table de lexèmes et glossaire dédupliqués
+        decodeCompact(data) {
+            const sentences = []; let j = 0;
+            for (const n of data.sentences) {
+                const tokens = [];
+                for (const end = j + n; j < end; j++) {
+                    const t = { text: data.text[j], is_word: !!(data.flags[j] & 1), lemma: null, reading: null, pos: null, ent_seq: null, definitions: [], jlpt: null };
+                    if (data.lex[j] >= 0) {
+                        const [lemma, reading, pos, ent_seq, jlpt] = data.lexemes[data.lex[j]];
+                        Object.assign(t, { lemma, reading, pos, ent_seq, jlpt, definitions: data.glossary[ent_seq] || [] });
+                    }
+                    tokens.push(t);
+                }
+                sentences.push(tokens);
+            }
+            return { sentences, raw_text: data.raw_text ?? null };
+        },
         showToast(msg) { this.toastMessage = msg; setTimeout(() => this.toastMessage = '', 3000); },
         triggerConfirm(msg, cb) { this.confirmMessage = msg; this.confirmCallback = cb; this.showConfirmModal = true; },
         confirmAction() { if(this.confirmCallback) this.confirmCallback(); this.showConfirmModal = false; },
@@ -56,23 +97,72 @@ createApp({
         },
 
         // --- ANALYSE ---
+        // Lecture du flux NDJSON : le lecteur s'affiche dès les premières phrases
+        async readAnalysisStream(res) {
+            const reader = res.body.getReader();
+            const decoder = new TextDecoder();
+            let buffer = '';
+            const handle = (line) => {
+                if (!line.trim()) return;
+                const rec = JSON.parse(line);
+                if (rec.type === 'meta') this.sourceText = rec.raw_text;
+                else if (rec.type === 'sentence') {
+                    this.analyzedSentences.push(rec.tokens);
+                    if (!this.readerMode) { this.readerMode = true; this.selectedToken = null; }
+                }
+                else if (rec.type === 'done') this.analysisState = { lang: this.currentLang, fingerprint: rec.fingerprint, line_hashes: rec.line_hashes };
+                else if (rec.type === 'error') throw new Error(rec.detail);
+            };
+            while (true) {
+                const { done, value } = await reader.read();
+                if (done) break;
+                buffer += decoder.decode(value, { stream: true });
+                const lines = buffer.split('\n');
+                buffer = lines.pop();
+                lines.forEach(handle);
+            }
+            handle(buffer);
+            this.readerMode = true;
+        },
+
+        // Texte modifié : seules les lignes changées sont ré-analysées, on applique les patchs
+        async analyzeIncremental() {
+            const st = this.analysisState;
+            const res = await fetch('/lists/analyze/incremental', {
+                method: 'POST', headers: {'Content-Type': 'application/json'},
+                body: JSON.stringify({ text: this.sourceText, lang: this.currentLang, fingerprint: st.fingerprint, line_hashes: st.line_hashes })
+            });
+            if (!res.ok) return false;
+            const data = await res.json();
+            // Du dernier au premier pour garder les indices valides
+            for (const p of [...data.patches].reverse()) this.analyzedSentences.splice(p.start, p.end - p.start, ...p.sentences);
+            this.analysisState = { lang: this.currentLang, fingerprint: data.fingerprint, line_hashes: data.line_hashes };
+            this.readerMode = true;
+            this.selectedToken = null;
+            return true;
+        },
+
         async analyzeText() {
             if (!this.sourceText) return;
             this.isLoading = true;
+
+            const st = this.analysisState;
+            if (st && st.lang === this.currentLang && this.analyzedSentences.length === st.line_hashes.length) {
+                try { if (await this.analyzeIncremental()) { this.isLoading = false; return; } }
+                catch (e) { console.error(e); }
+            }
             this.analyzedSentences = []; // Reset visuel
+            this.analysisState = null;
             
             try {
-                const res = await fetch('/lists/analyze', { 
+                const res = await fetch('/lists/analyze/stream', { 
                     method: 'POST', 
-                    headers: {'Content-Type': 'application/json'}, 
+                    headers: {'Content-Type': 'application/json', 'Accept': 'application/x-ndjson'}, 
                     body: JSON.stringify({ text: this.sourceText, lang: this.currentLang }) 
                 });
                 
                 if(res.ok) {
-                    const data = await res.json();
-                    this.analyzedSentences = data.sentences;
-                    this.readerMode = true; 
-                    this.selectedToken = null;
+                    await this.readAnalysisStream(res);
                 } else {
                     this.showToast("Erreur serveur lors de l'analyse");
                 }
@@ -84,24 +174,75 @@ createApp({
             }
         },
 
+        // Livres (EPUB) : ingestion en tâche de fond, les chapitres s'affichent à mesure qu'ils sont prêts
+        async ingestFile(file) {
+            const formData = new FormData();
+            formData.append('file', file);
+            formData.append('lang', this.currentLang);
+            const res = await fetch('/lists/analyze/jobs', { method: 'POST', body: formData });
+            if (!res.ok) { const err = await res.json(); return this.showToast("Erreur: " + (err.detail || "Fichier invalide")); }
+            let job = await res.json();
+            this.ingestJobId = job.id;
+            const texts = [];
+            let next = 0, done = -1, beat = job.updated_at, beatSeen = Date.now();
+            while (this.ingestJobId === job.id) {
+                // Serveur injoignable ou battement figé (process tué) : abandon au lieu d'attendre indéfiniment
+                if (Date.now() - beatSeen > INGEST_STALL_MS) { job.status = 'failed'; job.error = "Analyse interrompue (serveur muet)"; break; }
+                const r = await fetch(`/lists/analyze/jobs/${job.id}`).catch(() => null);
+                if (r && r.status === 404) break;
+                if (!r || !r.ok) { await new Promise(r => setTimeout(r, 1000)); continue; }
+                job = await r.json();
+                if (job.updated_at !== beat) { beat = job.updated_at; beatSeen = Date.now(); }
+                for (; next < job.chapters.length; next++) {
+                    const c = this.decodeCompact(await (await fetch(`/lists/analyze/jobs/${job.id}/chapters/${next}?format=compact`)).json());
+                    texts.push(c.raw_text);
+                    this.analyzedSentences.push(...c.sentences);
+                    this.sourceText = texts.join('\n');
+                    this.readerMode = true;
+                }
+                if (job.total_chapters && job.done_chapters !== done) {
+                    done = job.done_chapters;
+                    this.showToast(`Analyse : ${done}/${job.total_chapters} chapitres`);
+                }
+                if (['done', 'failed', 'cancelled'].includes(job.status) && next >= job.chapters.length) break;
+                await new Promise(r => setTimeout(r, 1000));
+            }
+            if (job.status === 'failed') this.showToast("Erreur: " + (job.error || "Fichier invalide"));
+            else if (job.status === 'done') this.showToast("Livre chargé et analysé");
+        },
+        cancelIngest() {
+            if (this.ingestJobId) fetch(`/lists/analyze/jobs/${this.ingestJobId}`, { method: 'DELETE' });
+            this.ingestJobId = null;
+        },
+
         async uploadTextFile(event) {
             const file = event.target.files[0];
             if (!file) return;
             
+            if (file.name.toLowerCase().endsWith('.epub')) {
+                this.cancelIngest();
+                this.analyzedSentences = [];
+                this.analysisState = null;
+                this.selectedToken = null;
+                this.isLoading = true;
+                try { await this.ingestFile(file); }
+                catch (e) { this.showToast("Erreur upload"); }
+                finally { this.isLoading = false; event.target.value = ''; }
+                return;
+            }
+
             this.isLoading = true;
+            this.analyzedSentences = [];
+            this.analysisState = null;
             const formData = new FormData();
             formData.append('file', file);
             formData.append('lang', this.currentLang);
             
             try {
-                const res = await fetch('/lists/analyze/file', { method: 'POST', body: formData });
+                const res = await fetch('/lists/analyze/file/stream', { method: 'POST', body: formData });
                 if (res.ok) {
-                    const data = await res.json();
-                    // On met à jour le texte source ET le résultat
-                    this.sourceText = data.raw_text; 
-                    this.analyzedSentences = data.sentences;
-                    this.readerMode = true;
-                    this.selectedToken = null;
+                    // Le flux renvoie d'abord le texte source (meta) puis les phrases
+                    await this.readAnalysisStream(res);
                     this.showToast("Fichier chargé et analysé");
                 } else {
                     const err = await res.json();
@@ -145,18 +286,27 @@ createApp({
                 }
             } catch(e) { this.showToast("Erreur chargement liste"); }
         },
-        loadAnalysis(ana) {
+        async loadAnalysis(ana) {
             this.sourceText = ana.content;
             this.currentLang = ana.lang || 'jp';
             this.showLoadModal = false;
+            this.isLoading = true;
+            this.analyzedSentences = [];
+            this.analysisState = null;
             
-            // On force le mode éditeur d'abord pour être sûr
-            this.readerMode = false;
-            
-            // Puis on lance l'analyse après un court délai pour que Vue mette à jour l'état
-            setTimeout(() => {
-                this.analyzeText();
-            }, 100);
+            // Résultat servi par le cache serveur (analyse faite une seule fois par texte)
+            try {
+                const res = await fetch(`/lists/analyses/${ana.id}/result?format=compact`);
+                if (res.ok) {
+                    const data = this.decodeCompact(await res.json());
+                    this.analyzedSentences = data.sentences;
+                    this.readerMode = true;
+                    this.selectedToken = null;
+                } else {
+                    this.showToast("Erreur serveur lors de l'analyse");
+                }
+            } catch (e) { this.showToast("Erreur réseau"); }
+            finally { this.isLoading = false; }
         },
         deleteAnalysis(id) {
             this.triggerConfirm("Supprimer définitivement ce texte ?", async () => {
@@ -167,13 +317,29 @@ createApp({
 
         // --- LISTES, CARDS, TRAIN (Standard) ---
         async fetchLists() { const r=await fetch('/lists/'); this.lists=await r.json(); if(!this.selectedListId && this.lists.length) this.selectedListId=this.lists[this.lists.length-1].id; },
-        async openList(l) { const r=await fetch(`/lists/${l.id}`); this.activeList=await r.json(); },
+        async openList(l) { const r=await fetch(`/lists/${l.id}`); this.activeList=await r.json(); this.reloadListCards(); },
+        reloadListCards() { this.listCards=[]; this.listCursor=null; this.listScrollTop=0; if (this.$refs.cardsScroll) this.$refs.cardsScroll.scrollTop=0; this.fetchListCards(true); },
+        async fetchListCards(first=false) {
+            if (this.listLoading || (!first && !this.listCursor)) return;
+            this.listLoading = true;
+            try {
+                const p = new URLSearchParams({ limit: 200, sort: this.listSort, fields: 'terme,lecture,definitions,context' });
+                if (this.listPrefix) p.set('prefix', this.listPrefix);
+                if (this.listCursor) p.set('cursor', this.listCursor);
+                const r = await fetch(`/lists/${this.activeList.id}/cards?` + p); const page = await r.json();
+                this.listCards.push(...page.items); this.listCursor = page.next_cursor;
+            } finally { this.listLoading = false; }
+        },
+        onCardsScroll(e) {
+            this.listScrollTop = e.target.scrollTop;
+            if (this.visibleRange.end > this.listCards.length - 50) this.fetchListCards();
+        },
         async createNewList() {
             if(!this.newListTitle) return;
             try { await fetch('/lists/', {method:'POST', headers:{'Content-Type':'application/json'}, body:JSON.stringify({title:this.newListTitle, lang:this.currentLang})}); this.newListTitle=''; this.showCreateListModal=false; this.fetchLists(); } catch(e) {}
         },
         askDeleteCard(id) { this.triggerConfirm("Supprimer ce mot ?", () => this.deleteCard(id)); },
-        async deleteCard(id) { try { await fetch(`/lists/cards/${id}`, {method:'DELETE'}); if(this.activeList) this.activeList.cards = this.activeList.cards.filter(c => c.id !== id); this.showToast("Mot supprimé"); } catch(e){} },
+        async deleteCard(id) { try { await fetch(`/lists/cards/${id}`, {method:'DELETE'}); if(this.activeList) { this.listCards = this.listCards.filter(c => c.id !== id); this.activeList.card_count--; } this.showToast("Mot supprimé"); } catch(e){} },
         askDeleteList(l) { this.triggerConfirm(`Supprimer "${l.title}" ?`, async () => { await fetch(`/lists/${l.id}`, {method:'DELETE'}); this.lists = this.lists.filter(x => x.id !== l.id); if(this.activeList && this.activeList.id === l.id) this.activeList=null; this.showToast("Liste supprimée"); }); },
         
         selectToken(t,s) { this.selectedToken=t; this.currentContextSentence=s; },
@@ -185,10 +351,53 @@ createApp({
             try { const r = await fetch(`/lists/${this.selectedListId}/cards/bulk`, {method:'POST', headers:{'Content-Type':'application/json'}, body:JSON.stringify(p)}); if(r.ok) this.showToast("Mot ajouté !"); } catch(e) { this.showToast("Erreur"); }
         },
         
-        async startSession() { let u='/lists/training/due'; if(this.trainListId) u+=`?list_id=${this.trainListId}`; const r=await fetch(u); this.dueCards=await r.json(); this.nextCard(); },
-        nextCard() { this.currentCard=this.dueCards.length?this.dueCards[0]:null; this.isFlipped=false; },
+        async startSession() { await this.flushReviews(); this.dueCursor={}; this.dueExhausted=false; this.dueCards=[]; await this.fetchDuePage(); this.nextCard(); },
+        // Page suivante de la file (curseur keyset = dernière carte reçue, par liste en mode alterné)
+        async fetchDuePage() {
+            if (this.dueExhausted || this.isFetchingDue) return;
+            this.isFetchingDue = true;
+            const interleaved = this.trainInterleave && !this.trainListId;
+            try {
+                const p = new URLSearchParams({ limit: 50 });
+                if (this.trainListId) p.set('list_id', this.trainListId);
+                if (interleaved) p.set('interleave', 'true');
+                Object.entries(this.dueCursor).forEach(([lid, c]) => p.append('after', interleaved ? `${lid},${c}` : c));
+                const r = await fetch('/lists/training/due?' + p); const page = await r.json();
+                if (page.length < 50) this.dueExhausted = true;
+                page.forEach(c => { this.dueCursor[interleaved ? c.list_id : 0] = `${c.next_review},${c.id}`; });
+                const known = new Set(this.dueCards.map(c => c.id));
+                this.dueCards.push(...page.filter(c => !known.has(c.id)));
+            } finally { this.isFetchingDue = false; }
+        },
+        nextCard() {
+            this.currentCard=this.dueCards.length?this.dueCards[0]:null; this.isFlipped=false;
+            if (this.dueCards.length < 10 && !this.dueExhausted) this.fetchDuePage().then(() => { if (!this.currentCard && this.dueCards.length) this.nextCard(); });
+        },
         flipCard() { this.isFlipped=true; },
-        async submitReview(q) { await fetch(`/lists/cards/${this.currentCard.id}/review`, {method:'POST', headers:{'Content-Type':'application/json'}, body:JSON.stringify({quality:q})}); this.dueCards.shift(); this.nextCard(); },
+        // Révisions mises en file (localStorage) et envoyées par lots : fonctionne aussi hors ligne
+        submitReview(q) {
+            const queue = JSON.parse(localStorage.getItem('okura_review_queue') || '[]');
+            const event_id = crypto.randomUUID ? crypto.randomUUID() : `${Date.now().toString(36)}-${Math.random().toString(36).slice(2)}`;
+            queue.push({ card_id: this.currentCard.id, quality: q, reviewed_at: new Date().toISOString(), event_id });
+            localStorage.setItem('okura_review_queue', JSON.stringify(queue));
+            this.dueCards.shift(); this.nextCard();
+            if (queue.length >= 20 || !this.currentCard) this.flushReviews();
+        },
+        async flushReviews() {
+            const queue = JSON.parse(localStorage.getItem('okura_review_queue') || '[]');
+            if (!queue.length || this.isFlushing) return;
+            this.isFlushing = true;
+            try {
+                const r = await fetch('/lists/cards/review/batch', {method:'POST', headers:{'Content-Type':'application/json'}, body:JSON.stringify(queue)});
+                if (r.ok) {
+                    // On ne retire que ce qui a été envoyé (d'autres révisions ont pu s'ajouter entre-temps)
+                    const sent = new Set(queue.map(e => e.event_id));
+                    const rest = JSON.parse(localStorage.getItem('okura_review_queue') || '[]').filter(e => !sent.has(e.event_id));
+                    localStorage.setItem('okura_review_queue', JSON.stringify(rest));
+                }
+            } catch(e) { /* hors ligne : nouvel essai au prochain flush */ }
+            finally { this.isFlushing = false; }
+        },
         async fetchStats() { const r=await fetch('/lists/dashboard/stats'); this.stats=await r.json(); },
         getHeatClass(c) { if(!c)return ''; if(c<=5)return 'heat-1'; return 'heat-4'; },
         downloadCsv() { window.location.href="/lists/data/export"; },
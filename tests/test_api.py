@@ -1,5 +1,9 @@
+import asyncio
+import json
+import time
 from fastapi.testclient import TestClient
 from app.main import app
+from app.services import wire
 
 client = TestClient(app)
 
@@ -23,3 +27,351 @@ def test_analyze_text():
     # Check that "こんにちは" is recognized
     # Usually sudachipy splits it or treats as one token depending on mode
     # Just checking we got a response is enough for a basic smoke test
+
+def test_analyze_cache_stats():
+    # Stats cumulées sur les workers d'analyse (le comptage des hits est testé dans test_nlp.py :
+    # deux requêtes peuvent tomber sur deux workers, chacun avec son propre cache)
+    client.post("/lists/analyze", json={"text": f"本を読む。{time.time_ns()}", "lang": "jp"})
+    stats = client.get("/lists/analyze/stats").json()["jmdict"]
+    assert stats["misses"] + stats["hits"] > 0
+    assert stats["size"] <= stats["maxsize"]
+
+def test_analysis_survives_broken_pool():
+    import os
+    import pytest
+    from concurrent.futures.process import BrokenProcessPool
+    from app.services import analysis
+    if analysis.ANALYSIS_BACKEND != "process": pytest.skip("pool de process seulement")
+    with pytest.raises(BrokenProcessPool):
+        analysis.get_executor().submit(os._exit, 1).result()  # worker tué, pool cassé
+    response = client.post("/lists/analyze", json={"text": f"猫が鳴く。{time.time_ns()}", "lang": "jp"})
+    assert response.status_code == 200 and response.json()["sentences"]
+
+def test_readiness():
+    # Le lifespan lance le préchauffage ; /ready passe à 200 une fois les moteurs chargés
+    with TestClient(app) as c:
+        for _ in range(600):
+            response = c.get("/ready")
+            if response.status_code == 200: break
+            assert response.status_code == 503
+            time.sleep(0.1)
+        assert response.status_code == 200 and response.json()["ready"]
+        assert set(response.json()["engines"]) == {"jp", "cn"}
+
+def test_analyze_stream_ndjson():
+    response = client.post("/lists/analyze/stream", json={"text": "こんにちは\n\n本を読む", "lang": "jp"})
+    assert response.status_code == 200
+    records = [json.loads(line) for line in response.text.splitlines() if line]
+    sentences = [r for r in records if r["type"] == "sentence"]
+    assert [r["index"] for r in sentences] == [0, 1, 2]
+    assert records[-1]["type"] == "done" and records[-1]["count"] == 3
+
+def test_analyze_stream_fills_result_cache():
+    payload = {"text": f"猫が好き。\n本を読む。{time.time_ns()}", "lang": "jp"}
+    records = [json.loads(line) for line in client.post("/lists/analyze/stream", json=payload).text.splitlines() if line]
+    before = client.get("/lists/analyze/stats").json()["results"]["memory"]["hits"]
+    # Flux terminé : l'analyse complète est servie par le cache
+    result = client.post("/lists/analyze", json=payload).json()
+    assert client.get("/lists/analyze/stats").json()["results"]["memory"]["hits"] == before + 1
+    streamed = [r["tokens"] for r in records if r["type"] == "sentence"]
+    assert [[t["text"] for t in s] for s in result["sentences"]] == [[t["text"] for t in s] for s in streamed]
+
+def test_analyze_result_cache():
+    payload = {"text": "猫が好きです。", "lang": "jp"}
+    first = client.post("/lists/analyze", json=payload)
+    before = client.get("/lists/analyze/stats").json()["results"]["memory"]["hits"]
+    second = client.post("/lists/analyze", json=payload)
+    assert second.json() == first.json()
+    assert client.get("/lists/analyze/stats").json()["results"]["memory"]["hits"] == before + 1
+
+def test_saved_analysis_result():
+    created = client.post("/lists/analyses/", json={"title": "t", "content": "本を読む。", "lang": "jp"}).json()
+    response = client.get(f"/lists/analyses/{created['id']}/result")
+    assert response.status_code == 200
+    assert response.json()["raw_text"] == "本を読む。"
+    client.delete(f"/lists/analyses/{created['id']}")
+
+def test_analyze_incremental():
+    first = client.post("/lists/analyze/incremental", json={"text": "本を読む。\n猫が好き。", "lang": "jp"}).json()
+    assert first["full"] and len(first["patches"][0]["sentences"]) == 2
+    second = client.post("/lists/analyze/incremental", json={
+        "text": "本を読む。\n犬が好き。\n終わり。", "lang": "jp",
+        "fingerprint": first["fingerprint"], "line_hashes": first["line_hashes"],
+    }).json()
+    assert not second["full"]
+    # Seule la 2e ligne (modifiée) et la 3e (ajoutée) sont ré-analysées
+    assert [(p["start"], p["end"], len(p["sentences"])) for p in second["patches"]] == [(1, 2, 2)]
+
+def test_ingestion_job():
+    with TestClient(app) as c:
+        job = c.post("/lists/analyze/jobs", files={"file": ("livre.txt", "本を読む。\n猫が好き。".encode())}, data={"lang": "jp"}).json()
+        for _ in range(100):
+            status = c.get(f"/lists/analyze/jobs/{job['id']}").json()
+            if status["status"] in ("done", "failed"): break
+            time.sleep(0.1)
+        assert status["status"] == "done"
+        assert status["chapters"][0]["sentence_count"] == 2
+        chapter = c.get(f"/lists/analyze/jobs/{job['id']}/chapters/0").json()
+        assert len(chapter["sentences"]) == 2
+
+def test_ingestion_job_failed_on_shutdown(monkeypatch):
+    from app.services import jobs
+    async def stuck(*args): await asyncio.sleep(3600)
+    monkeypatch.setattr(jobs, "_run", stuck)
+    with TestClient(app) as c:
+        job = c.post("/lists/analyze/jobs", files={"file": ("livre.txt", "本を読む。".encode())}, data={"lang": "jp"}).json()
+        assert c.get(f"/lists/analyze/jobs/{job['id']}").json()["updated_at"]
+    # Arrêt du serveur : le job en cours ne reste pas « running » pour toujours
+    status = client.get(f"/lists/analyze/jobs/{job['id']}").json()
+    assert status["status"] == "failed"
+
+def test_review_batch():
+    lst = client.post("/lists/", json={"title": "batch", "lang": "jp"}).json()
+    card = client.post(f"/lists/{lst['id']}/cards", json={"terme": "猫", "ent_seq": 1467640}).json()
+    events = [
+        {"card_id": card["id"], "quality": 5, "reviewed_at": "2026-01-01T10:00:00"},
+        {"card_id": card["id"], "quality": 4, "reviewed_at": "2026-01-02T10:00:00"},
+        {"card_id": 999999, "quality": 5},
+    ]
+    result = client.post("/lists/cards/review/batch", json=events).json()
+    assert result == {"applied": 2, "duplicates": 0, "missing": [999999]}
+    cards = client.get(f"/lists/{lst['id']}/cards").json()["items"]
+    assert cards[0]["streak"] == 2
+    client.delete(f"/lists/{lst['id']}")
+
+def test_review_batch_idempotent():
+    lst = client.post("/lists/", json={"title": "batch-idem", "lang": "jp"}).json()
+    card = client.post(f"/lists/{lst['id']}/cards", json={"terme": "猫", "ent_seq": 1467640}).json()
+    event_id = f"ev-{time.time_ns()}"
+    events = [{"card_id": card["id"], "quality": 5, "event_id": event_id}]
+    # Beacon de fermeture puis flush au rechargement : le même lot arrive deux fois
+    assert client.post("/lists/cards/review/batch", json=events).json()["applied"] == 1
+    again = events + [{"card_id": card["id"], "quality": 5, "event_id": event_id + "-2"}]
+    assert client.post("/lists/cards/review/batch", json=again).json() == {"applied": 1, "duplicates": 1, "missing": []}
+    assert client.get(f"/lists/{lst['id']}/cards").json()["items"][0]["streak"] == 2
+    client.delete(f"/lists/{lst['id']}")
+
+def test_dashboard_counters_match_reconcile():
+    lst = client.post("/lists/", json={"title": "stats", "lang": "jp"}).json()
+    cards = client.post(f"/lists/{lst['id']}/cards/bulk", json=[{"terme": "本", "ent_seq": 1}, {"terme": "猫", "ent_seq": 2}]).json()
+    client.post("/lists/cards/review/batch", json=[{"card_id": cards[0]["id"], "quality": 5}])
+    client.delete(f"/lists/cards/{cards[1]['id']}")
+    live = client.get("/lists/dashboard/stats").json()
+    client.post("/lists/dashboard/stats/reconcile")
+    assert client.get("/lists/dashboard/stats").json() == live
+    per_list = {l["list_id"]: l for l in live["lists"]}
+    assert per_list[lst["id"]]["total"] == 1 and per_list[lst["id"]]["learned"] == 1
+    client.delete(f"/lists/{lst['id']}")
+
+def test_due_definition_shared():
+    from datetime import date, datetime, time as dtime, timedelta
+    lst = client.post("/lists/", json={"title": "due-today", "lang": "jp"}).json()
+    card = client.post(f"/lists/{lst['id']}/cards", json={"terme": "猫", "ent_seq": 1467640}).json()
+    # Révisée hier à 23:59:59 (intervalle 1 jour) : due ce soir, plus tard que maintenant
+    yesterday = datetime.combine(date.today() - timedelta(days=1), dtime(23, 59, 59))
+    client.post("/lists/cards/review/batch", json=[{"card_id": card["id"], "quality": 5, "reviewed_at": yesterday.isoformat()}])
+    served = [c["id"] for c in client.get("/lists/training/due", params={"list_id": lst["id"]}).json()]
+    assert served == [card["id"]]
+    assert client.get(f"/lists/{lst['id']}").json()["due_count"] == 1
+    client.delete(f"/lists/{lst['id']}")
+
+def test_due_queue_keyset_and_interleave():
+    a = client.post("/lists/", json={"title": "due-a", "lang": "jp"}).json()
+    b = client.post("/lists/", json={"title": "due-b", "lang": "jp"}).json()
+    client.post(f"/lists/{a['id']}/cards/bulk", json=[{"terme": f"a{i}", "ent_seq": 100 + i} for i in range(5)])
+    client.post(f"/lists/{b['id']}/cards/bulk", json=[{"terme": f"b{i}", "ent_seq": 200 + i} for i in range(2)])
+
+    seen, after = [], []
+    while True:
+        page = client.get("/lists/training/due", params={"list_id": a["id"], "limit": 2, "after": after}).json()
+        if not page: break
+        seen += [c["terme"] for c in page]
+        after = [f"{page[-1]['next_review']},{page[-1]['id']}"]
+    assert sorted(seen) == [f"a{i}" for i in range(5)] and len(seen) == 5
+
+    page = client.get("/lists/training/due", params={"interleave": True, "limit": 50}).json()
+    mine = [c["list_id"] for c in page if c["list_id"] in (a["id"], b["id"])]
+    assert mine[:4] == [a["id"], b["id"], a["id"], b["id"]]
+    assert client.get("/lists/training/due", params={"after": "pas-un-curseur"}).status_code == 400
+    client.delete(f"/lists/{a['id']}"); client.delete(f"/lists/{b['id']}")
+
+def test_list_cards_pagination():
+    lst = client.post("/lists/", json={"title": "pages", "lang": "jp"}).json()
+    client.post(f"/lists/{lst['id']}/cards/bulk", json=[{"terme": t, "ent_seq": 10 + i} for i, t in enumerate(["猫", "猫舌", "犬", "本", "本屋"])])
+    detail = client.get(f"/lists/{lst['id']}").json()
+    assert detail["card_count"] == 5 and "cards" not in detail
+
+    terms, cursor = [], None
+    while True:
+        params = {"sort": "terme", "order": "desc", "limit": 2, "fields": "terme"}
+        if cursor: params["cursor"] = cursor
+        page = client.get(f"/lists/{lst['id']}/cards", params=params).json()
+        terms += [c["terme"] for c in page["items"]]
+        assert all(set(c) == {"id", "terme"} for c in page["items"])
+        cursor = page["next_cursor"]
+        if not cursor: break
+    assert terms == sorted(terms, reverse=True) and len(terms) == 5
+
+    client.post(f"/lists/{lst['id']}/cards", json={"terme": "本𩸽", "ent_seq": 20})  # suite hors BMP
+    page = client.get(f"/lists/{lst['id']}/cards", params={"prefix": "本", "sort": "terme"}).json()
+    assert [c["terme"] for c in page["items"]] == ["本", "本屋", "本𩸽"]
+    assert client.get(f"/lists/{lst['id']}/cards", params={"fields": "secret"}).status_code == 400
+    client.delete(f"/lists/{lst['id']}")
+
+def test_list_cards_cursor_null_sort_key():
+    from app.core.database import SessionLocal
+    from app.models import vocabulaire as models
+    lst = client.post("/lists/", json={"title": "pages-null", "lang": "jp"}).json()
+    cards = client.post(f"/lists/{lst['id']}/cards/bulk", json=[{"terme": t, "ent_seq": 30 + i} for i, t in enumerate("一二三四五")]).json()
+    never = {cards[1]["id"], cards[3]["id"]}
+    with SessionLocal() as db:  # cartes jamais planifiées (anciennes bases)
+        db.query(models.VocabCard).filter(models.VocabCard.id.in_(never)).update({"next_review": None}, synchronize_session=False)
+        db.commit()
+    for order in ("asc", "desc"):
+        ids, cursor = [], None
+        while True:
+            params = {"sort": "next_review", "order": order, "limit": 2, "fields": "next_review"}
+            if cursor: params["cursor"] = cursor
+            page = client.get(f"/lists/{lst['id']}/cards", params=params)
+            assert page.status_code == 200
+            ids += [c["id"] for c in page.json()["items"]]
+            cursor = page.json()["next_cursor"]
+            if not cursor: break
+        assert len(ids) == 5 and set(ids[-2:]) == never  # NULL en dernier dans les deux sens
+    client.delete(f"/lists/{lst['id']}")
+
+def test_csv_export_import_roundtrip():
+    lst = client.post("/lists/", json={"title": "csv-export", "lang": "jp"}).json()
+    client.post(f"/lists/{lst['id']}/cards/bulk", json=[{"terme": "猫", "ent_seq": 1467640}, {"terme": "犬", "ent_seq": 1254190}])
+    exported = client.get("/lists/data/export").text
+    assert "csv-export,猫" in exported
+
+    rows = exported.replace("csv-export", "csv-import") + "csv-import,猫,,,,,,,,\n"  # doublon dans le fichier
+    result = client.post("/lists/data/import", files={"file": ("backup.csv", rows.encode("utf-8"))}).json()["details"]
+    assert result["lists_created"] == 1 and result["cards_created"] >= 2
+    again = client.post("/lists/data/import", files={"file": ("backup.csv", rows.encode("utf-8"))}).json()["details"]
+    assert again["cards_created"] == 0
+    for l in client.get("/lists/", params={"limit": 100}).json():
+        if l["title"] in ("csv-export", "csv-import"): client.delete(f"/lists/{l['id']}")
+
+def test_csv_import_rejected_row_counted():
+    # Ligne refusée par la base (entier hors limites) : comptée en erreur, le reste du paquet importé
+    rows = "list_title,terme,lecture,pos,definitions,context,ent_seq,streak,interval,next_review\n" \
+           "csv-rejet,猫,,,,,1467640,,,\ncsv-rejet,犬,,,,,%d,,,\ncsv-rejet,鳥,,,,,,,,\n" % 10**20
+    result = client.post("/lists/data/import", files={"file": ("backup.csv", rows.encode("utf-8"))}).json()["details"]
+    assert (result["cards_created"], result["errors"]) == (2, 1)
+    for l in client.get("/lists/", params={"limit": 100}).json():
+        if l["title"] == "csv-rejet":
+            assert sorted(c["terme"] for c in client.get(f"/lists/{l['id']}/cards").json()["items"]) == ["猫", "鳥"]
+            client.delete(f"/lists/{l['id']}")
+
+def test_analyze_compact_format():
+    text = "猫が好きです。\n猫と犬。"
+    full = client.post("/lists/analyze", json={"text": text, "lang": "jp"}).json()
+    res = client.post("/lists/analyze", params={"format": "compact"}, json={"text": text, "lang": "jp"})
+    assert res.headers["content-type"].startswith(wire.COMPACT_TYPE)
+    data = res.json()
+    assert "raw_text" not in data and wire.expand(data)["sentences"] == full["sentences"]
+    # 猫 apparaît deux fois mais n'a qu'un lexème
+    assert data["text"].count("猫") == 2 and [lex[0] for lex in data["lexemes"]].count("猫") == 1
+
+def test_metrics_and_profile_header():
+    res = client.post("/lists/analyze", json={"text": "猫が好き。", "lang": "jp"}, headers={"X-Okura-Profile": "1"})
+    assert "sql;dur=" in res.headers["server-timing"]
+    client.get("/lists/")
+    body = client.get("/metrics").text
+    assert 'okura_http_requests_total{method="GET",route="/lists/",status="200"}' in body
+    assert "okura_sql_queries_total" in body and "okura_nlp_stage_seconds_bucket" in body
+
+def test_analyze_profile_coverage():
+    lst = client.post("/lists/", json={"title": "profil", "lang": "jp"}).json()
+    text = "猫が好き。猫と犬。\n本を読む。"
+    first = client.post("/lists/analyze/profile", json={"text": text, "list_ids": [lst["id"]]}).json()
+    assert first["known_tokens"] == 0 and first["frequencies"][0]["lemma"] == "猫"
+    top = first["candidates"][0]
+    assert top["terme"] == "猫" and top["count"] == 2 and top["context"] == "猫が好き。猫と犬。"
+    client.post(f"/lists/{lst['id']}/cards/bulk", json=[top])
+    second = client.post("/lists/analyze/profile", json={"text": text, "list_ids": [lst["id"]]}).json()
+    assert second["known_tokens"] == 2 and second["coverage"] == round(2 / second["tokens"], 4)
+    assert "猫" not in [c["terme"] for c in second["candidates"]]
+    client.delete(f"/lists/{lst['id']}")
+
+def test_search_cards_and_analyses():
+    lst = client.post("/lists/", json={"title": "recherche", "lang": "jp"}).json()
+    client.post(f"/lists/{lst['id']}/cards/bulk", json=[
+        {"terme": "猫舌", "lecture": "ネコジタ", "ent_seq": 31, "definitions": ["sensitive to hot food"]},
+        {"terme": "猫", "lecture": "ネコ", "ent_seq": 32, "definitions": ["cat"]},
+        {"terme": "子猫", "lecture": "コネコ", "ent_seq": 33, "definitions": ["kitten"]},
+        {"terme": "猫𩸽", "ent_seq": 34},  # caractère suivant hors BMP
+    ])
+    hits = client.get("/lists/search", params={"q": "猫", "list_id": lst["id"]}).json()["items"]
+    assert [h["terme"] for h in hits] == ["猫", "猫舌", "猫𩸽", "子猫"]  # exact, préfixes, puis sous-chaîne
+    assert [h["terme"] for h in client.get("/lists/search", params={"q": "ねこ", "list_id": lst["id"]}).json()["items"]] == ["猫", "子猫", "猫舌"]
+    # Katakana / hiragana, sous-chaîne des définitions
+    assert [h["terme"] for h in client.get("/lists/search", params={"q": "ねこじた"}).json()["items"]] == ["猫舌"]
+    assert [h["terme"] for h in client.get("/lists/search", params={"q": "HOT FOOD", "list_id": lst["id"]}).json()["items"]] == ["猫舌"]
+
+    created = client.post("/lists/analyses/", json={"title": "本", "content": "昔々、ある村に猫舌の男がいた。", "lang": "jp"}).json()
+    page = client.get("/lists/search", params={"q": "ある村に", "kind": "analysis"}).json()
+    assert page["items"][0]["id"] == created["id"] and "ある村に" in page["items"][0]["snippet"]
+    client.delete(f"/lists/analyses/{created['id']}")
+    client.delete(f"/lists/{lst['id']}")
+    assert client.get("/lists/search", params={"q": "ねこじた"}).json()["items"] == []
+
+def test_async_routes_do_not_shadow_fixed_paths():
+    from fastapi import FastAPI
+    from app.routers import vocabulaire, vocabulaire_async
+    ordered = FastAPI()  # ordre d'inclusion de app.main avec OKURA_DB_ASYNC=1
+    ordered.include_router(vocabulaire_async.router)
+    ordered.include_router(vocabulaire.router)
+    assert TestClient(ordered).get("/lists/search", params={"q": "猫"}).status_code == 200
+
+def test_dashboard_forecast():
+    lst = client.post("/lists/", json={"title": "prévision", "lang": "jp"}).json()
+    client.post(f"/lists/{lst['id']}/cards/bulk", json=[{"terme": f"f{i}", "ent_seq": 400 + i} for i in range(3)])
+    # Rappel parfait : dues aujourd'hui, puis à J+1 et J+7 (pas SM-2 1 et 6 jours)
+    data = client.post("/lists/dashboard/forecast", json={"days": 10, "list_ids": [lst["id"]], "recall": [1.0]}).json()
+    due = data["lists"][0]["due"]
+    assert data["cards"] == 3 and data["lapses"] == 0
+    assert due[0] == 3 and due[1] == 3 and due[7] == 3 and sum(due) == 9
+    shorter = client.post("/lists/dashboard/forecast", json={"days": 10, "list_ids": [lst["id"]], "recall": [1.0], "steps": [1, 2]}).json()
+    assert shorter["lists"][0]["due"][3] == 3
+    assert client.get("/lists/dashboard/forecast", params={"days": 1000}).status_code == 400
+    assert client.post("/lists/dashboard/forecast", json={"pass_quality": 2}).status_code == 400
+    assert client.post("/lists/dashboard/forecast", json={"fail_quality": 3}).status_code == 400
+    client.delete(f"/lists/{lst['id']}")
+
+def test_review_card_with_null_schedule():
+    from app.core.database import SessionLocal
+    from app.models import vocabulaire as models
+    lst = client.post("/lists/", json={"title": "sm2-null", "lang": "jp"}).json()
+    card = client.post(f"/lists/{lst['id']}/cards", json={"terme": "猫", "ent_seq": 1467640}).json()
+    with SessionLocal() as db:  # cartes importées d'anciennes bases
+        db.query(models.VocabCard).filter(models.VocabCard.id == card["id"])\
+            .update({"interval": None, "ease_factor": None}, synchronize_session=False)
+        db.commit()
+    reviewed = client.post(f"/lists/cards/{card['id']}/review", json={"quality": 5})
+    assert reviewed.status_code == 200 and reviewed.json()["streak"] == 1
+    client.delete(f"/lists/{lst['id']}")
+
+def test_http_validation_and_compression():
+    lists = client.get("/lists/")
+    etag = lists.headers["etag"]
+    assert client.get("/lists/", headers={"If-None-Match": etag}).status_code == 304
+    lst = client.post("/lists/", json={"title": "etag", "lang": "jp"}).json()
+    assert client.get("/lists/", headers={"If-None-Match": etag}).status_code == 200
+    detail = client.get(f"/lists/{lst['id']}")
+    client.post(f"/lists/{lst['id']}/cards", json={"terme": "犬", "ent_seq": 501})
+    assert client.get(f"/lists/{lst['id']}", headers={"If-None-Match": detail.headers["etag"]}).json()["card_count"] == 1
+    dashboard = client.get("/lists/dashboard/stats").headers["etag"]
+    assert client.get("/lists/dashboard/stats", headers={"If-None-Match": dashboard}).status_code == 304
+    client.post(f"/lists/{lst['id']}/cards", json={"terme": "猫", "ent_seq": 502})
+    assert client.get("/lists/dashboard/stats", headers={"If-None-Match": dashboard}).status_code == 200
+
+    response = client.post("/lists/analyze", json={"text": "猫が好き。" * 200, "lang": "jp"}, headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip" and response.json()["sentences"]
+    page = client.get("/static/index.html", headers={"Accept-Encoding": "gzip"})
+    assert page.headers["content-encoding"] == "gzip" and page.headers["cache-control"] == "no-cache"
+    script = page.text.split('src="app.js?', 1)[1].split('"', 1)[0]
+    assert "immutable" in client.get(f"/static/app.js?{script}").headers["cache-control"]
+    client.delete(f"/lists/{lst['id']}")
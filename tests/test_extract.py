@@ -0,0 +1,38 @@
+import io
+import zipfile
+from app.services.extract import clean_html_text, iter_epub_chapters
+
+def test_clean_html_text_strips_ruby_and_notes():
+    html = "<html><head><title>T</title></head><body><p><ruby>漢字<rp>(</rp><rt>かんじ</rt><rp>)</rp></ruby>です［＃傍点］</p></body></html>"
+    assert clean_html_text(html) == "漢字です"
+
+def test_clean_html_text_implicit_ruby_end_tags():
+    # </rt> et </rp> omis : l'annotation se termine au rt/rp suivant ou à </ruby>
+    html = "<p><ruby>漢<rp>(<rt>かん<rp>)</ruby>字の本文。</p><p>続きの段落。"
+    assert clean_html_text(html) == "漢字の本文。続きの段落。"
+
+def test_epub_chapters_in_spine_order():
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w") as zf:
+        zf.writestr("META-INF/container.xml", '<container xmlns="urn:oasis:names:tc:opendocument:xmlns:container"><rootfiles>'
+                                              '<rootfile full-path="OEBPS/book.opf"/></rootfiles></container>')
+        zf.writestr("OEBPS/book.opf", '<package xmlns="http://www.idpf.org/2007/opf"><manifest>'
+                                      '<item id="a" href="a.xhtml" media-type="application/xhtml+xml"/>'
+                                      '<item id="b" href="b.xhtml" media-type="application/xhtml+xml"/>'
+                                      '</manifest><spine><itemref idref="b"/><itemref idref="a"/></spine></package>')
+        zf.writestr("OEBPS/a.xhtml", "<html><body>二</body></html>")
+        zf.writestr("OEBPS/b.xhtml", "<html><body>一</body></html>")
+    assert list(iter_epub_chapters(buf.getvalue())) == [("b.xhtml", "一"), ("a.xhtml", "二")]
+
+def test_epub_percent_encoded_hrefs():
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w") as zf:
+        zf.writestr("META-INF/container.xml", '<container xmlns="urn:oasis:names:tc:opendocument:xmlns:container"><rootfiles>'
+                                              '<rootfile full-path="OEBPS/book.opf"/></rootfiles></container>')
+        zf.writestr("OEBPS/book.opf", '<package xmlns="http://www.idpf.org/2007/opf"><manifest>'
+                                      '<item id="a" href="chapter%201.xhtml" media-type="application/xhtml+xml"/>'
+                                      '<item id="b" href="%E7%AB%A0.xhtml" media-type="application/xhtml+xml"/>'
+                                      '</manifest><spine><itemref idref="a"/><itemref idref="b"/></spine></package>')
+        zf.writestr("OEBPS/chapter 1.xhtml", "<html><body>一</body></html>")
+        zf.writestr("OEBPS/章.xhtml", "<html><body>二</body></html>")
+    assert list(iter_epub_chapters(buf.getvalue())) == [("chapter 1.xhtml", "一"), ("章.xhtml", "二")]
@@ -0,0 +1,23 @@
+from app.services.lexicon import build_lexicon, open_lexicon
+
+CEDICT_SAMPLE = """# CC-CEDICT
+學生 学生 [xue2 sheng5] /student/schoolchild/
+是 是 [shi4] /is/are/am/yes/to be/
+是 是 [shi4] /variant/
+"""
+
+def test_build_and_lookup(tmp_path):
+    cedict = tmp_path / "cedict_ts.u8"
+    cedict.write_text(CEDICT_SAMPLE, encoding="utf-8")
+    out = str(tmp_path / "lexicon.bin")
+    version = build_lexicon(out, cedict_path=str(cedict))
+
+    lex = open_lexicon(out)
+    assert lex.version == version
+    assert lex.has("cn") and not lex.has("jp")
+    assert lex.lookup("cn", "学生")["definitions"] == ["student", "schoolchild"]
+    # La forme traditionnelle pointe vers la même entrée (ID stable)
+    assert lex.lookup("cn", "學生")["ent_seq"] == lex.lookup("cn", "学生")["ent_seq"]
+    # Première entrée du fichier, gloses tronquées à 4
+    assert lex.lookup("cn", "是")["definitions"] == ["is", "are", "am", "yes"]
+    assert lex.lookup("cn", "猫") is None
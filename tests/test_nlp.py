@@ -0,0 +1,57 @@
+from app.services import nlp
+
+def _texts(lines):
+    return [[t["text"] for t in sentence] for sentence in nlp._analyze_japanese_lines(lines)]
+
+def test_japanese_batched_lines_match_single_lines():
+    # Lignes courtes regroupées en un appel Sudachi : mêmes tokens que la ligne analysée seule
+    # (blancs en bord de ligne, points de suspension en fin de ligne, ponctuation groupée)
+    lines = ["  猫 ", "…", "猫…", "「はい」", "!?", "　ええ。", "", "‥A", "本を読む", "㍿…", "x  "]
+    batched = _texts(lines)
+    assert batched == [_texts([line])[0] for line in lines]
+    assert ["".join(tokens) for tokens in batched] == lines
+
+def test_chinese_out_of_dictionary_ids_are_stable_and_disjoint():
+    token = nlp.chinese_token("𠀀𠀁")
+    assert token["is_word"] and not token["definitions"]
+    # Même ID d'un process à l'autre (pas de hash()), hors de l'espace [0, 1e8[ des entrées CEDICT
+    assert token["ent_seq"] == 105134736
+    known = nlp.chinese_token("学生")
+    if known["definitions"]: assert known["ent_seq"] < 100000000
+
+def test_chinese_punctuation_only_line():
+    assert list(nlp.iter_chinese_sentences("，。！")) == [[{"text": c, "is_word": False} for c in "，。！"]]
+    assert [t["is_word"] for t in next(nlp.iter_chinese_sentences("学生。"))][-1] is False
+
+def test_warmup_empty_list_keeps_engines_lazy():
+    # OKURA_NLP_WARMUP="" : aucun moteur préchauffé (chargés au premier usage)
+    assert nlp.warmup([]) == []
+
+def test_jmdict_lookup_cache_hits():
+    # Dans ce process : la 2e résolution de 本 est servie par le cache, sans requête
+    nlp.lookup_jmdict_batch({"本"})
+    before = nlp.jmdict_cache.stats()
+    assert nlp.lookup_jmdict_batch({"本"})["本"]["ent_seq"]
+    after = nlp.jmdict_cache.stats()
+    assert (after["hits"], after["misses"]) == (before["hits"] + 1, before["misses"])
+
+def test_chinese_engine_dictionary_failure_reported_and_retried(monkeypatch, tmp_path):
+    import pytest
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(nlp, "lexicon", None)
+    monkeypatch.setattr(nlp, "cedict_data", {})
+    monkeypatch.setattr(nlp, "_engines", {})
+    monkeypatch.setattr(nlp, "_engine_errors", {})
+    monkeypatch.setattr(nlp, "CEDICT_FILE", str(tmp_path / "cedict_ts.u8"))
+    monkeypatch.setattr(nlp.urllib.request, "install_opener", lambda opener: None)
+    def offline(*args): raise OSError("hors ligne")
+    monkeypatch.setattr(nlp.urllib.request, "urlretrieve", offline)
+    # Téléchargement impossible : moteur non enregistré, erreur exposée
+    with pytest.raises(RuntimeError):
+        nlp.get_engine("cn")
+    status = nlp.engine_status()["cn"]
+    assert not status["ready"] and "hors ligne" in status["error"]
+    # Dictionnaire disponible ensuite : le moteur est recréé
+    (tmp_path / "cedict_ts.u8").write_text("學生 学生 [xue2 sheng5] /student/\n", encoding="utf-8")
+    assert nlp.get_engine("cn") and nlp.engine_status()["cn"]["error"] is None
+    assert nlp.cedict_data["学生"][0]["defs"] == ["student"]